@@ -1,9 +1,17 @@
 import argparse
+import hashlib
+import inspect
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
 
 import matplotlib
 matplotlib.use("Agg")
@@ -60,26 +68,64 @@ def to_num(s: pd.Series) -> pd.Series:
     return pd.to_numeric(s.replace({"None": np.nan, "": np.nan}), errors="coerce")
 
 
+def is_missing(s: pd.Series) -> pd.Series:
+    """NULL cells: real nulls in typed results, the text "None" in results.txt."""
+    return s.isna() | s.astype(str).isin(["None", ""])
+
+
+def read_result_table(path: Path) -> pd.DataFrame:
+    """Memory-map a typed result file from `run_dw_queries.py --batch` into a DataFrame.
+
+    DECIMAL columns become float64 for plotting and DATE columns datetime64; nulls stay nulls.
+    """
+    if path.suffix == ".parquet":
+        table = pq.read_table(path, memory_map=True)
+    else:
+        with pa.memory_map(str(path), "r") as source:
+            table = ipc.open_file(source).read_all()
+    for i, field in enumerate(table.schema):
+        if pa.types.is_decimal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    return table.to_pandas(date_as_object=False)
+
+
+def load_query_result(query_file: str, results_dir: Path, input_path: Path, text_cache: dict) -> pd.DataFrame:
+    """Prefer the typed result file; fall back to parsing the ASCII table in results.txt."""
+    stem = Path(query_file).stem
+    for suffix in (".arrow", ".parquet"):
+        path = results_dir / f"{stem}{suffix}"
+        if path.exists():
+            return read_result_table(path)
+
+    if "text" not in text_cache:
+        if not input_path.exists():
+            raise FileNotFoundError(f"No result file for {query_file} in {results_dir} and input file not found: {input_path}")
+        text_cache["text"] = input_path.read_text(encoding="utf-8", errors="ignore")
+    print(f"[TEXT] {query_file} -> parsed from {input_path.as_posix()}")
+    return parse_ascii_table(extract_query_block(text_cache["text"], query_file))
+
+
 def project_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
 def charts_output_dir() -> Path:
-    out = project_root() / "src/diagram"
+    # An environment variable rather than a global, so pool workers started with spawn see it too.
+    out = Path(os.environ.get("CHARTS_OUTPUT_DIR") or project_root() / "src/diagram")
     out.mkdir(parents=True, exist_ok=True)
     return out
 
 
-def save_chart_deterministic(fig_title: str, filename: str, dpi: int = 150) -> None:
-    out_path = charts_output_dir() / filename
+CHART_DPI = 150
+MANIFEST_NAME = "charts_manifest.json"
 
-    if out_path.exists():
-        plt.close("all")
-        print(f"[SKIP] {fig_title} -> already exists: {out_path.as_posix()}")
-        return
 
-    plt.savefig(out_path, dpi=dpi, bbox_inches="tight")
+def save_chart_deterministic(fig_title: str, filename: str, dpi: int = CHART_DPI) -> None:
+    out_path = charts_output_dir() / filename
+    tmp_path = out_path.with_name(f".{out_path.stem}.tmp.png")
+    plt.savefig(tmp_path, dpi=dpi, bbox_inches="tight")
     plt.close("all")
+    os.replace(tmp_path, out_path)
     print(f"[OK]   {fig_title} -> saved: {out_path.as_posix()}")
 
 
@@ -88,7 +134,7 @@ def chart_kpis(q1: pd.DataFrame):
     q1["Trips"] = to_num(q1["Trips"])
     q1["Revenue"] = to_num(q1["Revenue"])
 
-    total = q1[q1["FullDate"].isin(["None"])].copy()
+    total = q1[is_missing(q1["FullDate"])].copy()
     if not total.empty:
         total_trips = int(total["Trips"].iloc[0])
         total_revenue = float(total["Revenue"].iloc[0])
@@ -121,7 +167,7 @@ def chart_revenue_by_day(q1: pd.DataFrame):
     q1 = q1.copy()
     q1["Revenue"] = to_num(q1["Revenue"])
 
-    days = q1[~q1["FullDate"].isin(["None"])].copy()
+    days = q1[~is_missing(q1["FullDate"])].copy()
     days["FullDate"] = pd.to_datetime(days["FullDate"], errors="coerce")
     days = days.dropna(subset=["FullDate"]).sort_values("FullDate")
 
@@ -331,39 +377,125 @@ def chart_revenue_change_top3_boroughs(q9: pd.DataFrame):
     )
 
 
+# Output file -> (chart function, query whose result it draws).
+CHARTS = {
+    "kpis_july.png": (chart_kpis, "query1.sql"),
+    "revenue_by_day.png": (chart_revenue_by_day, "query1.sql"),
+    "manhattan_trips_by_hour.png": (chart_manhattan_trips_by_hour, "query2.sql"),
+    "manhattan_avg_value_by_hour.png": (chart_manhattan_avg_value_by_hour, "query2.sql"),
+    "payment_split_manhattan.png": (chart_payment_type_pie_manhattan, "query4.sql"),
+    "revenue_concentration_zones.png": (chart_revenue_concentration_by_zone, "query5.sql"),
+    "airport_avg_value_weekend_nights.png": (chart_airport_avg_value_lines, "query3.sql"),
+    "revenue_change_top3_boroughs.png": (chart_revenue_change_top3_boroughs, "query9.sql"),
+}
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def style_digest() -> str:
+    """Everything outside the chart function that changes the pixels: matplotlib, its settings, dpi and saving."""
+    style = {
+        "matplotlib": matplotlib.__version__,
+        "rc": sorted((k, repr(v)) for k, v in plt.rcParams.items()),
+        "dpi": CHART_DPI,
+        "save": inspect.getsource(save_chart_deterministic),
+    }
+    return hashlib.sha256(json.dumps(style).encode("utf-8")).hexdigest()
+
+
+def chart_hash(func, data_digest: str, style: str) -> str:
+    digest = hashlib.sha256()
+    for part in (data_digest, inspect.getsource(func), style):
+        digest.update(part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def read_manifest(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(path: Path, manifest: dict) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def render_chart(filename: str, df: pd.DataFrame) -> str:
+    """Pool worker: look the chart up by name so only the file name and the data are pickled."""
+    func, _ = CHARTS[filename]
+    func(df)
+    return filename
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--input",
         default=str(project_root() / "src" / "analysis" / "results.txt"),
-        help="Path to results.txt",
+        help="Path to results.txt (used only for queries without a typed result file)",
     )
+    parser.add_argument(
+        "--results-dir",
+        default=str(project_root() / "src" / "sql" / "queries" / "results"),
+        help="Directory with the .arrow/.parquet files written by run_dw_queries.py --batch",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes rendering charts")
+    parser.add_argument("--force", action="store_true", help="Redraw every chart, even if its inputs are unchanged")
+    parser.add_argument("--output-dir", help="Directory for the PNGs and manifest (default: src/diagram)")
     args = parser.parse_args()
+    if args.output_dir:
+        os.environ["CHARTS_OUTPUT_DIR"] = args.output_dir
 
     input_path = Path(args.input)
-    if not input_path.exists():
-        raise FileNotFoundError(f"Input file not found: {input_path}")
-
-    text = input_path.read_text(encoding="utf-8", errors="ignore")
-
-    q1 = parse_ascii_table(extract_query_block(text, "query1.sql"))
-    q2 = parse_ascii_table(extract_query_block(text, "query2.sql"))
-    q3 = parse_ascii_table(extract_query_block(text, "query3.sql"))
-    q4 = parse_ascii_table(extract_query_block(text, "query4.sql"))
-    q5 = parse_ascii_table(extract_query_block(text, "query5.sql"))
-    q9 = parse_ascii_table(extract_query_block(text, "query9.sql"))
-
-    print(f"Saving charts into: {(charts_output_dir()).as_posix()}")
-    chart_kpis(q1)
-    chart_revenue_by_day(q1)
-    chart_manhattan_trips_by_hour(q2)
-    chart_manhattan_avg_value_by_hour(q2)
-    chart_payment_type_pie_manhattan(q4)
-    chart_revenue_concentration_by_zone(q5)
-    chart_airport_avg_value_lines(q3)
-    chart_revenue_change_top3_boroughs(q9)
-
-    print("\nDone.")
+    results_dir = Path(args.results_dir)
+    text_cache = {}
+
+    frames = {}
+    for query_file in sorted({q for _, q in CHARTS.values()}):
+        frames[query_file] = load_query_result(query_file, results_dir, input_path, text_cache)
+    digests = {q: frame_digest(df) for q, df in frames.items()}
+
+    out_dir = charts_output_dir()
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = read_manifest(manifest_path)
+    style = style_digest()
+    print(f"Saving charts into: {out_dir.as_posix()}")
+
+    todo = {}
+    for filename, (func, query_file) in CHARTS.items():
+        wanted = chart_hash(func, digests[query_file], style)
+        if not args.force and manifest.get(filename) == wanted and (out_dir / filename).exists():
+            print(f"[SKIP] {filename} -> data, code and style unchanged")
+            continue
+        todo[filename] = wanted
+
+    failed = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(todo)))) as pool:
+            futures = {pool.submit(render_chart, f, frames[CHARTS[f][1]]): f for f in todo}
+            for future in as_completed(futures):
+                filename = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    manifest.pop(filename, None)
+                    print(f"[FAIL] {filename}: {e}")
+                    continue
+                manifest[filename] = todo[filename]
+        write_manifest(manifest_path, manifest)
+
+    print(f"\nDone: {len(todo) - failed} drawn, {len(CHARTS) - len(todo)} up to date, {failed} failed.")
+    if failed:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
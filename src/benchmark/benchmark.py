@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+for folder in ("data_processing", "sql/queries", "analysis"):
+    sys.path.insert(0, str(SRC_DIR / folder))
+
+import result_files
+from check_explain import sample_params
+from generate_dataset import generate_dataset
+from generate_dataset import parse_scale
+from run_dw_queries import connect
+from run_dw_queries import parse_params
+from run_dw_queries import read_query_files
+from run_dw_queries import rows_payload
+from run_dw_queries import run_query
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+WORK_DIR = SRC_DIR / "dataset" / "benchmark"
+
+def git_commit():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=SRC_DIR).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, cwd=SRC_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{sha}-dirty" if dirty else sha
+
+def measure(stages, stage, func):
+    """Run func() once and record its wall time.
+
+    Memory is not traced in process: tracemalloc slows allocation-heavy code down several times
+    over. Stages whose memory matters run in a child process under measure_child instead.
+    """
+    started = time.perf_counter()
+    value = func()
+    seconds = time.perf_counter() - started
+    stages[stage] = {"seconds": round(seconds, 4), "peak_mb": None}
+    print(f"  {stage:<22} {seconds:9.2f}s")
+    return value
+
+def measure_child(stages, stage, cmd, cwd):
+    """Run a script in its own process; its peak RSS comes from wait4 where the OS has it."""
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL)
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(proc.pid, 0)
+        code = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        peak = usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+    else:
+        code, peak = proc.wait(), None
+    seconds = time.perf_counter() - started
+    if code != 0:
+        raise RuntimeError(f"{stage} failed: {' '.join(map(str, cmd))} exited with {code}")
+    stages[stage] = {"seconds": round(seconds, 4), "peak_mb": round(peak, 1) if peak is not None else None}
+    print(f"  {stage:<22} {seconds:9.2f}s   peak {peak if peak is not None else float('nan'):9.1f} MiB (process RSS)")
+
+def run_scale(rows, args):
+    stages = {}
+    work = WORK_DIR / str(rows)
+    work.mkdir(parents=True, exist_ok=True)
+    print(f"\nScale {rows:,} rows ({args.backend})")
+
+    source = measure(stages, "generate", lambda: generate_dataset(rows, args.month, args.seed, work))
+
+    # Read, validate, transform and save through main.py's streaming path, as a full month is run.
+    processed_dir = work / "processed"
+    measure_child(stages, "pipeline", [
+        sys.executable, "main.py", "--input", str(source), "--limit", "0", "--stream",
+        "--batch-size", str(args.batch_size), "--format", "csv", "--no-cache", "--output-dir", str(processed_dir),
+    ], SRC_DIR / "data_processing")
+    outputs = [p for p in processed_dir.glob(f"{Path(source).stem}_*.csv") if p.suffixes == [".csv"]]
+    processed = max(outputs, key=lambda p: p.stat().st_mtime).as_posix()
+
+    queries_dir = SRC_DIR / "sql" / "queries"
+    db_path = work / "dw.duckdb"
+    if args.backend == "duckdb":
+        measure_child(stages, "load", [sys.executable, "duckdb_backend.py", "--source", processed, "--db", str(db_path), "--rebuild"], queries_dir)
+        import duckdb_backend
+        conn, driver = duckdb_backend.connect_duckdb(processed, db_path)
+    else:
+        measure_child(stages, "load", [sys.executable, "load_staging.py", processed, "--warehouse", "--workers", str(args.workers)], queries_dir)
+        conn, driver = connect("mysql")
+
+    trips = run_query(conn, driver, "SELECT COUNT(*) AS trips FROM Fact_Trip", ())[0]["trips"]
+    results_dir = work / "results"
+    results_dir.mkdir(exist_ok=True)
+    for fname, _, sql_text in read_query_files(queries_dir):
+        specs = parse_params(sql_text)
+        params = sample_params(conn, driver, specs) if specs else ()
+        rows_out = measure(stages, f"query:{fname}", lambda: run_query(conn, driver, sql_text, params))
+        payload = rows_payload(rows_out)
+        result_files.save_result(results_dir, Path(fname).stem, payload["columns"], payload["rows"], {"query": fname, "params": list(params)})
+    conn.close()
+
+    measure_child(
+        stages, "charts",
+        [sys.executable, "charts.py", "--results-dir", str(results_dir), "--output-dir", str(work / "charts"), "--force"],
+        SRC_DIR / "analysis",
+    )
+    return {"rows": rows, "trips_loaded": trips, "backend": args.backend, "stages": stages}
+
+def results_path(commit):
+    return RESULTS_DIR / f"{commit}.json"
+
+def find_results(prefix):
+    matches = sorted(RESULTS_DIR.glob(f"{prefix}*.json"))
+    if not matches:
+        raise SystemExit(f"No benchmark results for '{prefix}' in {RESULTS_DIR.as_posix()}")
+    return json.loads(matches[-1].read_text(encoding="utf-8"))
+
+def compare(old, new, threshold):
+    print(f"Comparing {old['commit']} -> {new['commit']}")
+    slower = 0
+    for scale in sorted(set(old["runs"]) & set(new["runs"]), key=int):
+        print(f"\nScale {int(scale):,} rows")
+        before, after = old["runs"][scale]["stages"], new["runs"][scale]["stages"]
+        for stage in [s for s in after if s in before]:
+            ratio = after[stage]["seconds"] / before[stage]["seconds"] if before[stage]["seconds"] else float("inf")
+            flag = "  SLOWER" if ratio > threshold else ""
+            slower += bool(flag)
+            print(f"  {stage:<22} {before[stage]['seconds']:9.2f}s -> {after[stage]['seconds']:9.2f}s  {ratio:5.2f}x{flag}")
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile every pipeline stage on synthetic data.")
+    parser.add_argument("--scale", nargs="+", default=["10k", "100k"], help="Row counts or scale names (10k, 100k, 1m, 10m, 30m)")
+    parser.add_argument("--backend", choices=("duckdb", "mysql"), default="duckdb", help="Where the load and query stages run")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel chunks for the MySQL load")
+    parser.add_argument("--batch-size", type=int, default=250_000, help="Rows per batch of the streaming pipeline")
+    parser.add_argument("--month", default="2025-07", help="Month of the synthetic pickups")
+    parser.add_argument("--seed", type=int, default=20250701, help="Generator seed")
+    parser.add_argument("--compare", nargs="+", metavar="COMMIT", help="Compare saved results: OLD [NEW] (default NEW: the current commit)")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio flagged by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        old = find_results(args.compare[0])
+        new = find_results(args.compare[1] if len(args.compare) > 1 else git_commit())
+        sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+    commit = git_commit()
+    path = results_path(commit)
+    saved = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {"commit": commit, "runs": {}}
+    saved.update({
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    })
+    for scale in args.scale:
+        rows = parse_scale(scale)
+        saved["runs"][str(rows)] = run_scale(rows, args)
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(saved, indent=2), encoding="utf-8")
+    print(f"\nBenchmark saved to {path.as_posix()}")
+
+if __name__ == "__main__":
+    main()
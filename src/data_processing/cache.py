@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CACHE_DIR = "../dataset/cache"
+DEFAULT_MAX_BYTES = 2 * 2**30
+FOOTER_BYTES = 1 << 16
+
+# Sources whose code shapes the transformed data; editing any of them invalidates the cache.
+PIPELINE_MODULES = ("read_dataset.py", "sampling.py", "compact.py", "staging.py", "transform_dataset.py", "dimensions.py", "validation.py")
+# Sources that write the published dataset and its side tables from the transformed batches; editing
+# any of them keeps the cached batches but stops an earlier run's output from being reused as is.
+OUTPUT_MODULES = ("save_dataset.py", "concurrency.py", "sketches.py")
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def parquet_signature(path):
+    """Size, mtime and footer hash; the footer holds the schema and row-group statistics."""
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        f.seek(max(0, stat.st_size - FOOTER_BYTES))
+        footer = f.read()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "footer_sha256": sha256_bytes(footer)}
+
+def code_signature(modules):
+    here = Path(__file__).resolve().parent
+    return {name: sha256_bytes((here / name).read_bytes()) for name in modules}
+
+def fingerprint(parquet_path, taxi_zone_path, code_maps, params):
+    payload = {
+        "parquet": parquet_signature(parquet_path),
+        "taxi_zones": sha256_bytes(Path(taxi_zone_path).read_bytes()),
+        "code_maps": {name: {str(k): v for k, v in m.items()} for name, m in code_maps.items()},
+        "params": params,
+        "code": code_signature(PIPELINE_MODULES),
+    }
+    return sha256_bytes(json.dumps(payload, sort_keys=True).encode("utf-8"))[:16]
+
+def entry_dir(key):
+    return Path(CACHE_DIR) / key
+
+def read_meta(key):
+    meta_path = entry_dir(key) / "meta.json"
+    if not meta_path.exists():
+        return None
+    return json.loads(meta_path.read_text(encoding="utf-8"))
+
+def write_meta(key, meta):
+    (entry_dir(key) / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+def lookup(key):
+    """Return the entry metadata on a hit (and mark it as recently used), else None."""
+    meta = read_meta(key)
+    if meta is None or not (entry_dir(key) / "transformed.parquet").exists():
+        return None
+    meta["last_used"] = time.time()
+    write_meta(key, meta)
+    return meta
+
+def read_batches(key, batch_size=250_000):
+    parquet_file = pq.ParquetFile(entry_dir(key) / "transformed.parquet")
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield batch.to_pandas()
+
+def read_quarantine(key):
+    """The rows validation rejected when the entry was written, as a list like transform_batch fills."""
+    path = entry_dir(key) / "quarantine.parquet"
+    return [pd.read_parquet(path)] if path.exists() else []
+
+def write_through(key, batches, params, quarantine=None):
+    """Yield the batches unchanged while storing them (and the quarantined rows); the entry only appears once complete."""
+    final_dir = entry_dir(key)
+    tmp_dir = Path(CACHE_DIR) / f".{key}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    writer = None
+    rows = 0
+    try:
+        for df in batches:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_dir / "transformed.parquet", table.schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+            rows += len(df)
+            yield df
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    if quarantine:
+        pd.concat(quarantine, ignore_index=True).to_parquet(tmp_dir / "quarantine.parquet", index=False, compression="zstd")
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    now = time.time()
+    write_meta(key, {"created": now, "last_used": now, "rows": rows, "params": params, "output": None, "format": None})
+
+def record_output(key, output_path, fmt, max_bytes=DEFAULT_MAX_BYTES):
+    meta = read_meta(key)
+    if meta is not None:
+        meta["output"] = output_path
+        meta["format"] = fmt
+        meta["output_code"] = code_signature(OUTPUT_MODULES)
+        write_meta(key, meta)
+    evict(max_bytes, keep=key)
+
+def output_current(meta):
+    """True if the entry's output was written by the current OUTPUT_MODULES."""
+    return meta.get("output_code") == code_signature(OUTPUT_MODULES)
+
+def entry_size(path):
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+def evict(max_bytes=DEFAULT_MAX_BYTES, keep=None):
+    """Drop least recently used entries until the cache fits in max_bytes."""
+    root = Path(CACHE_DIR)
+    if not root.exists():
+        return
+    entries = []
+    for path in root.iterdir():
+        if path.is_dir() and not path.name.startswith("."):
+            meta = read_meta(path.name) or {}
+            entries.append((meta.get("last_used", 0), path, entry_size(path)))
+
+    total = sum(size for _, _, size in entries)
+    for _, path, size in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        if path.name == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        print(f"Evicted cache entry {path.name} ({size / 2**20:,.1f} MiB)")
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Money columns are held as integer cents (fixed point, exact sums) until output.
+AMOUNT_COLUMNS = [
+    "fare_amount",
+    "extra",
+    "mta_tax",
+    "tip_amount",
+    "tolls_amount",
+    "improvement_surcharge",
+    "total_amount",
+    "congestion_surcharge",
+    "Airport_fee",
+    "cbd_congestion_fee",
+]
+
+# Same money columns under their Stg_Trip names, plus the derived totals.
+STAGE_AMOUNT_COLUMNS = [
+    "FareAmount",
+    "Extra",
+    "MtaTax",
+    "TipAmount",
+    "TollsAmount",
+    "ImprovementSurcharge",
+    "TotalAmount",
+    "CongestionSurcharge",
+    "AirportFee",
+    "CbdCongestionFee",
+    "TotalSurcharges",
+    "NetAmountExclTips",
+]
+
+def code_to_key(series, mapping, unknown):
+    """TLC codes as dimension keys: a code in the mapping is its own key, anything else the unknown member."""
+    codes = series.to_numpy(dtype="float64", na_value=np.nan)
+    known = np.isin(codes, np.array(list(mapping), dtype="float64"))
+    return np.where(known, np.nan_to_num(codes), unknown).astype(np.int16)
+
+def to_cents(series):
+    return (series * 100).round().astype("Int32")
+
+def compact_frame(df):
+    if "passenger_count" in df.columns:
+        df["passenger_count"] = df["passenger_count"].round().astype("Int8")
+    for col in AMOUNT_COLUMNS:
+        if col in df.columns and df[col].dtype.kind == "f":
+            df[col] = to_cents(df[col])
+    for col in df.columns:
+        if df[col].dtype == object or pd.api.types.is_string_dtype(df[col].dtype):
+            df[col] = df[col].astype("category")
+    return df
+
+def to_output_frame(df):
+    """Undo the fixed-point encoding so the processed dataset keeps decimal amounts."""
+    df = df.copy()
+    for col in AMOUNT_COLUMNS + STAGE_AMOUNT_COLUMNS:
+        if col in df.columns and str(df[col].dtype) == "Int32":
+            df[col] = df[col].astype("Float64") / 100
+    return df
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+def report_memory(stage, df):
+    print(f"[mem] {stage}: {memory_usage_mb(df):,.1f} MiB for {len(df):,} rows ({df.shape[1]} columns)")
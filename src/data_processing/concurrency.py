@@ -0,0 +1,175 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Width of a Stg_ZoneConcurrency row. It must divide 60 so 09:00 and 18:00 start a bucket
+# (Fact_Daily_ZoneVendor reads OpenTripsAtPeakHourMorning/Night from those rows).
+BUCKET_MINUTES = 15
+CELL_COLUMNS = ["VendorKey", "PickupLocationKey"]
+# Column order of dw.Stg_ZoneConcurrency.
+CONCURRENCY_COLUMNS = ["DateKey", "TimeKey"] + CELL_COLUMNS + ["OpenTrips", "MaxOpenTrips"]
+MINUTES_PER_DAY = 1440
+# Spilled trip_intervals rows: one file of these records per pickup day.
+INTERVAL_DTYPE = np.dtype([("VendorKey", "<i4"), ("PickupLocationKey", "<i4"), ("start", "<i8"), ("stop", "<i8")])
+# Rows read at a time when the intervals are read back from a processed CSV.
+READ_CHUNK_ROWS = 1_000_000
+
+def concurrency_path(dataset_path):
+    """<name>.concurrency.csv next to a processed CSV, concurrency.csv inside a manifest's dataset directory."""
+    path = Path(dataset_path)
+    if path.name == "manifest.json":
+        return path.parent / "concurrency.csv"
+    return path.with_name(f"{path.stem}.concurrency.csv")
+
+def trip_intervals(df):
+    """Pickup cell and open minutes of every trip the warehouse keeps, as absolute minutes [start, stop).
+
+    A trip is open from its pickup minute through its dropoff minute, the same inclusive test as
+    `PickupTimeKey <= t AND DropoffTimeKey >= t`, but on a continuous clock so trips past midnight count.
+    Rows without a valid interval, which validation.py quarantines, are left out.
+    """
+    pickup = pd.to_datetime(df["PickupDT"])
+    dropoff = pd.to_datetime(df["DropoffDT"])
+    valid = (pickup.notna() & dropoff.notna() & (pickup < dropoff)).to_numpy()
+    out = pd.DataFrame({c: df[c].to_numpy()[valid] for c in CELL_COLUMNS})
+    out["start"] = pickup.to_numpy()[valid].astype("datetime64[m]").astype(np.int64)
+    out["stop"] = dropoff.to_numpy()[valid].astype("datetime64[m]").astype(np.int64) + 1
+    return out
+
+def sweep(cell, start, stop, bucket_minutes=BUCKET_MINUTES):
+    """Open trips per (cell, bucket) from sorted +1/-1 events and a running sum.
+
+    Returns (cell, bucket, open at the bucket start, most open at any minute of the bucket),
+    for buckets where a trip is open.
+    """
+    n = len(cell)
+    cells = np.concatenate([cell, cell])
+    times = np.concatenate([start, stop])
+    deltas = np.concatenate([np.ones(n, np.int32), np.full(n, -1, np.int32)])
+    order = np.lexsort((times, cells))
+    cells, times = cells[order], times[order]
+    # Every trip closes inside its own cell, so the running total is back to 0 at each cell boundary.
+    level = np.cumsum(deltas[order])
+
+    # The level after the last event at a minute holds until the cell's next event.
+    last = np.ones(len(cells), bool)
+    last[:-1] = (cells[1:] != cells[:-1]) | (times[1:] != times[:-1])
+    seg_cell, seg_start, seg_level = cells[last], times[last], level[last]
+    seg_stop = np.append(seg_start[1:], 0)
+    keep = seg_level > 0
+    seg_cell, seg_start, seg_stop, seg_level = seg_cell[keep], seg_start[keep], seg_stop[keep], seg_level[keep]
+
+    # One entry per bucket a segment overlaps.
+    first = seg_start // bucket_minutes
+    counts = (seg_stop - 1) // bucket_minutes - first + 1
+    seg = np.repeat(np.arange(len(seg_cell)), counts)
+    bucket = first[seg] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    levels = seg_level[seg]
+    # Only the segment that covers the bucket's first minute contributes to OpenTrips.
+    at_start = np.where(bucket * bucket_minutes >= seg_start[seg], levels, 0)
+
+    cell_of = seg_cell[seg]
+    if not len(bucket):
+        return cell_of, bucket, at_start, levels
+    starts = np.flatnonzero(np.r_[True, (cell_of[1:] != cell_of[:-1]) | (bucket[1:] != bucket[:-1])])
+    return cell_of[starts], bucket[starts], np.add.reduceat(at_start, starts), np.maximum.reduceat(levels, starts)
+
+def zone_concurrency(intervals, bucket_minutes=BUCKET_MINUTES):
+    """Stg_ZoneConcurrency rows: open trips per pickup zone and vendor for every bucket of the day."""
+    if intervals.empty:
+        return pd.DataFrame(columns=CONCURRENCY_COLUMNS)
+    codes, cells = pd.MultiIndex.from_frame(intervals[CELL_COLUMNS]).factorize()
+    cell, bucket, open_trips, max_open = sweep(codes, intervals["start"].to_numpy(), intervals["stop"].to_numpy(), bucket_minutes)
+
+    minutes = bucket * bucket_minutes
+    day = pd.to_datetime(minutes, unit="m")
+    out = pd.DataFrame({
+        "DateKey": day.year * 10000 + day.month * 100 + day.day,
+        "TimeKey": minutes % 1440,
+    })
+    for i, col in enumerate(CELL_COLUMNS):
+        out[col] = cells.get_level_values(i)[cell]
+    out["OpenTrips"] = open_trips
+    out["MaxOpenTrips"] = max_open
+    return out[CONCURRENCY_COLUMNS]
+
+def spill_intervals(intervals, spill_dir):
+    """Append trip_intervals rows to one file per pickup day in spill_dir."""
+    records = np.empty(len(intervals), INTERVAL_DTYPE)
+    for name in INTERVAL_DTYPE.names:
+        records[name] = intervals[name].to_numpy()
+    day = records["start"] // MINUTES_PER_DAY
+    order = np.argsort(day, kind="stable")
+    records, day = records[order], day[order]
+    bounds = np.flatnonzero(day[1:] != day[:-1]) + 1
+    for a, b in zip(np.r_[0, bounds], np.r_[bounds, len(day)]):
+        with open(Path(spill_dir) / f"{day[a]}.bin", "ab") as f:
+            records[a:b].tofile(f)
+
+def spilled_concurrency(spill_dir, bucket_minutes=BUCKET_MINUTES):
+    """zone_concurrency of the intervals in spill_dir, swept one day at a time.
+
+    Trips still open at midnight are carried into the next day with their start moved to midnight,
+    and every day only sweeps up to its own midnight, so each bucket comes out once and exactly as
+    in a sweep of all trips at once, while only a day of trips is held.
+    """
+    days = sorted(int(p.stem) for p in Path(spill_dir).glob("*.bin"))
+    carried = np.empty(0, INTERVAL_DTYPE)
+    tables = []
+    i = 0
+    while i < len(days) or len(carried):
+        day = days[i] if not len(carried) else int(carried["start"][0] // MINUTES_PER_DAY)
+        path = Path(spill_dir) / f"{day}.bin"
+        records = np.concatenate([carried, np.fromfile(path, INTERVAL_DTYPE)]) if path.exists() else carried
+        i += i < len(days) and days[i] == day
+        midnight = (day + 1) * MINUTES_PER_DAY
+        open_after = records["stop"] > midnight
+        carried = records[open_after]
+        carried["start"] = midnight
+        intervals = pd.DataFrame(records)
+        intervals["stop"] = np.minimum(intervals["stop"].to_numpy(), midnight)
+        tables.append(zone_concurrency(intervals, bucket_minutes))
+    tables = [t for t in tables if len(t)]
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=CONCURRENCY_COLUMNS)
+
+def read_interval_batches(dataset_path, chunk_rows=READ_CHUNK_ROWS):
+    """trip_intervals of a processed dataset, a CSV chunk or a partition at a time, reading only the columns it needs."""
+    path = Path(dataset_path)
+    columns = ["PickupDT", "DropoffDT"] + CELL_COLUMNS
+    if path.name != "manifest.json":
+        for chunk in pd.read_csv(path, usecols=columns, na_values=["\\N"], keep_default_na=False, chunksize=chunk_rows):
+            yield trip_intervals(chunk)
+        return
+
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    for part in manifest["partitions"]:
+        file = path.parent / part["path"]
+        if manifest["format"] == "parquet":
+            table = pq.read_table(file, columns=columns)
+        else:
+            with ipc.open_file(file) as reader:
+                table = reader.read_all().select(columns)
+        yield trip_intervals(table.to_pandas())
+
+def save_concurrency(dataset_path, spill_dir=None, bucket_minutes=BUCKET_MINUTES):
+    """Write the concurrency table next to a processed dataset from the intervals spilled to spill_dir
+    (see spill_intervals); without one, the intervals are read back from the dataset."""
+    output_path = concurrency_path(dataset_path)
+    if spill_dir is None:
+        with tempfile.TemporaryDirectory(dir=output_path.parent, prefix=".intervals_") as spill_dir:
+            for intervals in read_interval_batches(dataset_path):
+                spill_intervals(intervals, spill_dir)
+            table = spilled_concurrency(spill_dir, bucket_minutes)
+    else:
+        table = spilled_concurrency(spill_dir, bucket_minutes)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    table.to_csv(tmp_path, index=False, lineterminator="\n")
+    os.replace(tmp_path, output_path)
+    print(f"Zone concurrency saved to: {output_path.as_posix()} ({len(table):,} rows of {bucket_minutes} min)")
+    return output_path.as_posix()
@@ -0,0 +1,76 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from read_dataset import airport_locations
+from read_dataset import build_zone_lookup
+from read_dataset import load_taxi_zones
+from staging import trip_characteristics_key
+from transform_dataset import PAYMENT_TYPE_MAP
+from transform_dataset import RATECODE_MAP
+from transform_dataset import UNKNOWN_VENDOR_ID
+from transform_dataset import VENDOR_ID_MAP
+
+# Dim_Vendor.VendorCode, the vendor numbering the warehouse used before keys were TLC VendorIDs.
+VENDOR_CODES = {2: 1, 1: 2, 7: 3}
+CSV_NULL = "\\N"
+
+def dimensions_dir(dataset_path):
+    """<name>.dimensions/ next to a processed CSV, dimensions/ inside a manifest's dataset directory."""
+    path = Path(dataset_path)
+    if path.name == "manifest.json":
+        return path.parent / "dimensions"
+    return path.with_name(f"{path.stem}.dimensions")
+
+def dimension_tables(taxi_zones_df):
+    """Every member of the dimensions the pipeline resolves keys for, keyed exactly as transform_batch keys the trips.
+
+    Dim_Location.IsCBD, and IsAirport for zones only the fee reveals, start at 0; etl_warehouse.sql
+    raises them from the trips of each batch.
+    """
+    zones = taxi_zones_df.sort_values("LocationID")
+    airport = airport_locations(build_zone_lookup(taxi_zones_df))
+    vendors = {UNKNOWN_VENDOR_ID: "Unknown", **VENDOR_ID_MAP}
+    flags = pd.MultiIndex.from_product([[0, 1]] * 4).to_frame(index=False).to_numpy()
+
+    return {
+        "Dim_Vendor": pd.DataFrame({
+            "VendorKey": list(vendors),
+            "VendorCode": pd.array([VENDOR_CODES.get(k) for k in vendors], dtype="Int8"),
+            "VendorName": list(vendors.values()),
+        }),
+        "Dim_Location": pd.DataFrame({
+            "LocationKey": zones["LocationID"].to_numpy(),
+            "LocationID": zones["LocationID"].to_numpy(),
+            "Borough": zones["Borough"].to_numpy(),
+            "Zone": zones["Zone"].to_numpy(),
+            "ServiceZone": zones["service_zone"].to_numpy(),
+            "IsAirport": airport[zones["LocationID"].to_numpy()].astype(int),
+            "IsCBD": 0,
+        }),
+        "Dim_RateCode": pd.DataFrame({"RateCodeKey": list(RATECODE_MAP), "RateCodeDesc": list(RATECODE_MAP.values())}),
+        "Dim_PaymentType": pd.DataFrame({"PaymentTypeKey": list(PAYMENT_TYPE_MAP), "PaymentTypeDesc": list(PAYMENT_TYPE_MAP.values())}),
+        "Dim_TripCharacteristics": pd.DataFrame({
+            "TripCharacteristicsKey": trip_characteristics_key(*flags.T),
+            "StoreAndForwardFlagBool": flags[:, 0],
+            "IsAirportTrip": flags[:, 1],
+            "IsCBDTrip": flags[:, 2],
+            "IsCongestionSurcharge": flags[:, 3],
+        }),
+    }
+
+def save_dimensions(dataset_path, taxi_zones_df=None):
+    """Write one CSV per dimension next to a processed dataset, for the warehouse load to copy as is."""
+    if taxi_zones_df is None:
+        taxi_zones_df = load_taxi_zones()
+    output_dir = dimensions_dir(dataset_path)
+    output_dir.mkdir(exist_ok=True)
+    tables = dimension_tables(taxi_zones_df)
+    for name, table in tables.items():
+        output_path = output_dir / f"{name}.csv"
+        tmp_path = output_dir / f".{name}.csv.tmp"
+        table.to_csv(tmp_path, index=False, na_rep=CSV_NULL, lineterminator="\n")
+        os.replace(tmp_path, output_path)
+    print(f"Dimensions saved to: {output_dir.as_posix()} ({', '.join(f'{n} {len(t)}' for n, t in tables.items())})")
+    return output_dir.as_posix()
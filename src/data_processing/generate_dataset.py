@@ -0,0 +1,173 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from read_dataset import TAXI_ZONE_LOOKUP_PATH
+
+SYNTHETIC_DIR = "../dataset/synthetic"
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000, "30m": 30_000_000}
+CHUNK_ROWS = 1_000_000
+DEFAULT_SEED = 20250701
+
+# Share of pickups per hour of day (NYC yellow cabs: quiet before dawn, evening peak).
+HOUR_WEIGHTS = np.array([
+    2.8, 1.9, 1.3, 0.9, 0.7, 0.8, 1.7, 3.0, 4.0, 4.2, 4.3, 4.6,
+    4.9, 5.0, 5.3, 5.6, 5.7, 6.3, 6.6, 6.0, 5.3, 5.1, 4.8, 3.9,
+])
+# Pickup weight per zone by its service_zone; the airports are single zones with heavy traffic.
+SERVICE_ZONE_WEIGHTS = {"Yellow Zone": 30.0, "Airports": 60.0, "Boro Zone": 1.5, "EWR": 0.2, "N/A": 0.5}
+# TLC code -> share of trips, for the codes transform_dataset maps.
+VENDOR_WEIGHTS = {1: 0.24, 2: 0.75, 7: 0.01}
+PAYMENT_WEIGHTS = {1: 0.76, 2: 0.12, 3: 0.006, 4: 0.004, 0: 0.11}
+PASSENGER_WEIGHTS = {1: 0.76, 2: 0.14, 3: 0.035, 4: 0.02, 5: 0.015, 6: 0.01, 0: 0.02}
+# Share of rows with the TLC "missing fields" pattern: no passenger count, rate code or flags, payment 0.
+MISSING_SHARE = 0.03
+
+TLC_SCHEMA = pa.schema([
+    ("VendorID", pa.int32()),
+    ("tpep_pickup_datetime", pa.timestamp("us")),
+    ("tpep_dropoff_datetime", pa.timestamp("us")),
+    ("passenger_count", pa.float64()),
+    ("trip_distance", pa.float64()),
+    ("RatecodeID", pa.float64()),
+    ("store_and_fwd_flag", pa.string()),
+    ("PULocationID", pa.int32()),
+    ("DOLocationID", pa.int32()),
+    ("payment_type", pa.int64()),
+    ("fare_amount", pa.float64()),
+    ("extra", pa.float64()),
+    ("mta_tax", pa.float64()),
+    ("tip_amount", pa.float64()),
+    ("tolls_amount", pa.float64()),
+    ("improvement_surcharge", pa.float64()),
+    ("total_amount", pa.float64()),
+    ("congestion_surcharge", pa.float64()),
+    ("Airport_fee", pa.float64()),
+    ("cbd_congestion_fee", pa.float64()),
+])
+
+def parse_scale(value):
+    return SCALES[value.lower()] if value.lower() in SCALES else int(value.replace("_", ""))
+
+def zone_model(taxi_zone_lookup_path=TAXI_ZONE_LOOKUP_PATH):
+    zones = pd.read_csv(taxi_zone_lookup_path)
+    weights = zones["service_zone"].map(SERVICE_ZONE_WEIGHTS).fillna(0.5).to_numpy()
+    return {
+        "ids": zones["LocationID"].to_numpy().astype(np.int32),
+        "p": weights / weights.sum(),
+        "airport": zones["service_zone"].isin(["Airports", "EWR"]).to_numpy(),
+        "jfk": (zones["Zone"] == "JFK Airport").to_numpy(),
+        "ewr": (zones["service_zone"] == "EWR").to_numpy(),
+        "airport_fee": zones["Zone"].isin(["JFK Airport", "LaGuardia Airport"]).to_numpy(),
+        "manhattan": (zones["Borough"] == "Manhattan").to_numpy(),
+        "yellow": (zones["service_zone"] == "Yellow Zone").to_numpy(),
+    }
+
+def choice(rng, weights, n):
+    codes = np.array(list(weights))
+    p = np.array(list(weights.values()), dtype=float)
+    return codes[rng.choice(len(codes), size=n, p=p / p.sum())]
+
+def generate_chunk(rng, n, month, zones):
+    """One chunk of TLC-schema trips with plausible relationships between the columns."""
+    start = pd.Timestamp(f"{month}-01")
+    days = pd.Period(month, freq="M").days_in_month
+    pickup = (
+        start.value // 1000
+        + rng.integers(0, days, n) * 86_400_000_000
+        + rng.choice(24, size=n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum()) * 3_600_000_000
+        + rng.integers(0, 3_600_000_000, n)
+    )
+
+    pu = rng.choice(len(zones["ids"]), size=n, p=zones["p"])
+    do = rng.choice(len(zones["ids"]), size=n, p=zones["p"])
+    airport = zones["airport"][pu] | zones["airport"][do]
+
+    distance = np.round(np.where(airport, rng.lognormal(2.8, 0.3, n), rng.lognormal(0.55, 0.75, n)), 2)
+    mph = np.clip(rng.lognormal(2.4, 0.35, n), 3, 45)
+    minutes = np.maximum(distance / mph * 60 + rng.exponential(2.0, n), 1.0)
+    dropoff = pickup + (minutes * 60_000_000).astype(np.int64)
+
+    rate = np.select([zones["jfk"][pu] | zones["jfk"][do], zones["ewr"][do]], [2.0, 3.0], 1.0)
+    rate[rng.random(n) < 0.01] = 5.0
+    rate[rng.random(n) < 0.005] = 99.0
+    payment = choice(rng, PAYMENT_WEIGHTS, n)
+
+    hours = (pickup // 3_600_000_000) % 24
+    fare = np.where(rate == 2.0, 70.0, np.round(3.0 + 2.8 * distance + 0.7 * minutes, 2))
+    extra = np.select([(hours >= 20) | (hours < 6), (hours >= 16) & (hours < 20)], [1.0, 2.5], 0.0)
+    tolls = np.where(airport & (rng.random(n) < 0.3), 6.94, 0.0)
+    congestion = np.where(zones["manhattan"][do] | zones["manhattan"][pu], 2.5, 0.0)
+    airport_fee = np.where(zones["airport_fee"][pu], 1.75, 0.0)
+    cbd = np.where(zones["yellow"][pu] | zones["yellow"][do], 0.75, 0.0)
+    tip = np.where(payment == 1, np.round(fare * rng.uniform(0.1, 0.3, n), 2), 0.0)
+    total = np.round(fare + extra + 0.5 + tip + tolls + 1.0 + congestion + airport_fee + cbd, 2)
+
+    passengers = choice(rng, PASSENGER_WEIGHTS, n).astype(float)
+    flag = np.where(rng.random(n) < 0.005, "Y", "N").astype(object)
+    missing = rng.random(n) < MISSING_SHARE
+    passengers[missing] = np.nan
+    rate[missing] = np.nan
+    flag[missing] = None
+    congestion = np.where(missing, np.nan, congestion)
+    airport_fee = np.where(missing, np.nan, airport_fee)
+    payment[missing] = 0
+
+    return pa.table({
+        "VendorID": choice(rng, VENDOR_WEIGHTS, n).astype(np.int32),
+        "tpep_pickup_datetime": pa.array(pickup, pa.timestamp("us")),
+        "tpep_dropoff_datetime": pa.array(dropoff, pa.timestamp("us")),
+        "passenger_count": passengers,
+        "trip_distance": distance,
+        "RatecodeID": rate,
+        "store_and_fwd_flag": pa.array(flag, pa.string()),
+        "PULocationID": zones["ids"][pu],
+        "DOLocationID": zones["ids"][do],
+        "payment_type": payment.astype(np.int64),
+        "fare_amount": fare,
+        "extra": extra,
+        "mta_tax": np.full(n, 0.5),
+        "tip_amount": tip,
+        "tolls_amount": tolls,
+        "improvement_surcharge": np.full(n, 1.0),
+        "total_amount": total,
+        "congestion_surcharge": congestion,
+        "Airport_fee": airport_fee,
+        "cbd_congestion_fee": cbd,
+    }, schema=TLC_SCHEMA)
+
+def generate_dataset(rows, month="2025-07", seed=DEFAULT_SEED, output_dir=SYNTHETIC_DIR, chunk_rows=CHUNK_ROWS):
+    """Write <output_dir>/yellow_tripdata_<month>_<rows>.parquet in chunks of bounded memory; returns its path."""
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    output_path = out_dir / f"yellow_tripdata_{month}_{rows}.parquet"
+    tmp_path = out_dir / f".{output_path.name}.tmp"
+    zones = zone_model()
+
+    started = time.perf_counter()
+    with pq.ParquetWriter(tmp_path, TLC_SCHEMA) as writer:
+        for i, offset in enumerate(range(0, rows, chunk_rows)):
+            rng = np.random.default_rng([seed, i])
+            writer.write_table(generate_chunk(rng, min(chunk_rows, rows - offset), month, zones))
+    tmp_path.replace(output_path)
+    print(f"Generated {rows:,} synthetic trips in {time.perf_counter() - started:.1f}s: {output_path.as_posix()}")
+    return output_path.as_posix()
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic trips in the TLC yellow taxi Parquet schema.")
+    parser.add_argument("--scale", nargs="+", default=["10k"], help=f"Row counts or scale names ({', '.join(SCALES)})")
+    parser.add_argument("--month", default="2025-07", help="Month the pickups fall in")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed; the same seed and scale give the same file")
+    parser.add_argument("--output-dir", default=SYNTHETIC_DIR, help="Directory for the generated files")
+    args = parser.parse_args()
+
+    for scale in args.scale:
+        generate_dataset(parse_scale(scale), args.month, args.seed, args.output_dir)
+
+if __name__ == "__main__":
+    main()
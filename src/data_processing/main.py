@@ -1,10 +1,175 @@
+import argparse
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+import cache
+import save_dataset
+from concurrency import concurrency_path
+from concurrency import save_concurrency
+from dimensions import dimensions_dir
+from dimensions import save_dimensions
+from read_dataset import PARQUET_PATH
+from read_dataset import TAXI_ZONE_LOOKUP_PATH
+from read_dataset import load_taxi_zones
+from sampling import DEFAULT_SEED
+from sampling import STRATA
+from sketches import save_sketches
+from sketches import sketches_path
+from transform_dataset import CODE_MAPS
 from transform_dataset import transform_dataset
-from save_dataset import save_dataset
+from transform_dataset import transform_dataset_streaming
+from save_dataset import FORMATS
+from save_dataset import consolidate
+from save_dataset import save_dataset_batches
+from validation import quarantine_path
+from validation import save_quarantine
+
+MONTHLY_FILE = "../dataset/original/yellow_tripdata_{month}.parquet"
+
+# Parsed once by the driver and handed to every worker by the pool initializer.
+_taxi_zones_df = None
+
+def init_worker(taxi_zones_df, output_dir=save_dataset.PROCESSED_DIR):
+    global _taxi_zones_df
+    _taxi_zones_df = taxi_zones_df
+    save_dataset.PROCESSED_DIR = output_dir
+
+def month_range(spec):
+    start, _, end = spec.partition(":")
+    months = pd.period_range(start, end or start, freq="M")
+    return [MONTHLY_FILE.format(month=str(m)) for m in months]
+
+def resolve_inputs(args):
+    paths = month_range(args.months) if args.months else []
+    for pattern in args.input:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    return list(dict.fromkeys(paths))
+
+def transformed_batches(file_path, options, quarantine):
+    if options["stream"] and not options["limit"]:
+        return transform_dataset_streaming(file_path, batch_size=options["batch_size"], taxi_zones_df=_taxi_zones_df, quarantine=quarantine)
+    df = transform_dataset(
+        limit=options["limit"] or None,
+        file_path=file_path,
+        seed=options["seed"],
+        stratify_by=options["stratify"],
+        batch_size=options["batch_size"],
+        taxi_zones_df=_taxi_zones_df,
+        quarantine=quarantine,
+    )
+    return [df]
+
+def published_in(output_path, output_dir):
+    """True if a processed CSV, or a manifest's dataset directory, lies directly in output_dir."""
+    path = Path(output_path)
+    folder = path.parent.parent if path.name == "manifest.json" else path.parent
+    return folder.resolve() == Path(output_dir).resolve()
+
+def process_file(file_path, options):
+    started = time.perf_counter()
+    filename = Path(file_path).stem
+    quarantine = []
+    if not options["cache"]:
+        output_path = save_dataset_batches(transformed_batches(file_path, options, quarantine), filename, fmt=options["format"], quarantine=quarantine)
+        return file_path, output_path, time.perf_counter() - started
+
+    params = {k: options[k] for k in ("limit", "seed", "stratify", "stream", "batch_size")}
+    key = cache.fingerprint(file_path, TAXI_ZONE_LOOKUP_PATH, CODE_MAPS, params)
+    entry = None if options["rebuild"] else cache.lookup(key)
+
+    # An output published under another --output-dir, or by older code for its side tables, is not
+    # reused; it is written again from the cached batches.
+    published = entry is not None and entry.get("output") and entry.get("format") == options["format"] and Path(entry["output"]).exists()
+    if published and published_in(entry["output"], save_dataset.PROCESSED_DIR) and cache.output_current(entry):
+        print(f"Cache hit {key}: {file_path} is unchanged, reusing {entry['output']}")
+        if not concurrency_path(entry["output"]).exists():
+            save_concurrency(entry["output"])
+        if not sketches_path(entry["output"]).exists():
+            save_sketches(entry["output"])
+        if not dimensions_dir(entry["output"]).exists():
+            save_dimensions(entry["output"])
+        if not quarantine_path(entry["output"]).exists():
+            save_quarantine(entry["output"], cache.read_quarantine(key))
+        cache.evict(options["cache_max_bytes"], keep=key)
+        return file_path, entry["output"], time.perf_counter() - started
+
+    if entry is not None:
+        print(f"Cache hit {key}: skipping read and transform of {file_path}")
+        batches = cache.read_batches(key, batch_size=options["batch_size"])
+        quarantine = cache.read_quarantine(key)
+    else:
+        batches = cache.write_through(key, transformed_batches(file_path, options, quarantine), params, quarantine)
+    output_path = save_dataset_batches(batches, filename, fmt=options["format"], quarantine=quarantine)
+    cache.record_output(key, output_path, options["format"], max_bytes=options["cache_max_bytes"])
+    return file_path, output_path, time.perf_counter() - started
 
 def main():
-    print("Starting data pipeline...")
-    df = transform_dataset()
-    save_dataset(df)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", nargs="*", default=None, help="Monthly TLC Parquet files or glob patterns")
+    parser.add_argument("--months", help="Month range of TLC files to process, e.g. 2025-07:2025-09")
+    parser.add_argument("--workers", type=int, default=1, help="Files processed in parallel")
+    parser.add_argument("--output-name", help="Name of the consolidated dataset when several files are processed")
+    parser.add_argument("--output-dir", default=save_dataset.PROCESSED_DIR, help="Directory the processed datasets are written to")
+    parser.add_argument("--limit", type=int, default=15000, help="Rows to sample per file (0 = keep every row)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed for the reproducible sample")
+    parser.add_argument("--stratify", choices=STRATA, default="date", help="Stratum used to keep the sample representative")
+    parser.add_argument("--stream", action="store_true", help="Without a limit, process the file batch by batch with bounded memory")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="csv, or date-partitioned compressed parquet/arrow")
+    parser.add_argument("--batch-size", type=int, default=250_000, help="Rows per Parquet batch in streaming mode")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the stage cache")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore cached results and rebuild (the cache is refreshed)")
+    parser.add_argument("--cache-size-mb", type=int, default=cache.DEFAULT_MAX_BYTES // 2**20, help="Stage cache size bound")
+    args = parser.parse_args()
+    if args.input is None:
+        args.input = [] if args.months else [PARQUET_PATH]
+
+    files = resolve_inputs(args)
+    if not files:
+        parser.error("No input files matched.")
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    save_dataset.PROCESSED_DIR = args.output_dir
+    options = {
+        "limit": args.limit,
+        "seed": args.seed,
+        "stratify": args.stratify,
+        "stream": args.stream,
+        "format": args.format,
+        "batch_size": args.batch_size,
+        "cache": not args.no_cache,
+        "rebuild": args.rebuild,
+        "cache_max_bytes": args.cache_size_mb * 2**20,
+    }
+
+    print(f"Starting data pipeline for {len(files)} file(s) with {args.workers} worker(s)...")
+    started = time.perf_counter()
+    taxi_zones_df = load_taxi_zones()
+
+    results = {}
+    if args.workers <= 1 or len(files) == 1:
+        init_worker(taxi_zones_df, args.output_dir)
+        for i, file_path in enumerate(files, start=1):
+            _, output_path, seconds = process_file(file_path, options)
+            results[file_path] = output_path
+            print(f"[{i}/{len(files)}] {file_path} -> {output_path} in {seconds:.1f}s")
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(taxi_zones_df, args.output_dir)) as pool:
+            futures = [pool.submit(process_file, file_path, options) for file_path in files]
+            for i, future in enumerate(as_completed(futures), start=1):
+                file_path, output_path, seconds = future.result()
+                results[file_path] = output_path
+                print(f"[{i}/{len(files)}] {file_path} -> {output_path} in {seconds:.1f}s")
+
+    if len(files) > 1:
+        stems = [Path(f).stem for f in files]
+        name = args.output_name or f"{stems[0]}_to_{stems[-1].rsplit('_', 1)[-1]}"
+        consolidate([results[f] for f in files], name, fmt=args.format)
+
+    print(f"Pipeline finished in {time.perf_counter() - started:.1f}s.")
 
 if __name__ == "__main__":
     main()
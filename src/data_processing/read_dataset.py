@@ -1,22 +1,94 @@
+import numpy as np
 import pyarrow.parquet as pq
 import pandas as pd
 
-def load_parquet():
-    file_path = "../dataset/original/yellow_tripdata_2025-07.parquet"
+PARQUET_PATH = "../dataset/original/yellow_tripdata_2025-07.parquet"
+TAXI_ZONE_LOOKUP_PATH = "../dataset/original/taxi_zone_lookup.csv"
+# The lookup's "Unknown" zone; trips with a missing or unmapped LocationID are keyed to it.
+UNKNOWN_LOCATION_ID = 264
+
+# Columns the transform actually uses; everything else is never read from disk.
+TRIP_COLUMNS = [
+    "VendorID",
+    "tpep_pickup_datetime",
+    "tpep_dropoff_datetime",
+    "passenger_count",
+    "trip_distance",
+    "RatecodeID",
+    "store_and_fwd_flag",
+    "PULocationID",
+    "DOLocationID",
+    "payment_type",
+    "fare_amount",
+    "extra",
+    "mta_tax",
+    "tip_amount",
+    "tolls_amount",
+    "improvement_surcharge",
+    "total_amount",
+    "congestion_surcharge",
+    "Airport_fee",
+    "cbd_congestion_fee",
+]
+
+def project_columns(parquet_file, columns):
+    if columns is None:
+        return None
+    available = set(parquet_file.schema_arrow.names)
+    return [c for c in columns if c in available]
+
+def load_parquet(file_path=PARQUET_PATH, columns=None):
     print(f"Loading dataset: {file_path}")
-    table = pq.read_table(file_path)
+    table = pq.read_table(file_path, columns=columns)
     df = table.to_pandas()
     print(f"Number of rows: {len(df):,}\n")
     return df
 
+def iter_parquet_batches(file_path=PARQUET_PATH, columns=TRIP_COLUMNS, batch_size=250_000):
+    parquet_file = pq.ParquetFile(file_path)
+    metadata = parquet_file.metadata
+    print(f"Streaming dataset: {file_path}")
+    print(f"Number of rows: {metadata.num_rows:,} in {metadata.num_row_groups} row groups (batch size {batch_size:,})\n")
+
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=project_columns(parquet_file, columns)):
+        yield batch.to_pandas()
+
 def load_taxi_zones():
-    taxi_zone_lookup_path = "../dataset/original/taxi_zone_lookup.csv"
+    taxi_zone_lookup_path = TAXI_ZONE_LOOKUP_PATH
     print(f"Loading Taxi Zone dataset {taxi_zone_lookup_path}")
     taxi_zone_df = pd.read_csv(taxi_zone_lookup_path)
     print(f"Number of Taxi Zones: {len(taxi_zone_df):,}\n")
-    
+
     taxi_zone_df.loc[taxi_zone_df["Borough"] == "Unknown", ["Zone", "service_zone"]] = "Unknown"
     print("Corrected 'Unknown' borough zones.\n")
     taxi_zone_df.loc[taxi_zone_df["Zone"] == "Outside of NYC", ["Borough", "service_zone"]] = "Outside of NYC"
     print("Corrected 'Outside of NYC' zones.\n")
     return taxi_zone_df
+
+def build_zone_lookup(taxi_zone_df, columns=("Borough", "Zone", "service_zone")):
+    """Dense LocationID -> category-code tables, so enrichment is a single array gather."""
+    ids = taxi_zone_df["LocationID"].to_numpy().astype(np.int64)
+    lookup = {}
+    for col in columns:
+        values = pd.Categorical(taxi_zone_df[col])
+        codes = np.full(ids.max() + 1, -1, dtype=np.int16)
+        codes[ids] = values.codes
+        lookup[col] = (codes, values.categories)
+    return lookup
+
+def location_keys(location_ids, zone_lookup):
+    """Dim_Location keys, which are the TLC LocationIDs themselves (unknown IDs -> UNKNOWN_LOCATION_ID)."""
+    codes = zone_lookup["Borough"][0]
+    ids = pd.Series(location_ids).fillna(-1).to_numpy().astype(np.int64)
+    valid = (ids >= 0) & (ids < len(codes))
+    valid[valid] = codes[ids[valid]] >= 0
+    return np.where(valid, ids, UNKNOWN_LOCATION_ID).astype(np.int16)
+
+def airport_locations(zone_lookup):
+    """Boolean per LocationID: service_zone 'Airports' or a zone name containing 'airport' (any case)."""
+    service_codes, services = zone_lookup["service_zone"]
+    zone_codes, zones = zone_lookup["Zone"]
+    # Code -1 (no such LocationID) picks the trailing False.
+    per_service = np.append(services.str.strip() == "Airports", False)
+    per_zone = np.append(zones.str.contains("airport", case=False, regex=False), False)
+    return per_service[service_codes] | per_zone[zone_codes]
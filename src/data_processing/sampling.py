@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_SEED = 20250701
+STRATA = ("date", "borough", "zone", "none")
+
+# A row of stratum s is kept while its random priority is below
+#   (OVERSAMPLE * m + SIGMAS * sqrt(m) + SLACK) / c_s,  with m = n * c_s / rows_seen
+# i.e. a few standard deviations above the stratum's proportional share. The bound only
+# ever shrinks as rows arrive, so every row the final allocation needs survives, while
+# memory stays around OVERSAMPLE * n + SLACK * strata rows.
+OVERSAMPLE = 1.25
+SIGMAS = 4
+SLACK = 8
+
+def stratum_labels(df, stratify_by, taxi_zones_df=None):
+    if stratify_by in (None, "none"):
+        return np.zeros(len(df), dtype=np.int64)
+    if stratify_by == "date":
+        pickup = pd.to_datetime(df["tpep_pickup_datetime"])
+        return pickup.dt.floor("D").to_numpy().astype("datetime64[D]").astype(np.int64)
+    if stratify_by == "zone":
+        return df["PULocationID"].fillna(-1).to_numpy().astype(np.int64)
+    if stratify_by == "borough":
+        borough = taxi_zones_df.set_index("LocationID")["Borough"]
+        return df["PULocationID"].map(borough).fillna("Unknown").to_numpy()
+    raise ValueError(f"Unknown stratification '{stratify_by}', expected one of {STRATA}.")
+
+def allocate(counts, n):
+    """Largest-remainder proportional allocation of n rows over the strata counts."""
+    total = counts.sum()
+    exact = counts * (n / total)
+    alloc = np.floor(exact).astype(np.int64)
+    remainder = n - alloc.sum()
+    if remainder > 0:
+        order = np.argsort(-(exact - alloc).to_numpy(), kind="stable")
+        alloc.iloc[order[:remainder]] += 1
+    return alloc
+
+def sample_batches(batches, n, seed=DEFAULT_SEED, stratify_by="date", taxi_zones_df=None):
+    """One-pass, seeded, stratified sample of n rows from an iterable of DataFrames.
+
+    Every row gets a uniform random priority from a generator seeded with `seed`; each
+    stratum keeps its lowest-priority rows, so the same input and seed always yield the
+    same sample regardless of batch size.
+    """
+    rng = np.random.default_rng(seed)
+    counts = pd.Series(dtype=np.int64)
+    pool = None
+    seen = 0
+
+    for batch in batches:
+        batch = batch.reset_index(drop=True)
+        priority = rng.random(len(batch))
+        labels = stratum_labels(batch, stratify_by, taxi_zones_df)
+
+        counts = counts.add(pd.Series(labels).value_counts(), fill_value=0).astype(np.int64)
+        batch["_row"] = np.arange(seen, seen + len(batch))
+        batch["_stratum"] = labels
+        batch["_priority"] = priority
+        seen += len(batch)
+
+        share = n * counts / seen
+        threshold = (OVERSAMPLE * share + SIGMAS * np.sqrt(share) + SLACK) / counts
+        pool = batch if pool is None else pd.concat([pool, batch], ignore_index=True)
+        pool = pool[pool["_priority"].to_numpy() < pool["_stratum"].map(threshold).to_numpy()]
+
+    if pool is None:
+        return pd.DataFrame()
+
+    if seen > n:
+        alloc = allocate(counts, n)
+        pool = pool.sort_values("_priority", kind="stable")
+        rank = pool.groupby("_stratum", sort=False).cumcount()
+        pool = pool[rank.to_numpy() < pool["_stratum"].map(alloc).to_numpy()]
+        shortfall = n - len(pool)
+        if shortfall > 0:
+            print(f"Sample is {shortfall:,} rows short of {n:,} (sparse strata).")
+
+    pool = pool.sort_values("_row").drop(columns=["_row", "_stratum", "_priority"])
+    print(f"Sampled {len(pool):,} of {seen:,} rows (seed {seed}, stratified by {stratify_by or 'none'}, {len(counts):,} strata).")
+    return pool.reset_index(drop=True)
@@ -1,9 +1,224 @@
-import uuid
-
-def save_dataset(df):
-    filename = "yellow_tripdata_2025-07"
-    uid = uuid.uuid4().hex[:8]
-    output_path = f"../dataset/processed/{filename}_{uid}.csv"
-    df.to_csv(output_path, index=False)
-    print(f"Dataset saved to: {output_path}")
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from compact import to_output_frame
+from concurrency import save_concurrency
+from concurrency import spill_intervals
+from concurrency import trip_intervals
+from dimensions import save_dimensions
+from sketches import merge_partials
+from sketches import save_sketches
+from sketches import sketch_partials
+from validation import quarantine_path
+from validation import save_quarantine
+
+PROCESSED_DIR = "../dataset/processed"
+FORMATS = ("csv", "parquet", "arrow")
+PARTITION_SOURCE = "PickupDT"
+PARTITION_KEY = "pickup_date"
+COMPRESSION = "zstd"
+# LOAD DATA reads \N as NULL; an empty field would become 0 (or an error in strict mode).
+CSV_NULL = "\\N"
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def publish(tmp_path, final_stem, suffix):
+    """Rename a finished temp file to <stem>_<content hash><suffix>; identical reruns reuse the existing file."""
+    sha = file_sha256(tmp_path)
+    output_path = Path(f"{final_stem}_{sha[:8]}{suffix}")
+    if output_path.exists():
+        os.remove(tmp_path)
+        print(f"Unchanged, reusing: {output_path.as_posix()}")
+    else:
+        os.replace(tmp_path, output_path)
+    return output_path, sha
+
+def partition_values(df):
+    return df[PARTITION_SOURCE].dt.strftime("%Y-%m-%d").fillna("unknown")
+
+def to_table(df):
+    return pa.Table.from_pandas(to_output_frame(df), preserve_index=False)
+
+def plain_schema(schema):
+    """Arrow IPC files cannot replace dictionaries between batches, so store categories as plain strings."""
+    return pa.schema([
+        pa.field(f.name, f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+        for f in schema
+    ])
+
+def open_writer(path, schema, fmt):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, schema, compression=COMPRESSION)
+    return ipc.new_file(path, schema, options=ipc.IpcWriteOptions(compression=COMPRESSION))
+
+def save_dataset(df, filename="yellow_tripdata_2025-07", fmt="csv", quarantine=None):
+    return save_dataset_batches([df], filename, fmt, quarantine)
+
+def save_dataset_batches(batches, filename="yellow_tripdata_2025-07", fmt="csv", quarantine=None):
+    """Write the dataset and its side tables; quarantine is the list transform_batch filled (None: not written)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}', expected one of {FORMATS}.")
+    partials = []
+    with tempfile.TemporaryDirectory(dir=PROCESSED_DIR, prefix=".intervals_") as spill_dir:
+        batches = collect_side_tables(batches, spill_dir, partials)
+        output_path = save_csv(batches, filename) if fmt == "csv" else save_partitioned(batches, filename, fmt)
+        save_concurrency(output_path, spill_dir)
+    save_sketches(output_path, partials or None)
+    save_dimensions(output_path)
+    if quarantine is not None:
+        save_quarantine(output_path, quarantine)
     return output_path
+
+def collect_side_tables(batches, spill_dir, partials):
+    """Pass batches through, spilling the trip intervals of the zone concurrency sweep to spill_dir
+    and folding the partial zone sketches into partials[0], which is bounded by the number of cells."""
+    for df in batches:
+        spill_intervals(trip_intervals(df), spill_dir)
+        partial = sketch_partials(df)
+        partials[:] = [merge_partials([partials[0], partial]) if partials else partial]
+        yield df
+
+def save_csv(batches, filename):
+    tmp_path = Path(PROCESSED_DIR) / f".{filename}.csv.tmp"
+    rows = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for i, df in enumerate(batches):
+            to_output_frame(df).to_csv(f, index=False, header=(i == 0), na_rep=CSV_NULL, lineterminator="\n")
+            rows += len(df)
+    output_path, _ = publish(tmp_path, Path(PROCESSED_DIR) / filename, ".csv")
+    print(f"Dataset saved to: {output_path.as_posix()} ({rows:,} rows)")
+    return output_path.as_posix()
+
+def save_partitioned(batches, filename, fmt):
+    """Write one compressed file per pickup date plus a manifest with the partitions and row counts."""
+    dataset_dir = Path(PROCESSED_DIR) / filename
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    suffix = ".parquet" if fmt == "parquet" else ".arrow"
+
+    writers = {}
+    rows = {}
+    schema = None
+    try:
+        for df in batches:
+            table = to_table(df)
+            if schema is None:
+                schema = plain_schema(table.schema) if fmt == "arrow" else table.schema
+            keys = partition_values(df).to_numpy()
+            order = np.argsort(keys, kind="stable")
+            table = table.take(order).cast(schema)
+            keys = keys[order]
+            bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(keys)]):
+                key = keys[start]
+                if key not in writers:
+                    part_dir = dataset_dir / f"{PARTITION_KEY}={key}"
+                    part_dir.mkdir(exist_ok=True)
+                    writers[key] = (open_writer(part_dir / f".part{suffix}.tmp", schema, fmt), part_dir)
+                    rows[key] = 0
+                writers[key][0].write_table(table.slice(start, stop - start))
+                rows[key] += int(stop - start)
+    finally:
+        for writer, _ in writers.values():
+            writer.close()
+
+    partitions = []
+    for key in sorted(writers):
+        part_dir = writers[key][1]
+        output_path, sha = publish(part_dir / f".part{suffix}.tmp", part_dir / "part", suffix)
+        for stale in part_dir.glob("part_*"):
+            if stale != output_path:
+                stale.unlink()
+        partitions.append({
+            PARTITION_KEY: key,
+            "path": output_path.relative_to(dataset_dir).as_posix(),
+            "rows": rows[key],
+            "sha256": sha,
+        })
+
+    for part_dir in dataset_dir.glob(f"{PARTITION_KEY}=*"):
+        if part_dir.name.split("=", 1)[1] not in writers:
+            for stale in part_dir.iterdir():
+                stale.unlink()
+            part_dir.rmdir()
+
+    manifest = {
+        "dataset": filename,
+        "format": fmt,
+        "compression": COMPRESSION,
+        "partition_by": PARTITION_KEY,
+        "rows": sum(rows.values()),
+        "partitions": partitions,
+    }
+    manifest_path = dataset_dir / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(f"Dataset saved to: {dataset_dir.as_posix()} ({manifest['rows']:,} rows in {len(partitions)} partitions)")
+    return manifest_path.as_posix()
+
+def quarantined(output_paths):
+    """The quarantine tables written next to each per-file output."""
+    return [pd.read_parquet(quarantine_path(p)) for p in output_paths if quarantine_path(p).exists()]
+
+def consolidate(output_paths, filename, fmt="csv"):
+    """Combine per-file outputs into one dataset ready for the warehouse load."""
+    if fmt == "csv":
+        tmp_path = Path(PROCESSED_DIR) / f".{filename}.csv.tmp"
+        with open(tmp_path, "wb") as out:
+            for i, path in enumerate(output_paths):
+                with open(path, "rb") as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        out.write(chunk)
+        output_path, _ = publish(tmp_path, Path(PROCESSED_DIR) / filename, ".csv")
+        print(f"Consolidated dataset saved to: {output_path.as_posix()}")
+        save_concurrency(output_path)
+        save_sketches(output_path)
+        save_dimensions(output_path)
+        save_quarantine(output_path, quarantined(output_paths))
+        return output_path.as_posix()
+
+    dataset_dir = Path(PROCESSED_DIR) / filename
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    partitions = []
+    for path in output_paths:
+        source = json.loads(Path(path).read_text(encoding="utf-8"))
+        source_dir = Path(path).parent
+        for part in source["partitions"]:
+            part = dict(part)
+            part["path"] = os.path.relpath(source_dir / part["path"], dataset_dir).replace(os.sep, "/")
+            partitions.append(part)
+    partitions.sort(key=lambda p: p[PARTITION_KEY])
+
+    manifest = {
+        "dataset": filename,
+        "format": fmt,
+        "compression": COMPRESSION,
+        "partition_by": PARTITION_KEY,
+        "rows": sum(p["rows"] for p in partitions),
+        "sources": [Path(p).parent.name for p in output_paths],
+        "partitions": partitions,
+    }
+    manifest_path = dataset_dir / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(f"Consolidated manifest saved to: {manifest_path.as_posix()} ({manifest['rows']:,} rows)")
+    # Trips that cross midnight at a month boundary overlap the next file, so sweep the whole dataset again.
+    save_concurrency(manifest_path)
+    save_sketches(manifest_path)
+    save_dimensions(manifest_path)
+    save_quarantine(manifest_path, quarantined(output_paths))
+    return manifest_path.as_posix()
@@ -0,0 +1,207 @@
+import base64
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from compact import to_output_frame
+
+# Quantile sketches are log-bucket histograms (DDSketch): a positive value x falls in bucket
+# ceil(log(x) / log(GAMMA)), and any quantile read back from the bucket counts is within
+# RELATIVE_ACCURACY of the exact one. Values <= 0 share ZERO_BUCKET and read back as 0 (negative
+# amounts are quarantined by validation.py). Merging two sketches adds their counts, so cells
+# combine exactly into any slice. sql/queries/percentiles.py decodes the same encoding.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+ZERO_BUCKET = -32768
+# Distinct routes are counted with a HyperLogLog of 2**HLL_PRECISION registers (about 1.6% error);
+# merging takes the larger rank per register.
+HLL_PRECISION = 12
+# One Stg_ZoneSketch row per pickup date, top-of-hour PickupTimeKey and pickup zone.
+CELL_COLUMNS = ["DateKey", "PickupTimeKey", "PickupLocationKey"]
+# Stg_Trip measure -> sketch column.
+MEASURES = {"FareAmount": "FareSketch", "TripDurationMinutes": "DurationSketch", "AverageSpeedMph": "SpeedSketch"}
+# Rows read at a time when the trips are read back from a processed CSV.
+READ_CHUNK_ROWS = 1_000_000
+# Column order of dw.Stg_ZoneSketch.
+SKETCH_COLUMNS = CELL_COLUMNS + ["TripsCount"] + list(MEASURES.values()) + ["RouteHll"]
+# Encoded sketches: little-endian (bucket int16, count uint32) and (register uint16, rank uint8) pairs.
+BUCKET_DTYPE = np.dtype([("bucket", "<i2"), ("count", "<u4")])
+REGISTER_DTYPE = np.dtype([("register", "<u2"), ("rank", "u1")])
+# Bit widths of the int64 keys sketch_partials packs cells and buckets into (pickups from 1970 on),
+# so a month of merged partials costs 9 to 12 bytes per entry rather than a row of six columns.
+LOCATION_BITS = 16
+MEASURE_BITS = 2
+BUCKET_BITS = 16
+
+def sketches_path(dataset_path):
+    """<name>.sketches.csv next to a processed CSV, sketches.csv inside a manifest's dataset directory."""
+    path = Path(dataset_path)
+    if path.name == "manifest.json":
+        return path.parent / "sketches.csv"
+    return path.with_name(f"{path.stem}.sketches.csv")
+
+def bucket_index(values):
+    """Sketch bucket of each value; NaN values are dropped by the caller."""
+    positive = values > 0
+    index = np.full(len(values), ZERO_BUCKET, np.int64)
+    index[positive] = np.ceil(np.log(values[positive]) / np.log(GAMMA))
+    return index
+
+def route_hash(pickup, dropoff):
+    """splitmix64 of the (pickup, dropoff) zone pair."""
+    h = pickup.astype(np.uint64) << np.uint64(16) | dropoff.astype(np.uint64)
+    h = h + np.uint64(0x9E3779B97F4A7C15)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+def bit_length32(values):
+    """Exact bit length of uint32 values (float64 holds every one of them exactly)."""
+    return np.frexp(values.astype(np.float64))[1]
+
+def hll_registers(hashes):
+    """(register, rank) of each hash: the top HLL_PRECISION bits pick the register, the rank is the
+    position of the first 1 bit in the rest."""
+    register = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rest = hashes << np.uint64(HLL_PRECISION)
+    high = (rest >> np.uint64(32)).astype(np.uint32)
+    low = (rest & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    bits = np.where(high > 0, 32 + bit_length32(high), bit_length32(low))
+    return register, np.minimum(65 - bits, 65 - HLL_PRECISION)
+
+def cell_keys(df):
+    """Packed cell of each Stg_Trip row: (days since 1970 * 24 + pickup hour) << LOCATION_BITS | PickupLocationKey."""
+    date = df["PickupDateKey"].to_numpy(dtype=np.int64)
+    month = (date // 10000 - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (date // 100 % 100 - 1)
+    days = (month.astype("datetime64[D]") + (date % 100 - 1)).astype(np.int64)
+    hour = df["PickupTimeKey"].to_numpy(dtype=np.int64) // 60
+    return (days * 24 + hour) << LOCATION_BITS | df["PickupLocationKey"].to_numpy(dtype=np.int64)
+
+def cell_frame(cells):
+    """CELL_COLUMNS of packed cells."""
+    dates = (cells >> LOCATION_BITS) // 24
+    day = dates.astype("datetime64[D]")
+    month = day.astype("datetime64[M]")
+    return pd.DataFrame({
+        "DateKey": (month.astype("datetime64[Y]").astype(np.int64) + 1970) * 10000
+                   + (month.astype(np.int64) % 12 + 1) * 100 + (day - month).astype(np.int64) + 1,
+        "PickupTimeKey": (cells >> LOCATION_BITS) % 24 * 60,
+        "PickupLocationKey": cells & (1 << LOCATION_BITS) - 1,
+    })
+
+def combine(keys, values, ufunc):
+    """(sorted distinct keys, values reduced with ufunc per key)."""
+    if not len(keys):
+        return keys, values
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], ufunc.reduceat(values, starts, dtype=values.dtype)
+
+def merge_sorted(a, b, ufunc):
+    """Merge two (sorted distinct keys, values) pairs without re-sorting the larger one."""
+    (keys_a, values_a), (keys_b, values_b) = a, b
+    pos = np.searchsorted(keys_a, keys_b)
+    found = pos < len(keys_a)
+    found[found] = keys_a[pos[found]] == keys_b[found]
+    keys = np.insert(keys_a, pos[~found], keys_b[~found])
+    values = np.insert(values_a, pos[~found], values_b[~found])
+    at = np.searchsorted(keys, keys_b[found])
+    values[at] = ufunc(values[at], values_b[found])
+    return keys, values
+
+def sketch_partials(df):
+    """Per-cell bucket counts, HLL registers and trip counts of one batch of Stg_Trip rows.
+
+    Returned as three (packed keys, values) pairs that merge_partials combines across batches:
+    bucket counts keyed (cell << MEASURE_BITS | measure) << BUCKET_BITS | bucket - ZERO_BUCKET,
+    register ranks keyed cell << HLL_PRECISION | register, and trip counts keyed by cell.
+    """
+    cell = cell_keys(df)
+    values = to_output_frame(df[list(MEASURES)])
+    keys = []
+    for measure, column in enumerate(MEASURES):
+        v = values[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(v)
+        keys.append((cell[present] << MEASURE_BITS | measure) << BUCKET_BITS | bucket_index(v[present]) - ZERO_BUCKET)
+    keys = np.concatenate(keys)
+    buckets = combine(keys, np.ones(len(keys), np.uint32), np.add)
+
+    register, rank = hll_registers(route_hash(df["PickupLocationKey"].to_numpy(), df["DropoffLocationKey"].to_numpy()))
+    registers = combine(cell << HLL_PRECISION | register, rank.astype(np.uint8), np.maximum)
+    trips = combine(cell, np.ones(len(cell), np.int64), np.add)
+    return buckets, registers, trips
+
+def merge_partials(partials):
+    """One partial with the bucket counts and trips added up and the larger rank kept per register."""
+    merged = partials[0]
+    for partial in partials[1:]:
+        merged = tuple(merge_sorted(a, b, ufunc) for a, b, ufunc in zip(merged, partial, (np.add, np.maximum, np.add)))
+    return merged
+
+def encode(cell_of, packed, n_cells):
+    """Base64 of each cell's packed entries; cell_of is sorted and indexes the cells."""
+    bounds = np.searchsorted(cell_of, np.arange(n_cells + 1))
+    blob = packed.tobytes()
+    size = packed.dtype.itemsize
+    return [base64.b64encode(blob[a * size:b * size]).decode("ascii") for a, b in zip(bounds[:-1], bounds[1:])]
+
+def zone_sketches(partials):
+    """Stg_ZoneSketch rows: trip count, quantile sketches and route HLL per cell."""
+    if not partials:
+        return pd.DataFrame(columns=SKETCH_COLUMNS)
+    (bucket_keys, counts), (register_keys, ranks), (cells, trips) = merge_partials(partials)
+    out = cell_frame(cells)
+    out["TripsCount"] = trips
+
+    # Keys sort by cell first, so the entries of each measure come out grouped by cell and sorted.
+    measure = bucket_keys >> BUCKET_BITS & (1 << MEASURE_BITS) - 1
+    for m, column in enumerate(MEASURES.values()):
+        keys = bucket_keys[measure == m]
+        packed = np.empty(len(keys), BUCKET_DTYPE)
+        packed["bucket"] = (keys & (1 << BUCKET_BITS) - 1) + ZERO_BUCKET
+        packed["count"] = counts[measure == m]
+        out[column] = encode(np.searchsorted(cells, keys >> BUCKET_BITS + MEASURE_BITS), packed, len(out))
+
+    packed = np.empty(len(register_keys), REGISTER_DTYPE)
+    packed["register"] = register_keys & (1 << HLL_PRECISION) - 1
+    packed["rank"] = ranks
+    out["RouteHll"] = encode(np.searchsorted(cells, register_keys >> HLL_PRECISION), packed, len(out))
+    return out[SKETCH_COLUMNS]
+
+def read_sketch_batches(dataset_path, chunk_rows=READ_CHUNK_ROWS):
+    """The Stg_Trip columns sketch_partials needs, read back from a processed dataset a CSV chunk or a partition at a time."""
+    path = Path(dataset_path)
+    columns = ["PickupDateKey", "PickupTimeKey", "PickupLocationKey", "DropoffLocationKey"] + list(MEASURES)
+    if path.name != "manifest.json":
+        yield from pd.read_csv(path, usecols=columns, na_values=["\\N"], keep_default_na=False, chunksize=chunk_rows)
+        return
+
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    for part in manifest["partitions"]:
+        file = path.parent / part["path"]
+        if manifest["format"] == "parquet":
+            yield pq.read_table(file, columns=columns).to_pandas()
+        else:
+            with ipc.open_file(file) as reader:
+                yield reader.read_all().select(columns).to_pandas()
+
+def save_sketches(dataset_path, partials=None):
+    """Write the zone sketches next to a processed dataset; the trips are read back from it when partials are not given."""
+    if partials is None:
+        partials = []
+        for df in read_sketch_batches(dataset_path):
+            partial = sketch_partials(df)
+            partials[:] = [merge_partials([partials[0], partial]) if partials else partial]
+    table = zone_sketches(partials)
+    output_path = sketches_path(dataset_path)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    table.to_csv(tmp_path, index=False, lineterminator="\n")
+    os.replace(tmp_path, output_path)
+    print(f"Zone sketches saved to: {output_path.as_posix()} ({len(table):,} zone-hours)")
+    return output_path.as_posix()
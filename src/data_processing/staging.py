@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# Column order of dw.Stg_Trip (minus the surrogate StgTripId); the processed dataset is
+# written in exactly this layout so the warehouse load is a plain column-for-column copy.
+STAGE_COLUMNS = [
+    "PickupDT",
+    "DropoffDT",
+    "PickupDateKey",
+    "DropoffDateKey",
+    "PickupTimeKey",
+    "DropoffTimeKey",
+    "VendorKey",
+    "PickupLocationKey",
+    "DropoffLocationKey",
+    "RateCodeKey",
+    "PaymentTypeKey",
+    "TripCharacteristicsKey",
+    "PassengerGroupKey",
+    "PassengerCount",
+    "TripDistance",
+    "FareAmount",
+    "Extra",
+    "MtaTax",
+    "TipAmount",
+    "TollsAmount",
+    "ImprovementSurcharge",
+    "TotalAmount",
+    "CongestionSurcharge",
+    "AirportFee",
+    "CbdCongestionFee",
+    "TripDurationMinutes",
+    "AverageSpeedMph",
+    "TotalSurcharges",
+    "NetAmountExclTips",
+]
+
+STAGE_AMOUNTS = {
+    "fare_amount": "FareAmount",
+    "extra": "Extra",
+    "mta_tax": "MtaTax",
+    "tip_amount": "TipAmount",
+    "tolls_amount": "TollsAmount",
+    "improvement_surcharge": "ImprovementSurcharge",
+    "total_amount": "TotalAmount",
+    "congestion_surcharge": "CongestionSurcharge",
+    "Airport_fee": "AirportFee",
+    "cbd_congestion_fee": "CbdCongestionFee",
+}
+
+# Keys resolved by transform_dataset.transform_batch, under their Stg_Trip names.
+STAGE_KEYS = {
+    "VendorID": "VendorKey",
+    "PULocationID": "PickupLocationKey",
+    "DOLocationID": "DropoffLocationKey",
+    "RatecodeID": "RateCodeKey",
+    "payment_type": "PaymentTypeKey",
+}
+
+SURCHARGE_COLUMNS = ["Extra", "MtaTax", "TollsAmount", "ImprovementSurcharge", "CongestionSurcharge", "AirportFee", "CbdCongestionFee"]
+
+def date_key(ts):
+    return (ts.dt.year * 10000 + ts.dt.month * 100 + ts.dt.day).astype("Int32")
+
+def time_key(ts):
+    return (ts.dt.hour * 60 + ts.dt.minute).astype("Int16")
+
+def category_mask(series, predicate):
+    """Evaluate a string predicate once per category instead of once per row."""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    per_category = np.append(predicate(pd.Series(series.cat.categories, dtype="string")).fillna(False).to_numpy(bool), False)
+    return per_category[series.cat.codes.to_numpy()]
+
+def passenger_group_key(count):
+    """Dim_PassengerGroup keys: 1 P1, 2 P2, 3 P3_4, 4 P5plus, 5 UNK."""
+    values = count.astype("float64").to_numpy()
+    return np.select(
+        [values == 1, values == 2, (values == 3) | (values == 4), values >= 5],
+        [1, 2, 3, 4],
+        default=5,
+    ).astype(np.int8)
+
+def trip_characteristics_key(store_and_forward, airport, cbd, congestion):
+    """Dim_TripCharacteristics key of a flag combination; all 16 are members, so it is pure arithmetic."""
+    return (1 + 8 * store_and_forward + 4 * airport + 2 * cbd + congestion).astype(np.int8)
+
+def round_div(numerator, denominator):
+    """Integer division rounded half away from zero, i.e. MySQL DECIMAL ROUND()."""
+    return np.sign(numerator) * ((np.abs(numerator) * 2 + denominator) // (2 * denominator))
+
+def to_stage_frame(df):
+    """Derive every Stg_Trip column with vectorized operations; dimension references are already integer keys."""
+    pickup = df["tpep_pickup_datetime"].dt.floor("s")
+    dropoff = df["tpep_dropoff_datetime"].dt.floor("s")
+    cents = {stage: df[raw].fillna(0).astype("int64").to_numpy() for raw, stage in STAGE_AMOUNTS.items()}
+
+    out = pd.DataFrame(index=df.index)
+    out["PickupDT"] = pickup
+    out["DropoffDT"] = dropoff
+    out["PickupDateKey"] = date_key(pickup)
+    out["DropoffDateKey"] = date_key(dropoff)
+    out["PickupTimeKey"] = time_key(pickup)
+    out["DropoffTimeKey"] = time_key(dropoff)
+    for raw, stage in STAGE_KEYS.items():
+        out[stage] = df[raw].to_numpy()
+
+    flag = category_mask(df["store_and_fwd_flag"], lambda c: c.str.strip().str.upper().isin(["Y", "YES", "TRUE", "1"]))
+    is_airport = (cents["AirportFee"] > 0) | df["PUIsAirportZone"].to_numpy()
+    out["TripCharacteristicsKey"] = trip_characteristics_key(
+        flag, is_airport, cents["CbdCongestionFee"] > 0, cents["CongestionSurcharge"] > 0
+    )
+    out["PassengerGroupKey"] = passenger_group_key(df["passenger_count"])
+    out["PassengerCount"] = df["passenger_count"]
+    out["TripDistance"] = df["trip_distance"].fillna(0.0)
+
+    for stage in STAGE_AMOUNTS.values():
+        out[stage] = pd.array(cents[stage], dtype="Int32")
+
+    # TIMESTAMPDIFF(SECOND, ...) / 60.0 rounded to 2 places, kept exact as integer hundredths.
+    seconds = (dropoff - pickup).dt.total_seconds()
+    valid = seconds.notna().to_numpy()
+    secs = seconds.fillna(0).to_numpy().astype(np.int64)
+    duration = round_div(secs * 100, 60) / 100
+    out["TripDurationMinutes"] = pd.array(np.where(valid, duration, np.nan), dtype="Float64")
+
+    # MySQL evaluates seconds/3600.0 as a DECIMAL with 4 places before the double division,
+    # then ROUND(double, 3) rounds half to even like np.round.
+    hours = round_div(secs * 10000, 3600) / 10000
+    moving = valid & (secs > 0)
+    distance = out["TripDistance"].to_numpy(dtype=np.float64)
+    speed = np.round(np.divide(distance, hours, out=np.zeros_like(distance), where=moving), 3)
+    out["AverageSpeedMph"] = pd.array(np.where(moving, speed, np.nan), dtype="Float64")
+
+    out["TotalSurcharges"] = pd.array(sum(cents[c] for c in SURCHARGE_COLUMNS), dtype="Int32")
+    out["NetAmountExclTips"] = pd.array(cents["TotalAmount"] - cents["TipAmount"], dtype="Int32")
+    return out[STAGE_COLUMNS]
@@ -1,87 +1,144 @@
+from read_dataset import PARQUET_PATH
 from read_dataset import load_parquet
+from read_dataset import iter_parquet_batches
 from read_dataset import load_taxi_zones
+from read_dataset import airport_locations
+from read_dataset import build_zone_lookup
+from read_dataset import location_keys
+from compact import code_to_key
+from compact import compact_frame
+from compact import report_memory
+from sampling import DEFAULT_SEED
+from sampling import sample_batches
+from staging import to_stage_frame
+from validation import rule_counts
+from validation import validate
 
-def transform_dataset(limit = 15000):
-    df = load_parquet()
-
-    if len(df) > limit:
-        df = df.sample(n=limit)
-        print(f"Trimmed dataset to {len(df):,} rows.")
-        
-    before_drop = len(df)
-    df = df.dropna(subset=["passenger_count"])
-    dropped = before_drop - len(df)
-    if dropped > 0:
-        print(f"Dropped {dropped:,} rows with null 'passenger_count'.")
-
-    ratecode_map = {
-        1: "Standard rate",
-        2: "JFK",
-        3: "Newark",
-        4: "Nassau or Westchester",
-        5: "Negotiated fare",
-        6: "Group ride",
-        99: "Null/unknown",
-    }
+RATECODE_MAP = {
+    1: "Standard rate",
+    2: "JFK",
+    3: "Newark",
+    4: "Nassau or Westchester",
+    5: "Negotiated fare",
+    6: "Group ride",
+    99: "Null/unknown",
+}
+
+PAYMENT_TYPE_MAP = {
+    0: "Flex Fare trip",
+    1: "Credit card",
+    2: "Cash",
+    3: "No charge",
+    4: "Dispute",
+    5: "Unknown",
+    6: "Voided trip",
+}
+
+VENDOR_ID_MAP = {
+    1: "Creative Mobile Technologies, LLC",
+    2: "Curb Mobility, LLC",
+    7: "Helix"
+}
+
+# The TLC codes double as dimension keys; codes outside the maps go to these members.
+UNKNOWN_RATECODE = 99
+UNKNOWN_PAYMENT_TYPE = 5
+UNKNOWN_VENDOR_ID = 0
+
+CODE_MAPS = {"RatecodeID": RATECODE_MAP, "payment_type": PAYMENT_TYPE_MAP, "VendorID": VENDOR_ID_MAP}
+
+def validate_batch(df, zone_lookup, verbose=True, quarantine=None):
+    """The rows of a raw TLC batch that pass validation; rejected rows are appended to quarantine."""
+    df, rejected = validate(df, zone_lookup, CODE_MAPS)
+    if quarantine is not None:
+        quarantine.append(rejected)
+    if verbose and len(rejected) > 0:
+        failed = ", ".join(f"{code} {n:,}" for code, n in rule_counts(rejected["RejectMask"]).items() if n)
+        print(f"Quarantined {len(rejected):,} rows ({failed}).")
+    return df
+
+def transform_batch(df, zone_lookup, verbose=True, quarantine=None, validated=False):
+    """Validate and transform a raw TLC batch into Stg_Trip rows; rejected rows are appended to quarantine.
+
+    With validated=True the batch already went through validate_batch and is only transformed.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    if not validated:
+        df = validate_batch(df, zone_lookup, verbose, quarantine)
 
     if "RatecodeID" in df.columns:
-        df["RatecodeID"] = df["RatecodeID"].map(ratecode_map).astype(str)
-        print("Converted 'RatecodeID' to descriptive strings.")
+        df["RatecodeID"] = code_to_key(df["RatecodeID"], RATECODE_MAP, UNKNOWN_RATECODE)
+        log("Resolved 'RatecodeID' to Dim_RateCode keys.")
 
     if "store_and_fwd_flag" in df.columns:
-        df["store_and_fwd_flag"] = df["store_and_fwd_flag"].fillna("N").astype(str)
-
-    payment_type_map = {
-        0: "Flex Fare trip",
-        1: "Credit card",
-        2: "Cash",
-        3: "No charge",
-        4: "Dispute",
-        5: "Unknown",
-        6: "Voided trip",
-    }
+        df["store_and_fwd_flag"] = df["store_and_fwd_flag"].fillna("N").astype("category")
 
     if "payment_type" in df.columns:
-        df["payment_type"] = df["payment_type"].astype(int, errors="ignore").map(payment_type_map).astype(str)
-        print("Converted 'payment_type' to descriptive strings.")
-        
-    vendor_id_map = {
-        1: "Creative Mobile Technologies, LLC",
-        2: "Curb Mobility, LLC",
-        7: "Helix"
-    }
-    
+        df["payment_type"] = code_to_key(df["payment_type"], PAYMENT_TYPE_MAP, UNKNOWN_PAYMENT_TYPE)
+        log("Resolved 'payment_type' to Dim_PaymentType keys.")
+
     if "VendorID" in df.columns:
-        df["VendorID"] = df["VendorID"].astype(int, errors="ignore").map(vendor_id_map).astype(str)
-        print("Converted 'vendor_id' to descriptive strings.")
-        
-    taxi_zones_df = load_taxi_zones()
-    
+        df["VendorID"] = code_to_key(df["VendorID"], VENDOR_ID_MAP, UNKNOWN_VENDOR_ID)
+        log("Resolved 'VendorID' to Dim_Vendor keys.")
+
     if "PULocationID" in df.columns:
-        pu = taxi_zones_df.loc[:, ["LocationID", "Borough", "Zone", "service_zone"]].rename(
-            columns={
-                "LocationID": "PULocationID",
-                "Borough": "PU_Borough",
-                "Zone": "PU_Zone",
-                "service_zone": "PU_Service_zone",
-            }
-        )
-        df = df.merge(pu, how="left", on="PULocationID")
-        print("Merged pickup location zones.")
+        df["PULocationID"] = location_keys(df["PULocationID"], zone_lookup)
+        df["PUIsAirportZone"] = airport_locations(zone_lookup)[df["PULocationID"].to_numpy()]
+        log("Resolved pickup locations to Dim_Location keys.")
 
     if "DOLocationID" in df.columns:
-        do = taxi_zones_df.loc[:, ["LocationID", "Borough", "Zone", "service_zone"]].rename(
-            columns={
-                "LocationID": "DOLocationID",
-                "Borough": "DO_Borough",
-                "Zone": "DO_Zone",
-                "service_zone": "DO_Service_zone",
-            }
-        )
-        df = df.merge(do, how="left", on="DOLocationID")
-        print("Merged dropoff location zones.")
-
-    df = df.drop(columns=["PULocationID", "DOLocationID"], errors="ignore")    
-    
+        df["DOLocationID"] = location_keys(df["DOLocationID"], zone_lookup)
+        log("Resolved dropoff locations to Dim_Location keys.")
+
+    df = to_stage_frame(compact_frame(df))
+    log("Derived Stg_Trip columns (date/time keys, characteristics, duration, speed, surcharges).")
+    return df
+
+def transform_dataset(limit=15000, file_path=PARQUET_PATH, seed=DEFAULT_SEED, stratify_by="date", batch_size=250_000,
+                      taxi_zones_df=None, quarantine=None):
+    if taxi_zones_df is None:
+        taxi_zones_df = load_taxi_zones()
+
+    zone_lookup = build_zone_lookup(taxi_zones_df)
+    if limit is None:
+        df = load_parquet(file_path)
+        validated = False
+    else:
+        # Rows are validated before they are sampled, so the sample holds `limit` clean trips
+        # spread over the strata of the clean rows; the quarantine gets every rejected row of the file.
+        batches = (validate_batch(batch, zone_lookup, verbose=False, quarantine=quarantine)
+                   for batch in iter_parquet_batches(file_path, batch_size=batch_size))
+        df = sample_batches(batches, limit, seed=seed, stratify_by=stratify_by, taxi_zones_df=taxi_zones_df)
+        validated = True
+        if quarantine:
+            rejected = sum(len(r) for r in quarantine)
+            print(f"Quarantined {rejected:,} rows before sampling.")
+    report_memory("read", df)
+
+    df = transform_batch(df, zone_lookup, quarantine=quarantine, validated=validated)
+    report_memory("transform", df)
+
     print(f"Final dataset shape: {df.shape[0]:,} rows × {df.shape[1]} columns.")
     return df
+
+def transform_dataset_streaming(file_path=PARQUET_PATH, batch_size=250_000, taxi_zones_df=None, quarantine=None):
+    """Yield transformed batches so peak memory is bounded by the batch size, not the file."""
+    if taxi_zones_df is None:
+        taxi_zones_df = load_taxi_zones()
+    zone_lookup = build_zone_lookup(taxi_zones_df)
+
+    rows_in = 0
+    rows_out = 0
+    for i, batch in enumerate(iter_parquet_batches(file_path, batch_size=batch_size), start=1):
+        rows_in += len(batch)
+        if i == 1:
+            report_memory("read (per batch)", batch)
+        batch = transform_batch(batch, zone_lookup, verbose=False, quarantine=quarantine)
+        if i == 1:
+            report_memory("transform (per batch)", batch)
+        rows_out += len(batch)
+        print(f"Batch {i}: {rows_in:,} rows read, {rows_out:,} rows transformed.")
+        yield batch
+
+    print(f"Final dataset: {rows_out:,} rows ({rows_in - rows_out:,} quarantined).")
@@ -0,0 +1,118 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from compact import AMOUNT_COLUMNS
+
+# Upper bounds of a plausible yellow cab trip; anything beyond is a meter or GPS fault.
+MAX_TRIP_MILES = 250
+MAX_SPEED_MPH = 100
+
+def seconds(df, column):
+    """Timestamps truncated to the second, as Stg_Trip stores them."""
+    return df[column].dt.floor("s")
+
+def trip_hours(df):
+    return (seconds(df, "tpep_dropoff_datetime") - seconds(df, "tpep_pickup_datetime")).dt.total_seconds().to_numpy() / 3600
+
+def unknown_code(series, codes):
+    """Present but outside the TLC code list; a missing code is kept and keyed to the unknown member."""
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    return ~np.isnan(values) & ~np.isin(values, np.array(list(codes), dtype="float64"))
+
+def unknown_location(series, zone_lookup):
+    codes = zone_lookup["Borough"][0]
+    ids = series.to_numpy(dtype="float64", na_value=np.nan)
+    present = ~np.isnan(ids)
+    known = np.zeros(len(ids), bool)
+    in_range = present & (ids >= 0) & (ids < len(codes))
+    known[in_range] = codes[ids[in_range].astype(np.int64)] >= 0
+    return present & ~known
+
+def too_fast(df):
+    hours = trip_hours(df)
+    moving = np.nan_to_num(hours) > 0
+    speed = np.divide(df["trip_distance"].to_numpy(dtype="float64", na_value=0.0), hours, out=np.zeros(len(df)), where=moving)
+    return speed > MAX_SPEED_MPH
+
+# Rejection rules, checked in this order over the raw TLC columns: (reason code, description, rows that fail).
+# A rule's position is its bit in RejectMask, so new rules go at the end.
+RULES = [
+    ("pickup_missing", "tpep_pickup_datetime is null",
+     lambda df, refs: df["tpep_pickup_datetime"].isna().to_numpy()),
+    ("dropoff_missing", "tpep_dropoff_datetime is null",
+     lambda df, refs: df["tpep_dropoff_datetime"].isna().to_numpy()),
+    ("dropoff_not_after_pickup", "dropoff is not after pickup (to the second)",
+     lambda df, refs: (seconds(df, "tpep_pickup_datetime") >= seconds(df, "tpep_dropoff_datetime")).to_numpy()),
+    ("passenger_count_missing", "passenger_count is null",
+     lambda df, refs: df["passenger_count"].isna().to_numpy()),
+    ("negative_amount", "a fare, fee, tip, toll or total below zero",
+     lambda df, refs: np.logical_or.reduce([(df[c] < 0).to_numpy() for c in AMOUNT_COLUMNS if c in df.columns])),
+    ("distance_out_of_range", f"trip_distance below 0 or above {MAX_TRIP_MILES} miles",
+     lambda df, refs: ((df["trip_distance"] < 0) | (df["trip_distance"] > MAX_TRIP_MILES)).to_numpy()),
+    ("speed_out_of_range", f"average speed above {MAX_SPEED_MPH} mph",
+     lambda df, refs: too_fast(df)),
+    ("unknown_vendor", "VendorID is not a TLC vendor code",
+     lambda df, refs: unknown_code(df["VendorID"], refs["code_maps"]["VendorID"])),
+    ("unknown_rate_code", "RatecodeID is not a TLC rate code",
+     lambda df, refs: unknown_code(df["RatecodeID"], refs["code_maps"]["RatecodeID"])),
+    ("unknown_payment_type", "payment_type is not a TLC payment type",
+     lambda df, refs: unknown_code(df["payment_type"], refs["code_maps"]["payment_type"])),
+    ("unknown_location", "PULocationID or DOLocationID is not in taxi_zone_lookup.csv",
+     lambda df, refs: unknown_location(df["PULocationID"], refs["zone_lookup"]) | unknown_location(df["DOLocationID"], refs["zone_lookup"])),
+]
+REASON_CODES = [code for code, _, _ in RULES]
+
+def validate(df, zone_lookup, code_maps):
+    """Split a raw TLC batch into (clean rows, quarantined rows).
+
+    Quarantined rows keep their raw columns plus RejectMask (one bit per failed rule)
+    and RejectReason (the first rule they failed).
+    """
+    refs = {"zone_lookup": zone_lookup, "code_maps": code_maps}
+    mask = np.zeros(len(df), np.uint16)
+    reason = np.full(len(df), -1, np.int8)
+    for bit, (_, _, check) in enumerate(RULES):
+        failed = np.asarray(check(df, refs), dtype=bool)
+        mask |= failed.astype(np.uint16) << bit
+        reason[failed & (reason < 0)] = bit
+
+    bad = mask != 0
+    rejected = df[bad].copy()
+    rejected["RejectMask"] = mask[bad]
+    rejected["RejectReason"] = pd.Categorical.from_codes(reason[bad], categories=REASON_CODES)
+    return df[~bad], rejected
+
+def rule_counts(masks):
+    """Rows failing each rule; a row that breaks several rules counts under each."""
+    masks = np.asarray(masks, dtype=np.uint16)
+    return {code: int(((masks >> bit) & 1).sum()) for bit, code in enumerate(REASON_CODES)}
+
+def quarantine_path(dataset_path):
+    """<name>.quarantine.parquet next to a processed CSV, quarantine.parquet inside a manifest's dataset directory."""
+    path = Path(dataset_path)
+    if path.name == "manifest.json":
+        return path.parent / "quarantine.parquet"
+    return path.with_name(f"{path.stem}.quarantine.parquet")
+
+def save_quarantine(dataset_path, rejected):
+    """Write the quarantined rows and a per-rule summary (<...>.quarantine.json) next to a processed dataset."""
+    table = pd.concat(rejected, ignore_index=True) if rejected else pd.DataFrame({"RejectMask": pd.array([], dtype="uint16")})
+    output_path = quarantine_path(dataset_path)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    table.to_parquet(tmp_path, index=False, compression="zstd")
+    os.replace(tmp_path, output_path)
+
+    counts = rule_counts(table["RejectMask"].to_numpy())
+    summary = {
+        "rows": len(table),
+        "rules": {code: {"description": description, "bit": bit, "rows": counts[code]} for bit, (code, description, _) in enumerate(RULES)},
+    }
+    summary_path = output_path.with_suffix(".json")
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    failed = ", ".join(f"{code} {n:,}" for code, n in counts.items() if n)
+    print(f"Quarantine saved to: {output_path.as_posix()} ({len(table):,} rows{': ' + failed if failed else ''})")
+    return output_path.as_posix()
@@ -1,11 +1,37 @@
+param(
+  [switch]$Incremental,
+  [switch]$Rollback,
+  [string]$Dataset
+)
+
 $ErrorActionPreference = "Stop"
 
 docker compose up -d mysql adminer
 
-Get-Content -Raw ".\sql\etl.sql" |
-  docker exec -i feup_aid_mysql mysql --local-infile=1 --protocol=tcp -h 127.0.0.1 -uroot -proot dw
+# etl.sql rebuilds everything; -Incremental merges the processed file into the
+# existing warehouse (refused if that file is already loaded); -Rollback undoes the
+# latest load batch. -Dataset picks the file in dataset\processed (default: the newest).
+$script = if ($Rollback) { "etl_rollback.sql" } elseif ($Incremental) { "etl_incremental.sql" } else { "etl.sql" }
+
+$sql = Get-Content -Raw ".\sql\$script"
+if (-not $Rollback) {
+  # etl_load.sql names its input {dataset}; fill in the processed CSV to load (default: the newest).
+  if (-not $Dataset) {
+    $Dataset = Get-ChildItem ".\dataset\processed\*.csv" |
+      Where-Object { $_.Name -notmatch '\.(concurrency|sketches)\.csv$' } |
+      Sort-Object LastWriteTime -Descending | Select-Object -First 1 -ExpandProperty Name
+  }
+  if (-not $Dataset) { throw "No processed CSV in dataset\processed; run data_processing/main.py first." }
+  $load = (Get-Content -Raw ".\sql\etl_load.sql").Replace("{dataset}", [IO.Path]::GetFileNameWithoutExtension($Dataset))
+  $sql = $sql.Replace("SOURCE /sql/etl_load.sql;", $load)
+  Write-Host "Loading $Dataset"
+}
+
+$sql | docker exec -i feup_aid_mysql mysql --local-infile=1 --protocol=tcp -h 127.0.0.1 -uroot -proot dw
 
-Write-Host "ETL finished."
+Write-Host "ETL finished ($script)."
 Write-Host "Adminer: http://localhost:8080 (Server=mysql, User=root, Pass=root, DB=dw)"
 
-docker compose run --rm query_runner
\ No newline at end of file
+if (-not $Rollback) {
+  docker compose run --rm query_runner
+}
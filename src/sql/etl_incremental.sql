@@ -0,0 +1,6 @@
+-- Incremental ETL run: load the new processed file into Stg_Trip and merge it into
+-- the existing warehouse (tables must exist from a previous full run of etl.sql).
+-- A failed or unwanted batch is undone with etl_rollback.sql.
+SOURCE /sql/etl_staging.sql;
+SOURCE /sql/etl_load.sql;
+SOURCE /sql/etl_warehouse.sql;
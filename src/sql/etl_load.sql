@@ -0,0 +1,72 @@
+USE dw;
+
+-- {dataset} is the processed CSV's name without .csv; run_etl.ps1 fills it in (-Dataset,
+-- default: the newest processed CSV) before piping the script to the mysql client.
+SET @load_source := '{dataset}.csv';
+
+-- Load the processed CSV directly into Stg_Trip.
+-- Every derived column and dimension key is computed by data_processing, so this is a plain
+-- column-for-column bulk copy (NULLs are written as \N).
+LOAD DATA LOCAL INFILE '/data/{dataset}.csv'
+INTO TABLE Stg_Trip
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+LINES TERMINATED BY '\n'
+IGNORE 1 LINES
+(PickupDT, DropoffDT, PickupDateKey, DropoffDateKey, PickupTimeKey, DropoffTimeKey,
+ VendorKey, PickupLocationKey, DropoffLocationKey, RateCodeKey, PaymentTypeKey,
+ TripCharacteristicsKey, PassengerGroupKey, PassengerCount, TripDistance,
+ FareAmount, Extra, MtaTax, TipAmount, TollsAmount, ImprovementSurcharge, TotalAmount,
+ CongestionSurcharge, AirportFee, CbdCongestionFee,
+ TripDurationMinutes, AverageSpeedMph, TotalSurcharges, NetAmountExclTips);
+
+LOAD DATA LOCAL INFILE '/data/{dataset}.concurrency.csv'
+INTO TABLE Stg_ZoneConcurrency
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+LINES TERMINATED BY '\n'
+IGNORE 1 LINES
+(DateKey, TimeKey, VendorKey, PickupLocationKey, OpenTrips, MaxOpenTrips);
+
+LOAD DATA LOCAL INFILE '/data/{dataset}.sketches.csv'
+INTO TABLE Stg_ZoneSketch
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+LINES TERMINATED BY '\n'
+IGNORE 1 LINES
+(DateKey, PickupTimeKey, PickupLocationKey, TripsCount, @fare, @duration, @speed, @routes)
+SET FareSketch = FROM_BASE64(@fare), DurationSketch = FROM_BASE64(@duration),
+    SpeedSketch = FROM_BASE64(@speed), RouteHll = FROM_BASE64(@routes);
+
+-- The dimension members the keys above refer to (data_processing/dimensions.py).
+LOAD DATA LOCAL INFILE '/data/{dataset}.dimensions/Dim_Vendor.csv'
+INTO TABLE Stg_Vendor
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+LINES TERMINATED BY '\n'
+IGNORE 1 LINES
+(VendorKey, VendorCode, VendorName);
+
+LOAD DATA LOCAL INFILE '/data/{dataset}.dimensions/Dim_Location.csv'
+INTO TABLE Stg_Location
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+LINES TERMINATED BY '\n'
+IGNORE 1 LINES
+(LocationKey, LocationID, Borough, Zone, ServiceZone, IsAirport, IsCBD);
+
+LOAD DATA LOCAL INFILE '/data/{dataset}.dimensions/Dim_RateCode.csv'
+INTO TABLE Stg_RateCode
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+LINES TERMINATED BY '\n'
+IGNORE 1 LINES
+(RateCodeKey, RateCodeDesc);
+
+LOAD DATA LOCAL INFILE '/data/{dataset}.dimensions/Dim_PaymentType.csv'
+INTO TABLE Stg_PaymentType
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+LINES TERMINATED BY '\n'
+IGNORE 1 LINES
+(PaymentTypeKey, PaymentTypeDesc);
+
+LOAD DATA LOCAL INFILE '/data/{dataset}.dimensions/Dim_TripCharacteristics.csv'
+INTO TABLE Stg_TripCharacteristics
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+LINES TERMINATED BY '\n'
+IGNORE 1 LINES
+(TripCharacteristicsKey, StoreAndForwardFlagBool, IsAirportTrip, IsCBDTrip, IsCongestionSurcharge);
@@ -0,0 +1,133 @@
+USE dw;
+
+-- Recompute the summary rows touched by the cells listed in Etl_AffectedCell from Fact_Trip.
+-- Rows that no longer have trips (after a rollback) are simply removed.
+
+-- Concurrency was swept per batch at load time. Open trips at a bucket start add up across
+-- batches, but the peaks do not: two batches peaking at different minutes overlap less than
+-- the sum of their peaks. So the peak of a cell with rows from more than one batch (typically
+-- the first day of a month, with trips still open from the month before) is swept again from
+-- its Fact_Trip rows; every other cell keeps the MaxOpenTrips of its only batch. Trips open on
+-- the cell's day were picked up at most the longest trip of any batch earlier.
+SET @span_days := (
+  SELECT COALESCE(CEIL(MAX(MaxTripMinutes) / 1440), 0) FROM Etl_LoadBatch WHERE Status <> 'rolled_back'
+);
+
+DELETE FROM Etl_CellPeak;
+
+INSERT INTO Etl_CellPeak (DateKey, VendorKey, PickupLocationKey, MaxOpenTrips)
+WITH shared AS (
+  SELECT z.DateKey, z.VendorKey, z.PickupLocationKey,
+         CAST(DATE_FORMAT(STR_TO_DATE(z.DateKey, '%Y%m%d') - INTERVAL @span_days DAY, '%Y%m%d') AS UNSIGNED) AS FirstPickupDateKey
+  FROM Fact_ZoneConcurrency z
+  JOIN Etl_AffectedCell c
+    ON c.DateKey = z.DateKey AND c.VendorKey = z.VendorKey AND c.PickupLocationKey = z.PickupLocationKey
+  GROUP BY z.DateKey, z.VendorKey, z.PickupLocationKey
+  HAVING COUNT(DISTINCT z.LoadBatchId) > 1
+),
+events AS (
+  -- +1 at the pickup minute (0 if picked up on an earlier day), -1 after the dropoff minute,
+  -- the same open interval as data_processing/concurrency.py.
+  SELECT s.DateKey, s.VendorKey, s.PickupLocationKey,
+         IF(f.PickupDateKey < s.DateKey, 0, f.PickupTimeKey) AS Minute, 1 AS Delta
+  FROM shared s
+  JOIN Fact_Trip f
+    ON f.PickupDateKey BETWEEN s.FirstPickupDateKey AND s.DateKey
+   AND f.PickupLocationKey = s.PickupLocationKey AND f.VendorKey = s.VendorKey
+   AND f.DropoffDateKey >= s.DateKey
+  UNION ALL
+  SELECT s.DateKey, s.VendorKey, s.PickupLocationKey, f.DropoffTimeKey + 1, -1
+  FROM shared s
+  JOIN Fact_Trip f
+    ON f.PickupDateKey BETWEEN s.FirstPickupDateKey AND s.DateKey
+   AND f.PickupLocationKey = s.PickupLocationKey AND f.VendorKey = s.VendorKey
+   AND f.DropoffDateKey = s.DateKey
+),
+levels AS (
+  SELECT DateKey, VendorKey, PickupLocationKey,
+         SUM(SUM(Delta)) OVER (PARTITION BY DateKey, VendorKey, PickupLocationKey ORDER BY Minute) AS OpenTrips
+  FROM events
+  GROUP BY DateKey, VendorKey, PickupLocationKey, Minute
+)
+SELECT DateKey, VendorKey, PickupLocationKey, MAX(OpenTrips)
+FROM levels
+GROUP BY DateKey, VendorKey, PickupLocationKey;
+
+DELETE d
+FROM Fact_Daily_ZoneVendor d
+JOIN Etl_AffectedCell c
+  ON c.DateKey = d.DateKey AND c.VendorKey = d.VendorKey AND c.PickupLocationKey = d.PickupLocationKey;
+
+INSERT INTO Fact_Daily_ZoneVendor
+  (DateKey, VendorKey, PickupLocationKey,
+   TripsCount, TotalTripDistance, TotalFareAmount, TotalTotalAmount,
+   TotalTipAmount, TotalTollsAmount, TotalDurationMinutes,
+   MaxSimultaneousTrips, OpenTripsAtPeakHourMorning, OpenTripsAtPeakHourNight)
+SELECT
+  b.DateKey, b.VendorKey, b.PickupLocationKey,
+  b.TripsCount, b.TotalTripDistance, b.TotalFareAmount, b.TotalTotalAmount,
+  b.TotalTipAmount, b.TotalTollsAmount, b.TotalDurationMinutes,
+  COALESCE(o.MaxSimultaneousTrips,0) AS MaxSimultaneousTrips,
+  COALESCE(o.OpenTripsAt09,0)        AS OpenTripsAtPeakHourMorning,
+  COALESCE(o.OpenTripsAt18,0)        AS OpenTripsAtPeakHourNight
+FROM
+  (
+    SELECT
+      f.PickupDateKey AS DateKey,
+      f.VendorKey,
+      f.PickupLocationKey,
+      COUNT(*) AS TripsCount,
+      SUM(f.TripDistance) AS TotalTripDistance,
+      SUM(f.FareAmount) AS TotalFareAmount,
+      SUM(f.TotalAmount) AS TotalTotalAmount,
+      SUM(f.TipAmount) AS TotalTipAmount,
+      SUM(f.TollsAmount) AS TotalTollsAmount,
+      SUM(f.TripDurationMinutes) AS TotalDurationMinutes
+    FROM Fact_Trip f
+    JOIN Etl_AffectedCell c
+      ON c.DateKey = f.PickupDateKey AND c.VendorKey = f.VendorKey AND c.PickupLocationKey = f.PickupLocationKey
+    GROUP BY f.PickupDateKey, f.VendorKey, f.PickupLocationKey
+  ) b
+LEFT JOIN
+  (
+    SELECT
+      z.DateKey, z.VendorKey, z.PickupLocationKey,
+      COALESCE(MAX(p.MaxOpenTrips), MAX(z.MaxOpenTrips)) AS MaxSimultaneousTrips,
+      SUM(CASE WHEN z.TimeKey = 540 THEN z.OpenTrips ELSE 0 END) AS OpenTripsAt09,
+      SUM(CASE WHEN z.TimeKey = 1080 THEN z.OpenTrips ELSE 0 END) AS OpenTripsAt18
+    FROM Fact_ZoneConcurrency z
+    JOIN Etl_AffectedCell c
+      ON c.DateKey = z.DateKey AND c.VendorKey = z.VendorKey AND c.PickupLocationKey = z.PickupLocationKey
+    LEFT JOIN Etl_CellPeak p
+      ON p.DateKey = z.DateKey AND p.VendorKey = z.VendorKey AND p.PickupLocationKey = z.PickupLocationKey
+    GROUP BY z.DateKey, z.VendorKey, z.PickupLocationKey
+  ) o
+  ON o.DateKey=b.DateKey AND o.VendorKey=b.VendorKey AND o.PickupLocationKey=b.PickupLocationKey;
+
+-- Hourly rows are keyed by zone and payment type, so every (DateKey, PickupLocationKey)
+-- of an affected cell is rebuilt, whatever the vendor.
+DELETE h
+FROM Fact_Hourly_ZonePayment h
+JOIN (SELECT DISTINCT DateKey, PickupLocationKey FROM Etl_AffectedCell) c
+  ON c.DateKey = h.DateKey AND c.PickupLocationKey = h.PickupLocationKey;
+
+INSERT INTO Fact_Hourly_ZonePayment
+  (DateKey, PickupTimeKey, PickupLocationKey, PaymentTypeKey,
+   TripsCount, TotalTripDistance, TotalFareAmount, TotalTotalAmount,
+   TotalTipAmount, TotalTollsAmount, TotalDurationMinutes)
+SELECT
+  f.PickupDateKey,
+  (f.PickupTimeKey DIV 60) * 60 AS PickupTimeKey,
+  f.PickupLocationKey,
+  f.PaymentTypeKey,
+  COUNT(*),
+  SUM(f.TripDistance),
+  SUM(f.FareAmount),
+  SUM(f.TotalAmount),
+  SUM(f.TipAmount),
+  SUM(f.TollsAmount),
+  SUM(f.TripDurationMinutes)
+FROM Fact_Trip f
+JOIN (SELECT DISTINCT DateKey, PickupLocationKey FROM Etl_AffectedCell) c
+  ON c.DateKey = f.PickupDateKey AND c.PickupLocationKey = f.PickupLocationKey
+GROUP BY f.PickupDateKey, (f.PickupTimeKey DIV 60) * 60, f.PickupLocationKey, f.PaymentTypeKey;
@@ -0,0 +1,68 @@
+USE dw;
+
+-- Undo one load batch: @rollback_batch if set, otherwise the latest batch that
+-- was not rolled back yet (typically a load that failed half way).
+SET @load_batch := COALESCE(
+  @rollback_batch,
+  (SELECT MAX(LoadBatchId) FROM Etl_LoadBatch WHERE Status <> 'rolled_back')
+);
+
+DELETE FROM Etl_AffectedCell;
+
+INSERT INTO Etl_AffectedCell (DateKey, VendorKey, PickupLocationKey)
+SELECT PickupDateKey, VendorKey, PickupLocationKey
+FROM Fact_Trip
+WHERE LoadBatchId = @load_batch
+UNION
+SELECT DateKey, VendorKey, PickupLocationKey
+FROM Fact_ZoneConcurrency
+WHERE LoadBatchId = @load_batch;
+
+DELETE FROM Fact_Trip
+WHERE LoadBatchId = @load_batch;
+
+DELETE FROM Fact_ZoneConcurrency
+WHERE LoadBatchId = @load_batch;
+
+DELETE FROM Fact_Hourly_ZoneSketch
+WHERE LoadBatchId = @load_batch;
+
+SOURCE /sql/etl_refresh_summaries.sql;
+
+-- Members first seen in this batch, unless a later batch uses them too.
+DELETE FROM Dim_Vendor
+WHERE LoadBatchId = @load_batch
+  AND NOT EXISTS (SELECT 1 FROM Fact_Trip f WHERE f.VendorKey = Dim_Vendor.VendorKey)
+  AND NOT EXISTS (SELECT 1 FROM Fact_ZoneConcurrency z WHERE z.VendorKey = Dim_Vendor.VendorKey);
+
+DELETE FROM Dim_Location
+WHERE LoadBatchId = @load_batch
+  AND NOT EXISTS (SELECT 1 FROM Fact_Trip f WHERE f.PickupLocationKey = Dim_Location.LocationKey)
+  AND NOT EXISTS (SELECT 1 FROM Fact_Trip f WHERE f.DropoffLocationKey = Dim_Location.LocationKey)
+  AND NOT EXISTS (SELECT 1 FROM Fact_ZoneConcurrency z WHERE z.PickupLocationKey = Dim_Location.LocationKey);
+
+DELETE FROM Dim_RateCode
+WHERE LoadBatchId = @load_batch
+  AND NOT EXISTS (SELECT 1 FROM Fact_Trip f WHERE f.RateCodeKey = Dim_RateCode.RateCodeKey);
+
+DELETE FROM Dim_PaymentType
+WHERE LoadBatchId = @load_batch
+  AND NOT EXISTS (SELECT 1 FROM Fact_Trip f WHERE f.PaymentTypeKey = Dim_PaymentType.PaymentTypeKey);
+
+DELETE FROM Dim_TripCharacteristics
+WHERE LoadBatchId = @load_batch
+  AND NOT EXISTS (SELECT 1 FROM Fact_Trip f WHERE f.TripCharacteristicsKey = Dim_TripCharacteristics.TripCharacteristicsKey);
+
+DELETE FROM Dim_Date
+WHERE LoadBatchId = @load_batch
+  AND NOT EXISTS (SELECT 1 FROM Fact_Trip f WHERE f.PickupDateKey = Dim_Date.DateKey)
+  AND NOT EXISTS (SELECT 1 FROM Fact_Trip f WHERE f.DropoffDateKey = Dim_Date.DateKey)
+  AND NOT EXISTS (SELECT 1 FROM Fact_ZoneConcurrency z WHERE z.DateKey = Dim_Date.DateKey);
+
+UPDATE Etl_LoadBatch
+SET Status = 'rolled_back', FinishedAt = NOW()
+WHERE LoadBatchId = @load_batch;
+
+SELECT LoadBatchId, Source, Status, StartedAt, FinishedAt, TripRows
+FROM Etl_LoadBatch
+WHERE LoadBatchId = @load_batch;
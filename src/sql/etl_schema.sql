@@ -0,0 +1,338 @@
+CREATE DATABASE IF NOT EXISTS dw;
+USE dw;
+
+-- Full reload only: drop and recreate every warehouse table (empty).
+-- etl_warehouse.sql then fills them exactly like an incremental batch.
+
+SET FOREIGN_KEY_CHECKS = 0;
+
+-- (1) Drop (idempotent full reload)
+DROP TABLE IF EXISTS Fact_ZoneConcurrency;
+DROP TABLE IF EXISTS Fact_Hourly_ZoneSketch;
+DROP TABLE IF EXISTS Fact_Hourly_ZonePayment;
+DROP TABLE IF EXISTS Fact_Daily_ZoneVendor;
+DROP TABLE IF EXISTS Fact_Trip;
+
+DROP TABLE IF EXISTS Dim_TripCharacteristics;
+DROP TABLE IF EXISTS Dim_PassengerGroup;
+DROP TABLE IF EXISTS Dim_PaymentType;
+DROP TABLE IF EXISTS Dim_RateCode;
+DROP TABLE IF EXISTS Dim_Location;
+DROP TABLE IF EXISTS Dim_Vendor;
+DROP TABLE IF EXISTS Dim_TimeOfDay;
+DROP TABLE IF EXISTS Dim_Date;
+
+DROP TABLE IF EXISTS Etl_AffectedCell;
+DROP TABLE IF EXISTS Etl_CellPeak;
+DROP TABLE IF EXISTS Etl_LoadBatch;
+
+SET FOREIGN_KEY_CHECKS = 1;
+
+-- ============================================================
+-- LOAD BATCHES
+-- ============================================================
+
+-- One row per run of etl_warehouse.sql. Dimension members and facts carry the
+-- LoadBatchId that inserted them, so etl_rollback.sql can undo a partial load.
+CREATE TABLE Etl_LoadBatch (
+  LoadBatchId INT AUTO_INCREMENT PRIMARY KEY,
+  Source VARCHAR(255) NOT NULL,
+  Status VARCHAR(12) NOT NULL,   -- running / committed / rolled_back
+  StartedAt DATETIME NOT NULL,
+  FinishedAt DATETIME NULL,
+  TripRows INT NULL,
+  MaxTripMinutes INT NULL        -- longest trip of the batch, bounds the re-sweep in etl_refresh_summaries.sql
+);
+
+-- (DateKey, VendorKey, PickupLocationKey) cells of Fact_Daily_ZoneVendor to recompute.
+CREATE TABLE Etl_AffectedCell (
+  DateKey INT NOT NULL,
+  VendorKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+  PRIMARY KEY (DateKey, VendorKey, PickupLocationKey)
+);
+
+-- Peak open trips of the affected cells that hold trips from more than one batch, swept
+-- again from Fact_Trip (per-batch peaks do not add up).
+CREATE TABLE Etl_CellPeak (
+  DateKey INT NOT NULL,
+  VendorKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+  MaxOpenTrips INT NOT NULL,
+  PRIMARY KEY (DateKey, VendorKey, PickupLocationKey)
+);
+
+-- ============================================================
+-- (4) DIMENSIONS
+-- ============================================================
+
+CREATE TABLE Dim_Date (
+  DateKey INT PRIMARY KEY,
+  FullDate DATE NOT NULL,
+  Day TINYINT NOT NULL,
+  Month TINYINT NOT NULL,
+  MonthName VARCHAR(15) NOT NULL,
+  Quarter TINYINT NOT NULL,
+  Year SMALLINT NOT NULL,
+  DayOfWeekNumber TINYINT NOT NULL,
+  DayOfWeekName VARCHAR(10) NOT NULL,
+  IsWeekend TINYINT(1) NOT NULL,
+  LoadBatchId INT NULL
+);
+
+CREATE TABLE Dim_TimeOfDay (
+  TimeKey INT PRIMARY KEY,   -- minute-of-day (0..1439)
+  Hour TINYINT NOT NULL,
+  Minute TINYINT NOT NULL,
+  TimeLabel VARCHAR(20) NOT NULL,
+  TimeBucket VARCHAR(20) NOT NULL
+);
+
+INSERT INTO Dim_TimeOfDay(TimeKey, Hour, Minute, TimeLabel, TimeBucket)
+SELECT
+  (h.hr*60 + m.mn) AS TimeKey,
+  h.hr AS Hour,
+  m.mn AS Minute,
+  CONCAT(LPAD(h.hr,2,'0'),':',LPAD(m.mn,2,'0')) AS TimeLabel,
+  CASE
+    WHEN h.hr BETWEEN 0 AND 4 THEN 'LateNight'
+    WHEN h.hr BETWEEN 5 AND 11 THEN 'Morning'
+    WHEN h.hr BETWEEN 12 AND 16 THEN 'Afternoon'
+    WHEN h.hr BETWEEN 17 AND 20 THEN 'Evening'
+    ELSE 'Night'
+  END AS TimeBucket
+FROM
+  (SELECT 0 hr UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4 UNION ALL SELECT 5
+   UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9 UNION ALL SELECT 10 UNION ALL SELECT 11
+   UNION ALL SELECT 12 UNION ALL SELECT 13 UNION ALL SELECT 14 UNION ALL SELECT 15 UNION ALL SELECT 16 UNION ALL SELECT 17
+   UNION ALL SELECT 18 UNION ALL SELECT 19 UNION ALL SELECT 20 UNION ALL SELECT 21 UNION ALL SELECT 22 UNION ALL SELECT 23) h
+CROSS JOIN
+  (SELECT 0 mn UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4 UNION ALL SELECT 5
+   UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9 UNION ALL SELECT 10 UNION ALL SELECT 11
+   UNION ALL SELECT 12 UNION ALL SELECT 13 UNION ALL SELECT 14 UNION ALL SELECT 15 UNION ALL SELECT 16 UNION ALL SELECT 17
+   UNION ALL SELECT 18 UNION ALL SELECT 19 UNION ALL SELECT 20 UNION ALL SELECT 21 UNION ALL SELECT 22 UNION ALL SELECT 23
+   UNION ALL SELECT 24 UNION ALL SELECT 25 UNION ALL SELECT 26 UNION ALL SELECT 27 UNION ALL SELECT 28 UNION ALL SELECT 29
+   UNION ALL SELECT 30 UNION ALL SELECT 31 UNION ALL SELECT 32 UNION ALL SELECT 33 UNION ALL SELECT 34 UNION ALL SELECT 35
+   UNION ALL SELECT 36 UNION ALL SELECT 37 UNION ALL SELECT 38 UNION ALL SELECT 39 UNION ALL SELECT 40 UNION ALL SELECT 41
+   UNION ALL SELECT 42 UNION ALL SELECT 43 UNION ALL SELECT 44 UNION ALL SELECT 45 UNION ALL SELECT 46 UNION ALL SELECT 47
+   UNION ALL SELECT 48 UNION ALL SELECT 49 UNION ALL SELECT 50 UNION ALL SELECT 51 UNION ALL SELECT 52 UNION ALL SELECT 53
+   UNION ALL SELECT 54 UNION ALL SELECT 55 UNION ALL SELECT 56 UNION ALL SELECT 57 UNION ALL SELECT 58 UNION ALL SELECT 59) m;
+
+-- Vendor, location, rate code, payment type, passenger group and trip characteristics keys are
+-- assigned in data_processing (TLC codes and LocationIDs where the TLC has them), so Stg_Trip
+-- arrives with its foreign keys resolved.
+CREATE TABLE Dim_Vendor (
+  VendorKey INT PRIMARY KEY,
+  VendorCode INT NULL,
+  VendorName VARCHAR(100) NOT NULL,
+  LoadBatchId INT NULL,
+  UNIQUE (VendorCode),
+  UNIQUE (VendorName)
+);
+
+CREATE TABLE Dim_Location (
+  LocationKey INT PRIMARY KEY,
+  LocationID INT UNSIGNED NOT NULL,
+  Borough VARCHAR(60) NOT NULL,
+  Zone VARCHAR(120) NOT NULL,
+  ServiceZone VARCHAR(60) NOT NULL,
+  IsAirport TINYINT(1) NOT NULL,
+  IsCBD TINYINT(1) NOT NULL,
+  LoadBatchId INT NULL,
+  -- Names are not unique in taxi_zone_lookup.csv (Corona is both 56 and 57).
+  UNIQUE (LocationID)
+);
+
+CREATE TABLE Dim_RateCode (
+  RateCodeKey INT PRIMARY KEY,
+  RateCodeDesc VARCHAR(50) NOT NULL,
+  LoadBatchId INT NULL,
+  UNIQUE (RateCodeDesc)
+);
+
+CREATE TABLE Dim_PaymentType (
+  PaymentTypeKey INT PRIMARY KEY,
+  PaymentTypeDesc VARCHAR(60) NOT NULL,
+  LoadBatchId INT NULL,
+  UNIQUE (PaymentTypeDesc)
+);
+
+CREATE TABLE Dim_PassengerGroup (
+  PassengerGroupKey INT PRIMARY KEY,
+  PassengerGroupCode VARCHAR(10) NOT NULL,
+  PassengerGroupDesc VARCHAR(50) NOT NULL,
+  MinPassengers TINYINT NOT NULL,
+  MaxPassengers TINYINT NULL,
+  UNIQUE (PassengerGroupCode)
+);
+
+-- Keys as in data_processing/staging.py passenger_group_key.
+INSERT INTO Dim_PassengerGroup(PassengerGroupKey, PassengerGroupCode, PassengerGroupDesc, MinPassengers, MaxPassengers)
+VALUES
+(1,'P1','Solo',1,1),
+(2,'P2','Couple',2,2),
+(3,'P3_4','Small group (3-4)',3,4),
+(4,'P5plus','Large group (5+)',5,NULL),
+(5,'UNK','Unknown',0,NULL);
+
+CREATE TABLE Dim_TripCharacteristics (
+  TripCharacteristicsKey INT PRIMARY KEY,
+  StoreAndForwardFlagBool TINYINT(1) NOT NULL,
+  IsAirportTrip TINYINT(1) NOT NULL,
+  IsCBDTrip TINYINT(1) NOT NULL,
+  IsCongestionSurcharge TINYINT(1) NOT NULL,
+  LoadBatchId INT NULL,
+  UNIQUE (StoreAndForwardFlagBool, IsAirportTrip, IsCBDTrip, IsCongestionSurcharge)
+);
+
+-- ============================================================
+-- (5) FACTS
+-- ============================================================
+
+CREATE TABLE Fact_Trip (
+  FactTripKey BIGINT AUTO_INCREMENT,
+
+  PickupDateKey  INT NOT NULL,
+  DropoffDateKey INT NOT NULL,
+  PickupTimeKey  INT NOT NULL,
+  DropoffTimeKey INT NOT NULL,
+
+  VendorKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+  DropoffLocationKey INT NOT NULL,
+  RateCodeKey INT NOT NULL,
+  PaymentTypeKey INT NOT NULL,
+  TripCharacteristicsKey INT NOT NULL,
+  PassengerGroupKey INT NOT NULL,
+
+  TripDistance DECIMAL(10,3) NOT NULL,
+  FareAmount DECIMAL(10,2) NOT NULL,
+  Extra DECIMAL(10,2) NOT NULL,
+  MtaTax DECIMAL(10,2) NOT NULL,
+  TipAmount DECIMAL(10,2) NOT NULL,
+  TollsAmount DECIMAL(10,2) NOT NULL,
+  ImprovementSurcharge DECIMAL(10,2) NOT NULL,
+  TotalAmount DECIMAL(10,2) NOT NULL,
+  CongestionSurcharge DECIMAL(10,2) NOT NULL,
+  AirportFee DECIMAL(10,2) NOT NULL,
+  CbdCongestionFee DECIMAL(10,2) NOT NULL,
+  TripDurationMinutes DECIMAL(10,2) NOT NULL,
+  AverageSpeedMph DECIMAL(10,3) NULL,
+  TotalSurcharges DECIMAL(10,2) NOT NULL,
+  NetAmountExclTips DECIMAL(10,2) NOT NULL,
+
+  LoadBatchId INT NOT NULL,
+
+  -- The partitioning column has to be part of every unique key.
+  PRIMARY KEY (FactTripKey, PickupDateKey),
+  INDEX ix_facttrip_batch (LoadBatchId),
+  -- Covers the cell drill-down (query7) and the daily zone/borough/payment rollups.
+  INDEX ix_facttrip_date_zone (PickupDateKey, PickupLocationKey, TotalAmount, TipAmount, TripDistance,
+                               TripDurationMinutes, AverageSpeedMph, VendorKey, PaymentTypeKey),
+  -- Covers the hour-of-day profiles (query2, query3).
+  INDEX ix_facttrip_date_time (PickupDateKey, PickupTimeKey, PickupLocationKey, TripCharacteristicsKey,
+                               TripDistance, TotalAmount)
+)
+-- One partition per pickup month, so date-filtered queries only read the months they need.
+-- etl_warehouse.sql splits new months out of p_future as batches arrive. MySQL does not
+-- allow foreign keys on partitioned tables; every key is resolved in data_processing, and
+-- etl_warehouse.sql adds any dimension member it names before the facts.
+PARTITION BY RANGE (PickupDateKey) (
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+CREATE TABLE Fact_Daily_ZoneVendor (
+  DateKey INT NOT NULL,
+  VendorKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+
+  TripsCount INT NOT NULL,
+  TotalTripDistance DECIMAL(14,3) NOT NULL,
+  TotalFareAmount DECIMAL(14,2) NOT NULL,
+  TotalTotalAmount DECIMAL(14,2) NOT NULL,
+  TotalTipAmount DECIMAL(14,2) NOT NULL,
+  TotalTollsAmount DECIMAL(14,2) NOT NULL,
+  TotalDurationMinutes DECIMAL(14,2) NOT NULL,
+
+  -- From Fact_ZoneConcurrency: peak over the day, and the buckets starting at 09:00 (540) and 18:00 (1080).
+  MaxSimultaneousTrips INT NOT NULL,
+  OpenTripsAtPeakHourMorning INT NOT NULL,
+  OpenTripsAtPeakHourNight INT NOT NULL,
+
+  PRIMARY KEY (DateKey, VendorKey, PickupLocationKey),
+  CONSTRAINT fk_factdaily_date FOREIGN KEY (DateKey) REFERENCES Dim_Date(DateKey),
+  CONSTRAINT fk_factdaily_vendor FOREIGN KEY (VendorKey) REFERENCES Dim_Vendor(VendorKey),
+  CONSTRAINT fk_factdaily_loc FOREIGN KEY (PickupLocationKey) REFERENCES Dim_Location(LocationKey)
+);
+
+-- Summary of Fact_Trip per pickup hour, zone and payment type. PickupTimeKey is the
+-- top-of-hour TimeKey (hour*60), so it still joins Dim_TimeOfDay for Hour/TimeBucket.
+-- run_dw_queries.py routes matching queries here (and to Fact_Daily_ZoneVendor).
+CREATE TABLE Fact_Hourly_ZonePayment (
+  DateKey INT NOT NULL,
+  PickupTimeKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+  PaymentTypeKey INT NOT NULL,
+
+  TripsCount INT NOT NULL,
+  TotalTripDistance DECIMAL(14,3) NOT NULL,
+  TotalFareAmount DECIMAL(14,2) NOT NULL,
+  TotalTotalAmount DECIMAL(14,2) NOT NULL,
+  TotalTipAmount DECIMAL(14,2) NOT NULL,
+  TotalTollsAmount DECIMAL(14,2) NOT NULL,
+  TotalDurationMinutes DECIMAL(14,2) NOT NULL,
+
+  PRIMARY KEY (DateKey, PickupTimeKey, PickupLocationKey, PaymentTypeKey),
+  CONSTRAINT fk_facthourly_date FOREIGN KEY (DateKey) REFERENCES Dim_Date(DateKey),
+  CONSTRAINT fk_facthourly_time FOREIGN KEY (PickupTimeKey) REFERENCES Dim_TimeOfDay(TimeKey),
+  CONSTRAINT fk_facthourly_loc FOREIGN KEY (PickupLocationKey) REFERENCES Dim_Location(LocationKey),
+  CONSTRAINT fk_facthourly_pay FOREIGN KEY (PaymentTypeKey) REFERENCES Dim_PaymentType(PaymentTypeKey)
+);
+
+-- Open trips per pickup zone and vendor in 15-minute buckets, loaded from Stg_ZoneConcurrency.
+-- DateKey/TimeKey are when the trips are open, so a trip past midnight counts on both days.
+-- Each batch keeps its own rows: OpenTrips add up across batches, MaxOpenTrips (the peak of
+-- the batch's own trips) does not, see etl_refresh_summaries.sql. The key leads with
+-- (DateKey, PickupLocationKey) so "how busy was this zone at 17:30" is a primary key lookup.
+CREATE TABLE Fact_ZoneConcurrency (
+  DateKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+  TimeKey INT NOT NULL,
+  VendorKey INT NOT NULL,
+  LoadBatchId INT NOT NULL,
+
+  OpenTrips INT NOT NULL,
+  MaxOpenTrips INT NOT NULL,
+
+  PRIMARY KEY (DateKey, PickupLocationKey, TimeKey, VendorKey, LoadBatchId),
+  INDEX ix_zoneconcurrency_batch (LoadBatchId),
+  CONSTRAINT fk_zoneconc_date FOREIGN KEY (DateKey) REFERENCES Dim_Date(DateKey),
+  CONSTRAINT fk_zoneconc_time FOREIGN KEY (TimeKey) REFERENCES Dim_TimeOfDay(TimeKey),
+  CONSTRAINT fk_zoneconc_vendor FOREIGN KEY (VendorKey) REFERENCES Dim_Vendor(VendorKey),
+  CONSTRAINT fk_zoneconc_loc FOREIGN KEY (PickupLocationKey) REFERENCES Dim_Location(LocationKey)
+);
+
+-- Distribution sketches per pickup hour and zone, loaded from Stg_ZoneSketch next to
+-- Fact_Daily_ZoneVendor. FareSketch/DurationSketch/SpeedSketch are log-bucket quantile sketches
+-- and RouteHll a HyperLogLog of (pickup, dropoff) zone pairs; both merge across cells and batches,
+-- so sql/queries/percentiles.py answers percentiles and distinct routes over any date, hour or
+-- zone slice without reading Fact_Trip. PickupTimeKey is the top-of-hour TimeKey, as in
+-- Fact_Hourly_ZonePayment.
+CREATE TABLE Fact_Hourly_ZoneSketch (
+  DateKey INT NOT NULL,
+  PickupTimeKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+  LoadBatchId INT NOT NULL,
+
+  TripsCount INT NOT NULL,
+  FareSketch MEDIUMBLOB NOT NULL,
+  DurationSketch MEDIUMBLOB NOT NULL,
+  SpeedSketch MEDIUMBLOB NOT NULL,
+  RouteHll BLOB NOT NULL,
+
+  PRIMARY KEY (DateKey, PickupLocationKey, PickupTimeKey, LoadBatchId),
+  INDEX ix_zonesketch_batch (LoadBatchId),
+  CONSTRAINT fk_zonesketch_date FOREIGN KEY (DateKey) REFERENCES Dim_Date(DateKey),
+  CONSTRAINT fk_zonesketch_time FOREIGN KEY (PickupTimeKey) REFERENCES Dim_TimeOfDay(TimeKey),
+  CONSTRAINT fk_zonesketch_loc FOREIGN KEY (PickupLocationKey) REFERENCES Dim_Location(LocationKey)
+);
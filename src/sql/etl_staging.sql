@@ -0,0 +1,120 @@
+    CREATE DATABASE IF NOT EXISTS dw;
+USE dw;
+
+-- ============================================================
+-- (2) STAGING (processed CSV -> DB staging table)
+-- ============================================================
+-- Stg_Trip only holds the batch being loaded; the warehouse tables are
+-- dropped and recreated by etl_schema.sql, and only on a full reload.
+
+DROP TABLE IF EXISTS Stg_Trip;
+
+CREATE TABLE Stg_Trip (
+  StgTripId BIGINT AUTO_INCREMENT PRIMARY KEY,
+
+  PickupDT  DATETIME NULL,
+  DropoffDT DATETIME NULL,
+
+  PickupDateKey  INT NULL,
+  DropoffDateKey INT NULL,
+  PickupTimeKey  INT NULL,   -- minute-of-day (0..1439)
+  DropoffTimeKey INT NULL,
+
+  -- Dimension keys, resolved by data_processing against the dimension files loaded below.
+  VendorKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+  DropoffLocationKey INT NOT NULL,
+  RateCodeKey INT NOT NULL,
+  PaymentTypeKey INT NOT NULL,
+  TripCharacteristicsKey INT NOT NULL,
+  PassengerGroupKey INT NOT NULL,
+
+  PassengerCount INT NULL,
+  TripDistance DECIMAL(10,3) NOT NULL,
+
+  FareAmount DECIMAL(10,2) NOT NULL,
+  Extra DECIMAL(10,2) NOT NULL,
+  MtaTax DECIMAL(10,2) NOT NULL,
+  TipAmount DECIMAL(10,2) NOT NULL,
+  TollsAmount DECIMAL(10,2) NOT NULL,
+  ImprovementSurcharge DECIMAL(10,2) NOT NULL,
+  TotalAmount DECIMAL(10,2) NOT NULL,
+  CongestionSurcharge DECIMAL(10,2) NOT NULL,
+  AirportFee DECIMAL(10,2) NOT NULL,
+  CbdCongestionFee DECIMAL(10,2) NOT NULL,
+
+  TripDurationMinutes DECIMAL(10,2) NULL,
+  AverageSpeedMph DECIMAL(10,3) NULL,
+  TotalSurcharges DECIMAL(10,2) NULL,
+  NetAmountExclTips DECIMAL(10,2) NULL
+);
+
+-- Open trips per pickup zone and vendor in 15-minute buckets, swept in data_processing/concurrency.py
+-- from the same trips and loaded next to Stg_Trip.
+DROP TABLE IF EXISTS Stg_ZoneConcurrency;
+
+CREATE TABLE Stg_ZoneConcurrency (
+  DateKey INT NOT NULL,
+  TimeKey INT NOT NULL,      -- first minute of the bucket
+  VendorKey INT NOT NULL,
+  PickupLocationKey INT NOT NULL,
+  OpenTrips INT NOT NULL,    -- open at TimeKey
+  MaxOpenTrips INT NOT NULL  -- most open at any minute of the bucket
+);
+
+-- Mergeable distribution sketches per pickup zone and hour, built in data_processing/sketches.py
+-- from the same trips. The CSV holds them in base64; the load decodes them into the BLOBs.
+DROP TABLE IF EXISTS Stg_ZoneSketch;
+
+CREATE TABLE Stg_ZoneSketch (
+  DateKey INT NOT NULL,
+  PickupTimeKey INT NOT NULL,   -- top of the hour (hour*60)
+  PickupLocationKey INT NOT NULL,
+  TripsCount INT NOT NULL,
+  FareSketch MEDIUMBLOB NOT NULL,
+  DurationSketch MEDIUMBLOB NOT NULL,
+  SpeedSketch MEDIUMBLOB NOT NULL,
+  RouteHll BLOB NOT NULL
+);
+
+-- Every member of the dimensions whose keys data_processing/dimensions.py resolves, written
+-- next to the processed dataset. etl_warehouse.sql adds the members the warehouse lacks.
+DROP TABLE IF EXISTS Stg_Vendor;
+DROP TABLE IF EXISTS Stg_Location;
+DROP TABLE IF EXISTS Stg_RateCode;
+DROP TABLE IF EXISTS Stg_PaymentType;
+DROP TABLE IF EXISTS Stg_TripCharacteristics;
+
+CREATE TABLE Stg_Vendor (
+  VendorKey INT PRIMARY KEY,
+  VendorCode INT NULL,
+  VendorName VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE Stg_Location (
+  LocationKey INT PRIMARY KEY,
+  LocationID INT UNSIGNED NOT NULL,
+  Borough VARCHAR(60) NOT NULL,
+  Zone VARCHAR(120) NOT NULL,
+  ServiceZone VARCHAR(60) NOT NULL,
+  IsAirport TINYINT(1) NOT NULL,
+  IsCBD TINYINT(1) NOT NULL
+);
+
+CREATE TABLE Stg_RateCode (
+  RateCodeKey INT PRIMARY KEY,
+  RateCodeDesc VARCHAR(50) NOT NULL
+);
+
+CREATE TABLE Stg_PaymentType (
+  PaymentTypeKey INT PRIMARY KEY,
+  PaymentTypeDesc VARCHAR(60) NOT NULL
+);
+
+CREATE TABLE Stg_TripCharacteristics (
+  TripCharacteristicsKey INT PRIMARY KEY,
+  StoreAndForwardFlagBool TINYINT(1) NOT NULL,
+  IsAirportTrip TINYINT(1) NOT NULL,
+  IsCBDTrip TINYINT(1) NOT NULL,
+  IsCongestionSurcharge TINYINT(1) NOT NULL
+);
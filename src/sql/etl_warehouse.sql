@@ -0,0 +1,217 @@
+USE dw;
+
+-- Merges the batch in Stg_Trip into the warehouse. The same script serves the
+-- full reload (after etl_schema.sql recreated empty tables) and incremental
+-- loads: new dimension members are appended and existing surrogate keys kept,
+-- Fact_Trip rows are appended, and only the Fact_Daily_ZoneVendor cells touched
+-- by the batch are recomputed (with the other summary tables).
+
+-- Rows are validated before they are written (data_processing/validation.py): those with
+-- missing or out-of-order timestamps, negative amounts, implausible distance or speed, or
+-- unknown codes go to the dataset's quarantine file, so Stg_Trip only holds clean rows.
+
+SET @min_date := (SELECT MIN(DATE(PickupDT)) FROM Stg_Trip);
+SET @max_date := (SELECT MAX(DATE(DropoffDT)) FROM Stg_Trip);
+
+-- A Source with a committed batch was already merged; loading it again would append its
+-- trips a second time. Roll that batch back (etl_rollback.sql) to reload it. The scripts run
+-- without DELIMITER, so the check raises its error through a one-statement procedure.
+DROP PROCEDURE IF EXISTS Etl_Fail;
+CREATE PROCEDURE Etl_Fail(message VARCHAR(255)) SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = message;
+
+SET @loaded_batch := (
+  SELECT MAX(LoadBatchId) FROM Etl_LoadBatch
+  WHERE Source = COALESCE(@load_source, 'Stg_Trip') AND Status = 'committed'
+);
+SET @guard := IF(@loaded_batch IS NULL, 'DO ?', 'CALL Etl_Fail(?)');
+SET @guard_message := CONCAT('Source ', COALESCE(@load_source, 'Stg_Trip'), ' is already loaded as batch ',
+                             COALESCE(@loaded_batch, 0), '; roll it back before loading it again');
+PREPARE guard FROM @guard;
+EXECUTE guard USING @guard_message;
+DEALLOCATE PREPARE guard;
+
+INSERT INTO Etl_LoadBatch(Source, Status, StartedAt, MaxTripMinutes)
+VALUES (COALESCE(@load_source, 'Stg_Trip'), 'running', NOW(), (SELECT CEIL(MAX(TripDurationMinutes)) FROM Stg_Trip));
+
+SET @load_batch := LAST_INSERT_ID();
+
+-- ============================================================
+-- (4) DIMENSIONS (append new members, keep existing keys)
+-- ============================================================
+
+INSERT INTO Dim_Date
+  (DateKey, FullDate, Day, Month, MonthName, Quarter, Year, DayOfWeekNumber, DayOfWeekName, IsWeekend, LoadBatchId)
+SELECT
+  CAST(DATE_FORMAT(d, '%Y%m%d') AS UNSIGNED) AS DateKey,
+  d AS FullDate,
+  DAY(d) AS Day,
+  MONTH(d) AS Month,
+  DATE_FORMAT(d, '%M') AS MonthName,
+  QUARTER(d) AS Quarter,
+  YEAR(d) AS Year,
+  ((DAYOFWEEK(d)+5) % 7) + 1 AS DayOfWeekNumber,
+  DATE_FORMAT(d, '%W') AS DayOfWeekName,
+  CASE WHEN DAYOFWEEK(d) IN (1,7) THEN 1 ELSE 0 END AS IsWeekend,
+  @load_batch AS LoadBatchId
+FROM (
+  SELECT DATE_ADD(@min_date, INTERVAL n DAY) AS d
+  FROM (
+    SELECT (a.n + 10*b.n + 100*c.n + 1000*d.n) AS n
+    FROM
+      (SELECT 0 n UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+       UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) a
+    CROSS JOIN
+      (SELECT 0 n UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+       UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) b
+    CROSS JOIN
+      (SELECT 0 n UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+       UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) c
+    CROSS JOIN
+      (SELECT 0 n UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+       UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) d
+  ) nums
+  WHERE DATE_ADD(@min_date, INTERVAL nums.n DAY) <= @max_date
+) x
+WHERE NOT EXISTS (SELECT 1 FROM Dim_Date dd WHERE dd.FullDate = x.d);
+
+-- Vendor, location, rate code, payment type and trip characteristics members come with
+-- their keys from the dimension files (Stg_Vendor, ...), so adding them is a key lookup.
+INSERT INTO Dim_Vendor(VendorKey, VendorCode, VendorName, LoadBatchId)
+SELECT s.VendorKey, s.VendorCode, s.VendorName, @load_batch
+FROM Stg_Vendor s
+LEFT JOIN Dim_Vendor v ON v.VendorKey = s.VendorKey
+WHERE v.VendorKey IS NULL;
+
+INSERT INTO Dim_Location(LocationKey, LocationID, Borough, Zone, ServiceZone, IsAirport, IsCBD, LoadBatchId)
+SELECT s.LocationKey, s.LocationID, s.Borough, s.Zone, s.ServiceZone, s.IsAirport, s.IsCBD, @load_batch
+FROM Stg_Location s
+LEFT JOIN Dim_Location l ON l.LocationKey = s.LocationKey
+WHERE l.LocationKey IS NULL;
+
+-- Flags are a MAX over every trip seen, so a new batch can only raise them.
+UPDATE Dim_Location l
+JOIN (
+  SELECT LocationKey, MAX(AirportFee > 0) AS IsAirport, MAX(CbdCongestionFee > 0) AS IsCBD
+  FROM (
+    SELECT PickupLocationKey AS LocationKey, AirportFee, CbdCongestionFee FROM Stg_Trip
+    UNION ALL
+    SELECT DropoffLocationKey, AirportFee, CbdCongestionFee FROM Stg_Trip
+  ) x
+  GROUP BY LocationKey
+) s ON s.LocationKey = l.LocationKey
+SET l.IsAirport = GREATEST(l.IsAirport, s.IsAirport),
+    l.IsCBD = GREATEST(l.IsCBD, s.IsCBD);
+
+INSERT INTO Dim_RateCode(RateCodeKey, RateCodeDesc, LoadBatchId)
+SELECT s.RateCodeKey, s.RateCodeDesc, @load_batch
+FROM Stg_RateCode s
+LEFT JOIN Dim_RateCode rc ON rc.RateCodeKey = s.RateCodeKey
+WHERE rc.RateCodeKey IS NULL;
+
+INSERT INTO Dim_PaymentType(PaymentTypeKey, PaymentTypeDesc, LoadBatchId)
+SELECT s.PaymentTypeKey, s.PaymentTypeDesc, @load_batch
+FROM Stg_PaymentType s
+LEFT JOIN Dim_PaymentType pt ON pt.PaymentTypeKey = s.PaymentTypeKey
+WHERE pt.PaymentTypeKey IS NULL;
+
+INSERT INTO Dim_TripCharacteristics
+  (TripCharacteristicsKey, StoreAndForwardFlagBool, IsAirportTrip, IsCBDTrip, IsCongestionSurcharge, LoadBatchId)
+SELECT s.TripCharacteristicsKey, s.StoreAndForwardFlagBool, s.IsAirportTrip, s.IsCBDTrip, s.IsCongestionSurcharge, @load_batch
+FROM Stg_TripCharacteristics s
+LEFT JOIN Dim_TripCharacteristics tc ON tc.TripCharacteristicsKey = s.TripCharacteristicsKey
+WHERE tc.TripCharacteristicsKey IS NULL;
+
+-- ============================================================
+-- (5) FACTS (append the batch)
+-- ============================================================
+
+-- Give every pickup month of the batch its own Fact_Trip partition before the insert.
+-- Months older than the existing partitions land in the earliest one.
+SET SESSION group_concat_max_len = 65535;
+
+SET @last_bound := (
+  SELECT COALESCE(MAX(CAST(PARTITION_DESCRIPTION AS UNSIGNED)), 0)
+  FROM information_schema.PARTITIONS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Fact_Trip' AND PARTITION_DESCRIPTION <> 'MAXVALUE'
+);
+
+SET @new_partitions := (
+  SELECT GROUP_CONCAT(
+           CONCAT('PARTITION p', DATE_FORMAT(m, '%Y%m'),
+                  ' VALUES LESS THAN (', DATE_FORMAT(m + INTERVAL 1 MONTH, '%Y%m%d'), ')')
+           ORDER BY m SEPARATOR ', ')
+  FROM (
+    SELECT DISTINCT CAST(DATE_FORMAT(FullDate, '%Y-%m-01') AS DATE) AS m
+    FROM Dim_Date
+    WHERE FullDate BETWEEN @min_date AND (SELECT MAX(DATE(PickupDT)) FROM Stg_Trip)
+  ) months
+  WHERE CAST(DATE_FORMAT(m + INTERVAL 1 MONTH, '%Y%m%d') AS UNSIGNED) > @last_bound
+);
+
+SET @ddl := IF(
+  @new_partitions IS NULL,
+  'DO 0',
+  CONCAT('ALTER TABLE Fact_Trip REORGANIZE PARTITION p_future INTO (',
+         @new_partitions, ', PARTITION p_future VALUES LESS THAN MAXVALUE)')
+);
+
+PREPARE add_partitions FROM @ddl;
+EXECUTE add_partitions;
+DEALLOCATE PREPARE add_partitions;
+
+-- Stg_Trip already carries every key, so the facts are a straight copy.
+INSERT INTO Fact_Trip (
+  PickupDateKey, DropoffDateKey, PickupTimeKey, DropoffTimeKey,
+  VendorKey, PickupLocationKey, DropoffLocationKey,
+  RateCodeKey, PaymentTypeKey, TripCharacteristicsKey, PassengerGroupKey,
+  TripDistance, FareAmount, Extra, MtaTax, TipAmount, TollsAmount, ImprovementSurcharge,
+  TotalAmount, CongestionSurcharge, AirportFee, CbdCongestionFee,
+  TripDurationMinutes, AverageSpeedMph, TotalSurcharges, NetAmountExclTips,
+  LoadBatchId
+)
+SELECT
+  PickupDateKey, DropoffDateKey, PickupTimeKey, DropoffTimeKey,
+  VendorKey, PickupLocationKey, DropoffLocationKey,
+  RateCodeKey, PaymentTypeKey, TripCharacteristicsKey, PassengerGroupKey,
+  TripDistance, FareAmount, Extra, MtaTax, TipAmount, TollsAmount, ImprovementSurcharge,
+  TotalAmount, CongestionSurcharge, AirportFee, CbdCongestionFee,
+  TripDurationMinutes, AverageSpeedMph, TotalSurcharges, NetAmountExclTips,
+  @load_batch
+FROM Stg_Trip;
+
+INSERT INTO Fact_ZoneConcurrency
+  (DateKey, PickupLocationKey, TimeKey, VendorKey, LoadBatchId, OpenTrips, MaxOpenTrips)
+SELECT DateKey, PickupLocationKey, TimeKey, VendorKey, @load_batch, OpenTrips, MaxOpenTrips
+FROM Stg_ZoneConcurrency;
+
+INSERT INTO Fact_Hourly_ZoneSketch
+  (DateKey, PickupTimeKey, PickupLocationKey, LoadBatchId, TripsCount, FareSketch, DurationSketch, SpeedSketch, RouteHll)
+SELECT DateKey, PickupTimeKey, PickupLocationKey, @load_batch, TripsCount, FareSketch, DurationSketch, SpeedSketch, RouteHll
+FROM Stg_ZoneSketch;
+
+-- Only the summary cells that received trips from this batch are recomputed, including
+-- the day after for trips still open past midnight.
+DELETE FROM Etl_AffectedCell;
+
+INSERT INTO Etl_AffectedCell (DateKey, VendorKey, PickupLocationKey)
+SELECT PickupDateKey, VendorKey, PickupLocationKey
+FROM Fact_Trip
+WHERE LoadBatchId = @load_batch
+UNION
+SELECT DateKey, VendorKey, PickupLocationKey
+FROM Fact_ZoneConcurrency
+WHERE LoadBatchId = @load_batch;
+
+SOURCE /sql/etl_refresh_summaries.sql;
+
+UPDATE Etl_LoadBatch
+SET Status = 'committed',
+    FinishedAt = NOW(),
+    TripRows = (SELECT COUNT(*) FROM Fact_Trip WHERE LoadBatchId = @load_batch)
+WHERE LoadBatchId = @load_batch;
+
+-- Sanity checks
+-- SELECT 'Stg_Trip' tbl, COUNT(*) cnt FROM Stg_Trip
+-- UNION ALL SELECT 'Fact_Trip', COUNT(*) FROM Fact_Trip
+-- UNION ALL SELECT 'Fact_Daily_ZoneVendor', COUNT(*) FROM Fact_Daily_ZoneVendor
+-- UNION ALL SELECT 'Fact_Hourly_ZonePayment', COUNT(*) FROM Fact_Hourly_ZonePayment;
@@ -0,0 +1,100 @@
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from run_dw_queries import coerce
+from run_dw_queries import connect_mysql
+from run_dw_queries import parse_params
+from run_dw_queries import read_query_files
+from run_dw_queries import run_query
+
+# Tables large enough that reading all of them is a regression; dimensions are small and may be scanned.
+FACT_TABLES = ("Fact_Trip", "Fact_Daily_ZoneVendor", "Fact_Hourly_ZonePayment")
+SCAN_TYPES = ("ALL", "index")
+
+def data_partitions(conn, driver):
+    """{table: names of its month partitions}. p_future (VALUES LESS THAN MAXVALUE) is always empty,
+    since etl_warehouse.sql splits every loaded month out of it, so it does not count."""
+    rows = run_query(conn, driver, """
+        SELECT TABLE_NAME AS name, PARTITION_NAME AS part
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND PARTITION_NAME IS NOT NULL AND PARTITION_DESCRIPTION <> 'MAXVALUE'
+    """, ())
+    partitions = {}
+    for r in rows or []:
+        partitions.setdefault(r["name"], set()).add(r["part"])
+    return partitions
+
+def sample_params(conn, driver, param_specs):
+    """Parameters for EXPLAIN: a real Fact_Trip row when the names are Fact_Trip columns, else a neutral value."""
+    names = [name for name, _ in param_specs]
+    try:
+        rows = run_query(conn, driver, f"SELECT {', '.join(names)} FROM Fact_Trip LIMIT 1", ())
+    except Exception:
+        rows = None
+    if rows:
+        return tuple(rows[0][name] for name in names)
+    return tuple(coerce("0", typ) for _, typ in param_specs)
+
+def fact_aliases(sql_text):
+    """EXPLAIN reports table aliases, so map every alias of a fact table back to its name."""
+    aliases = {name: name for name in FACT_TABLES}
+    pattern = rf"\b({'|'.join(FACT_TABLES)})\s+(?:AS\s+)?(?!JOIN|WHERE|GROUP|ORDER|ON|LIMIT)(\w+)"
+    code = re.sub(r"--[^\n]*", "", sql_text)
+    for table, alias in re.findall(pattern, code, flags=re.IGNORECASE):
+        aliases[alias] = table
+    return aliases
+
+def full_scans(plan, partitions, aliases):
+    """Plan rows that read a whole fact table: a scan type that reads every partition holding rows.
+
+    A table with a single month partition therefore fails on any scan, like an unpartitioned one.
+    """
+    found = []
+    for row in plan:
+        table = aliases.get(row.get("table") or "")
+        if table is None or row.get("type") not in SCAN_TYPES:
+            continue
+        read = {p for p in (row.get("partitions") or "").split(",") if p} & partitions.get(table, set())
+        if table in partitions and len(read) < len(partitions[table]):
+            continue
+        found.append(row)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every query and fail if one scans a whole fact table.")
+    parser.add_argument("files", nargs="*", help="Query files to check (default: all *.sql next to this script)")
+    args = parser.parse_args()
+
+    folder = Path(__file__).resolve().parent
+    items = read_query_files(folder)
+    if args.files:
+        wanted = {Path(f).name for f in args.files}
+        items = [item for item in items if item[0] in wanted]
+
+    conn, driver = connect_mysql()
+    partitions = data_partitions(conn, driver)
+    failures = 0
+    for fname, title, sql_text in items:
+        params = sample_params(conn, driver, parse_params(sql_text)) if parse_params(sql_text) else ()
+        plan = run_query(conn, driver, "EXPLAIN " + sql_text.strip(), params) or []
+        aliases = fact_aliases(sql_text)
+        scans = full_scans(plan, partitions, aliases)
+        if scans:
+            failures += 1
+            print(f"FAIL {fname} — {title}")
+            for row in scans:
+                print(f"     full scan of {aliases[row['table']]} (type={row['type']}, partitions={row.get('partitions')}, rows={row.get('rows')})")
+        else:
+            used = sorted({f"{aliases[r['table']]}:{r.get('key') or '-'}" for r in plan if r.get("table") in aliases})
+            print(f"ok   {fname} — {', '.join(used) or 'no fact table access'}")
+
+    conn.close()
+    if failures:
+        print(f"{failures} of {len(items)} queries scan a whole fact table.")
+        sys.exit(1)
+    print(f"All {len(items)} queries avoid full fact table scans.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import duckdb
+
+from load_staging import concurrency_file
+from load_staging import dimension_files
+from load_staging import dimensions_dir
+from load_staging import input_signature
+from load_staging import manifest_chunks
+from load_staging import read_header
+from load_staging import sketches_file
+
+PROCESSED_DIR = Path(__file__).resolve().parents[2] / "dataset" / "processed"
+DB_PATH = Path(__file__).resolve().parents[2] / "dataset" / "cache" / "dw.duckdb"
+CSV_NULL = "\\N"
+
+# Stg_Trip column types, as in etl_staging.sql.
+STAGE_TYPES = {
+    "PickupDT": "TIMESTAMP", "DropoffDT": "TIMESTAMP",
+    "PickupDateKey": "INTEGER", "DropoffDateKey": "INTEGER", "PickupTimeKey": "INTEGER", "DropoffTimeKey": "INTEGER",
+    "VendorKey": "INTEGER", "PickupLocationKey": "INTEGER", "DropoffLocationKey": "INTEGER", "RateCodeKey": "INTEGER",
+    "PaymentTypeKey": "INTEGER", "TripCharacteristicsKey": "INTEGER", "PassengerGroupKey": "INTEGER",
+    "PassengerCount": "INTEGER", "TripDistance": "DECIMAL(10,3)",
+    "FareAmount": "DECIMAL(10,2)", "Extra": "DECIMAL(10,2)", "MtaTax": "DECIMAL(10,2)", "TipAmount": "DECIMAL(10,2)",
+    "TollsAmount": "DECIMAL(10,2)", "ImprovementSurcharge": "DECIMAL(10,2)", "TotalAmount": "DECIMAL(10,2)",
+    "CongestionSurcharge": "DECIMAL(10,2)", "AirportFee": "DECIMAL(10,2)", "CbdCongestionFee": "DECIMAL(10,2)",
+    "TripDurationMinutes": "DECIMAL(10,2)", "AverageSpeedMph": "DECIMAL(10,3)",
+    "TotalSurcharges": "DECIMAL(10,2)", "NetAmountExclTips": "DECIMAL(10,2)",
+}
+# Stg_ZoneConcurrency, as in etl_staging.sql.
+CONCURRENCY_TYPES = {
+    "DateKey": "INTEGER", "TimeKey": "INTEGER", "VendorKey": "INTEGER", "PickupLocationKey": "INTEGER",
+    "OpenTrips": "INTEGER", "MaxOpenTrips": "INTEGER",
+}
+# Stg_ZoneSketch as it is stored in the CSV: the sketches stay base64 until load_stage decodes them.
+SKETCH_TYPES = {
+    "DateKey": "INTEGER", "PickupTimeKey": "INTEGER", "PickupLocationKey": "INTEGER", "TripsCount": "INTEGER",
+    "FareSketch": "VARCHAR", "DurationSketch": "VARCHAR", "SpeedSketch": "VARCHAR", "RouteHll": "VARCHAR",
+}
+# Dimension files that are not plain INTEGER keys and flags, as in etl_schema.sql.
+DIMENSION_TYPES = {
+    "VendorName": "VARCHAR", "Borough": "VARCHAR", "Zone": "VARCHAR", "ServiceZone": "VARCHAR",
+    "RateCodeDesc": "VARCHAR", "PaymentTypeDesc": "VARCHAR",
+}
+FACT_MEASURES = [
+    "TripDistance", "FareAmount", "Extra", "MtaTax", "TipAmount", "TollsAmount", "ImprovementSurcharge",
+    "TotalAmount", "CongestionSurcharge", "AirportFee", "CbdCongestionFee",
+    "TripDurationMinutes", "AverageSpeedMph", "TotalSurcharges", "NetAmountExclTips",
+]
+SUMMARY_TOTALS = """
+  COUNT(*) AS TripsCount,
+  CAST(SUM(f.TripDistance) AS DECIMAL(14,3)) AS TotalTripDistance,
+  CAST(SUM(f.FareAmount) AS DECIMAL(14,2)) AS TotalFareAmount,
+  CAST(SUM(f.TotalAmount) AS DECIMAL(14,2)) AS TotalTotalAmount,
+  CAST(SUM(f.TipAmount) AS DECIMAL(14,2)) AS TotalTipAmount,
+  CAST(SUM(f.TollsAmount) AS DECIMAL(14,2)) AS TotalTollsAmount,
+  CAST(SUM(f.TripDurationMinutes) AS DECIMAL(14,2)) AS TotalDurationMinutes"""
+
+# The star schema of etl_schema.sql / etl_warehouse.sql, built in one pass from Stg_Trip and the
+# dimension files, which load_stage copies in as the Dim_* tables with their keys.
+BUILD_STEPS = [
+    """CREATE TABLE Dim_Date AS
+    SELECT
+      CAST(strftime(d, '%Y%m%d') AS INTEGER) AS DateKey,
+      d AS FullDate,
+      day(d) AS Day,
+      month(d) AS Month,
+      strftime(d, '%B') AS MonthName,
+      quarter(d) AS Quarter,
+      year(d) AS Year,
+      isodow(d) AS DayOfWeekNumber,
+      strftime(d, '%A') AS DayOfWeekName,
+      CASE WHEN isodow(d) IN (6, 7) THEN 1 ELSE 0 END AS IsWeekend,
+      1 AS LoadBatchId
+    FROM (
+      SELECT CAST(unnest(generate_series(MIN(CAST(PickupDT AS DATE)), MAX(CAST(DropoffDT AS DATE)), INTERVAL 1 DAY)) AS DATE) AS d
+      FROM Stg_Trip
+    )""",
+
+    """CREATE TABLE Dim_TimeOfDay AS
+    SELECT
+      CAST(t AS INTEGER) AS TimeKey,
+      CAST(t // 60 AS INTEGER) AS Hour,
+      CAST(t % 60 AS INTEGER) AS Minute,
+      lpad(CAST(t // 60 AS VARCHAR), 2, '0') || ':' || lpad(CAST(t % 60 AS VARCHAR), 2, '0') AS TimeLabel,
+      CASE
+        WHEN t // 60 BETWEEN 0 AND 4 THEN 'LateNight'
+        WHEN t // 60 BETWEEN 5 AND 11 THEN 'Morning'
+        WHEN t // 60 BETWEEN 12 AND 16 THEN 'Afternoon'
+        WHEN t // 60 BETWEEN 17 AND 20 THEN 'Evening'
+        ELSE 'Night'
+      END AS TimeBucket
+    FROM range(1440) r(t)""",
+
+    """UPDATE Dim_Location l
+    SET IsAirport = GREATEST(l.IsAirport, s.IsAirport), IsCBD = GREATEST(l.IsCBD, s.IsCBD)
+    FROM (
+      SELECT LocationKey,
+        MAX(CASE WHEN AirportFee > 0 THEN 1 ELSE 0 END) AS IsAirport,
+        MAX(CASE WHEN CbdCongestionFee > 0 THEN 1 ELSE 0 END) AS IsCBD
+      FROM (
+        SELECT PickupLocationKey AS LocationKey, AirportFee, CbdCongestionFee FROM Stg_Trip
+        UNION ALL
+        SELECT DropoffLocationKey, AirportFee, CbdCongestionFee FROM Stg_Trip
+      ) x
+      GROUP BY LocationKey
+    ) s
+    WHERE s.LocationKey = l.LocationKey""",
+
+    """CREATE TABLE Dim_PassengerGroup AS
+    SELECT * FROM (VALUES
+      (1, 'P1', 'Solo', 1, 1),
+      (2, 'P2', 'Couple', 2, 2),
+      (3, 'P3_4', 'Small group (3-4)', 3, 4),
+      (4, 'P5plus', 'Large group (5+)', 5, NULL),
+      (5, 'UNK', 'Unknown', 0, NULL)
+    ) v(PassengerGroupKey, PassengerGroupCode, PassengerGroupDesc, MinPassengers, MaxPassengers)""",
+
+    f"""CREATE TABLE Fact_Trip AS
+    SELECT
+      CAST(row_number() OVER (ORDER BY StgTripId) AS BIGINT) AS FactTripKey,
+      PickupDateKey, DropoffDateKey, PickupTimeKey, DropoffTimeKey,
+      VendorKey, PickupLocationKey, DropoffLocationKey,
+      RateCodeKey, PaymentTypeKey, TripCharacteristicsKey, PassengerGroupKey,
+      {", ".join(FACT_MEASURES)},
+      1 AS LoadBatchId
+    FROM Stg_Trip
+    ORDER BY PickupDateKey, StgTripId""",
+
+    """CREATE TABLE Fact_ZoneConcurrency AS
+    SELECT DateKey, PickupLocationKey, TimeKey, VendorKey, 1 AS LoadBatchId, OpenTrips, MaxOpenTrips
+    FROM Stg_ZoneConcurrency
+    ORDER BY DateKey, PickupLocationKey, TimeKey, VendorKey""",
+
+    """CREATE TABLE Fact_Hourly_ZoneSketch AS
+    SELECT DateKey, PickupTimeKey, PickupLocationKey, 1 AS LoadBatchId, TripsCount, FareSketch, DurationSketch, SpeedSketch, RouteHll
+    FROM Stg_ZoneSketch
+    ORDER BY DateKey, PickupLocationKey, PickupTimeKey""",
+
+    f"""CREATE TABLE Fact_Daily_ZoneVendor AS
+    SELECT b.*,
+      CAST(COALESCE(o.MaxSimultaneousTrips, 0) AS INTEGER) AS MaxSimultaneousTrips,
+      CAST(COALESCE(o.OpenAt09, 0) AS INTEGER) AS OpenTripsAtPeakHourMorning,
+      CAST(COALESCE(o.OpenAt18, 0) AS INTEGER) AS OpenTripsAtPeakHourNight
+    FROM (
+      SELECT f.PickupDateKey AS DateKey, f.VendorKey, f.PickupLocationKey, {SUMMARY_TOTALS}
+      FROM Fact_Trip f
+      GROUP BY f.PickupDateKey, f.VendorKey, f.PickupLocationKey
+    ) b
+    LEFT JOIN (
+      SELECT DateKey, VendorKey, PickupLocationKey,
+        MAX(MaxOpenTrips) AS MaxSimultaneousTrips,
+        SUM(CASE WHEN TimeKey = 540 THEN OpenTrips ELSE 0 END) AS OpenAt09,
+        SUM(CASE WHEN TimeKey = 1080 THEN OpenTrips ELSE 0 END) AS OpenAt18
+      FROM Fact_ZoneConcurrency
+      GROUP BY DateKey, VendorKey, PickupLocationKey
+    ) o ON o.DateKey = b.DateKey AND o.VendorKey = b.VendorKey AND o.PickupLocationKey = b.PickupLocationKey""",
+
+    f"""CREATE TABLE Fact_Hourly_ZonePayment AS
+    SELECT
+      f.PickupDateKey AS DateKey,
+      CAST((f.PickupTimeKey // 60) * 60 AS INTEGER) AS PickupTimeKey,
+      f.PickupLocationKey,
+      f.PaymentTypeKey, {SUMMARY_TOTALS}
+    FROM Fact_Trip f
+    GROUP BY ALL""",
+]
+BUILD_VERSION = hashlib.sha256("\n".join(BUILD_STEPS + sorted(f"{k}={v}" for k, v in {**STAGE_TYPES, **CONCURRENCY_TYPES, **SKETCH_TYPES, **DIMENSION_TYPES}.items())).encode("utf-8")).hexdigest()[:16]
+
+_build_lock = threading.Lock()
+
+def default_source():
+    """The newest processed dataset: a parquet/arrow manifest or a CSV written by data_processing."""
+    candidates = [p for p in PROCESSED_DIR.glob("*.csv") if not p.name.endswith((".concurrency.csv", ".sketches.csv"))]
+    candidates += list(PROCESSED_DIR.glob("*/manifest.json"))
+    if not candidates:
+        raise FileNotFoundError(f"No processed dataset in {PROCESSED_DIR.as_posix()}; run data_processing/main.py first.")
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+def source_signature(source):
+    signature = {
+        "build": BUILD_VERSION,
+        "source": input_signature(source),
+        "concurrency": input_signature(concurrency_file(source)),
+        "sketches": input_signature(sketches_file(source)),
+        "dimensions": {name: input_signature(path) for name, path in dimension_files(source).items()},
+    }
+    if source.name == "manifest.json":
+        signature["partitions"] = [c["file"] for c in manifest_chunks(source)]
+    return json.dumps(signature, sort_keys=True)
+
+def stage_select(columns):
+    return ", ".join(f"CAST({c} AS {STAGE_TYPES[c]}) AS {c}" for c in STAGE_TYPES if c in columns)
+
+def load_stage(con, source):
+    """Stg_Trip from the processed dataset, with StgTripId in file order like the MySQL load."""
+    if source.name == "manifest.json":
+        files = [c for c in manifest_chunks(source)]
+        if files and files[0]["format"] == "parquet":
+            relation = con.read_parquet([c["file"] for c in files])
+        else:
+            import pyarrow as pa
+            import pyarrow.ipc as ipc
+            tables = []
+            for c in files:
+                with ipc.open_file(c["file"]) as reader:
+                    tables.append(reader.read_all())
+            arrow_stage = pa.concat_tables(tables)
+            relation = con.from_arrow(arrow_stage)
+    else:
+        relation = con.read_csv(str(source), header=True, na_values=[CSV_NULL], dtype={c: "VARCHAR" for c in STAGE_TYPES}, quotechar='"')
+    con.register("stage_source", relation)
+    con.execute(f"CREATE TABLE Stg_Trip AS SELECT CAST(row_number() OVER () AS BIGINT) AS StgTripId, {stage_select(relation.columns)} FROM stage_source")
+    con.unregister("stage_source")
+
+    concurrency = con.read_csv(str(concurrency_file(source)), header=True, dtype=CONCURRENCY_TYPES)
+    con.register("concurrency_source", concurrency)
+    con.execute("CREATE TABLE Stg_ZoneConcurrency AS SELECT * FROM concurrency_source")
+    con.unregister("concurrency_source")
+
+    sketches = con.read_csv(str(sketches_file(source)), header=True, dtype=SKETCH_TYPES)
+    con.register("sketch_source", sketches)
+    con.execute("""
+        CREATE TABLE Stg_ZoneSketch AS
+        SELECT DateKey, PickupTimeKey, PickupLocationKey, TripsCount,
+          COALESCE(from_base64(FareSketch), ''::BLOB) AS FareSketch,
+          COALESCE(from_base64(DurationSketch), ''::BLOB) AS DurationSketch,
+          COALESCE(from_base64(SpeedSketch), ''::BLOB) AS SpeedSketch,
+          COALESCE(from_base64(RouteHll), ''::BLOB) AS RouteHll
+        FROM sketch_source
+    """)
+    con.unregister("sketch_source")
+
+    for name, path in dimension_files(source).items():
+        types = {c: DIMENSION_TYPES.get(c, "INTEGER") for c in read_header(str(path))}
+        dimension = con.read_csv(str(path), header=True, na_values=[CSV_NULL], dtype=types, quotechar='"')
+        con.register("dimension_source", dimension)
+        con.execute(f"CREATE TABLE {name} AS SELECT *, 1 AS LoadBatchId FROM dimension_source")
+        con.unregister("dimension_source")
+
+def build(con, source):
+    started = time.perf_counter()
+    for table in [r[0] for r in con.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'main'").fetchall()]:
+        con.execute(f'DROP TABLE "{table}"')
+    load_stage(con, source)
+    for step in BUILD_STEPS:
+        con.execute(step)
+    # A single committed batch, so result_cache.load_version changes with every rebuild.
+    con.execute("""
+        CREATE TABLE Etl_LoadBatch AS
+        SELECT 1 AS LoadBatchId, ? AS Source, 'committed' AS Status,
+               CAST(now() AS TIMESTAMP) AS StartedAt, CAST(now() AS TIMESTAMP) AS FinishedAt,
+               (SELECT COUNT(*) FROM Fact_Trip) AS TripRows
+    """, [source.as_posix()])
+    con.execute("CREATE TABLE Dw_Source AS SELECT ? AS Signature", [source_signature(source)])
+    trips = con.execute("SELECT COUNT(*) FROM Fact_Trip").fetchone()[0]
+    print(f"Built DuckDB star schema from {source.as_posix()}: {trips:,} trips in {time.perf_counter() - started:.1f}s")
+
+def is_current(con, source):
+    try:
+        return con.execute("SELECT Signature FROM Dw_Source").fetchone()[0] == source_signature(source)
+    except duckdb.Error:
+        return False
+
+def connect_duckdb(source=None, db_path=DB_PATH, rebuild=False):
+    """(conn, "duckdb") for run_dw_queries.run_query; (re)builds the database when the dataset changed."""
+    source = Path(source) if source else default_source()
+    if not concurrency_file(source).exists():
+        raise FileNotFoundError(f"No {concurrency_file(source).name} next to {source.as_posix()}; run data_processing/main.py again.")
+    if not sketches_file(source).exists():
+        raise FileNotFoundError(f"No {sketches_file(source).name} next to {source.as_posix()}; run data_processing/main.py again.")
+    if not dimension_files(source):
+        raise FileNotFoundError(f"No {dimensions_dir(source).name} next to {source.as_posix()}; run data_processing/main.py again.")
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with _build_lock:
+        con = duckdb.connect(str(db_path))
+        if rebuild or not is_current(con, source):
+            build(con, source)
+    # MySQL sorts NULLs first in ascending order (the WITH ROLLUP total row of query1).
+    con.execute("SET default_null_order = 'nulls_first_on_asc_last_on_desc'")
+    return con, "duckdb"
+
+# MySQL treats a comparison as 0/1; DuckDB needs the cast before multiplying (see run_dw_queries.rewrite_segment).
+ROUTED_SUM = re.compile(r"SUM\(\((.+?)\) \* f\.TripsCount\)")
+COMPARISON = re.compile(r"=|<|>|\b(?:LIKE|IN|IS|BETWEEN)\b", flags=re.IGNORECASE)
+
+def to_duckdb_sql(sql_text):
+    """Translate the MySQL dialect used by the query files."""
+    sql = re.sub(r"--[^\n]*", "", sql_text).strip().rstrip(";")
+    sql = ROUTED_SUM.sub(
+        lambda m: f"SUM(CAST(({m.group(1)}) AS INTEGER) * f.TripsCount)" if COMPARISON.search(m.group(1)) else m.group(0), sql
+    )
+    sql = re.sub(r"GROUP BY\s+(.+?)\s+WITH ROLLUP", r"GROUP BY ROLLUP (\1)", sql, flags=re.IGNORECASE | re.DOTALL)
+    sql = re.sub(r"\bDIV\b", "//", sql, flags=re.IGNORECASE)
+    return sql.replace("%s", "?")
+
+def run_query(con, sql_text, params, profile=None):
+    profile = {} if profile is None else profile
+    cur = con.cursor()
+    try:
+        started = time.perf_counter()
+        cur.execute(to_duckdb_sql(sql_text), list(params) or None)
+        executed = time.perf_counter()
+        if cur.description is None:
+            return None
+        columns = [d[0] for d in cur.description]
+        rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+        profile.update(execute_seconds=executed - started, fetch_seconds=time.perf_counter() - executed)
+        return rows
+    finally:
+        cur.close()
+
+@contextlib.contextmanager
+def stream_query(con, sql_text, params, batch_size, profile):
+    """(columns, batches) from a cursor; DuckDB produces the result in chunks as fetchmany asks for them."""
+    cur = con.cursor()
+    try:
+        started = time.perf_counter()
+        cur.execute(to_duckdb_sql(sql_text), list(params) or None)
+        profile.update(execute_seconds=time.perf_counter() - started, fetch_seconds=0.0)
+        columns = [d[0] for d in cur.description] if cur.description else None
+
+        def batches():
+            while True:
+                started = time.perf_counter()
+                batch = cur.fetchmany(batch_size)
+                profile["fetch_seconds"] += time.perf_counter() - started
+                if not batch:
+                    return
+                yield batch
+
+        yield columns, batches() if columns else iter(())
+    finally:
+        cur.close()
+
+def comparable(rows, places=4):
+    """Rows as sorted tuples with numbers rounded: MySQL AVG is DECIMAL where DuckDB returns DOUBLE."""
+    quantum = Decimal(1).scaleb(-places)
+    def value(v):
+        if isinstance(v, (int, float, Decimal)) and not isinstance(v, bool):
+            return Decimal(str(v)).quantize(quantum)
+        return str(v) if v is not None else None
+    return sorted((tuple(value(v) for v in (r.values() if isinstance(r, dict) else r)) for r in rows or []), key=repr)
+
+def compare(name, expected, actual):
+    same = comparable(expected) == comparable(actual)
+    detail = "" if same else f" ({len(expected or [])} rows expected, {len(actual or [])} rows from DuckDB)"
+    print(f"  {name}: {'matches' if same else 'DIFFERS'}{detail}")
+    return same
+
+def main():
+    import result_files
+    from run_dw_queries import batch_params
+    from run_dw_queries import connect_mysql
+    from run_dw_queries import read_query_files
+    from run_dw_queries import run_query as run_mysql
+
+    parser = argparse.ArgumentParser(description="Build the star schema in an embedded DuckDB database and check it against MySQL.")
+    parser.add_argument("--source", help="Processed CSV or manifest.json (default: newest in dataset/processed)")
+    parser.add_argument("--db", default=str(DB_PATH), help="DuckDB database file")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the dataset is unchanged")
+    parser.add_argument("--compare-mysql", action="store_true", help="Run every query on MySQL and DuckDB and compare the results")
+    parser.add_argument("--compare-results", help="Compare with saved MySQL results from run_dw_queries.py --batch")
+    parser.add_argument("--params-file", help="Parameter values per query file (queries with parameters are skipped without it)")
+    args = parser.parse_args()
+
+    con, _ = connect_duckdb(args.source, args.db, args.rebuild)
+    if not (args.compare_mysql or args.compare_results):
+        return
+
+    params_by_file = json.loads(Path(args.params_file).read_text(encoding="utf-8")) if args.params_file else {}
+    mysql = connect_mysql() if args.compare_mysql else None
+    mismatches = 0
+    print("Comparing DuckDB results with MySQL:")
+    for fname, _, sql_text in read_query_files(Path(__file__).resolve().parent):
+        if args.compare_results:
+            stem = Path(args.compare_results) / Path(fname).stem
+            saved = next((p for p in (stem.with_suffix(".arrow"), stem.with_suffix(".parquet")) if p.exists()), None)
+            if saved is None:
+                print(f"  {fname}: no saved result, skipped")
+                continue
+            table = result_files.read_table(saved)
+            expected = table.to_pylist()
+            params = tuple(result_files.read_metadata(table).get("params", ()))
+        else:
+            try:
+                params = batch_params(fname, sql_text, params_by_file)
+            except ValueError as e:
+                print(f"  {fname}: skipped, {e}")
+                continue
+            expected = run_mysql(mysql[0], mysql[1], sql_text, params)
+        mismatches += not compare(fname, expected, run_query(con, sql_text, params))
+
+    if mysql:
+        mysql[0].close()
+    con.close()
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+import argparse
+import json
+import os
+import queue
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from run_dw_queries import connect_mysql
+
+SQL_DIR = Path(__file__).resolve().parent.parent
+STATE_DIR = Path("../../dataset/load_state")
+TABLE = "Stg_Trip"
+ROW_ID = "StgTripId"
+CONCURRENCY_TABLE = "Stg_ZoneConcurrency"
+SKETCH_TABLE = "Stg_ZoneSketch"
+CSV_NULL = "\\N"
+
+def split_statements(sql_text):
+    """Split a script on ';' outside quotes and comments (no DELIMITER blocks in our scripts)."""
+    statements, current = [], []
+    quote = None
+    i, n = 0, len(sql_text)
+    while i < n:
+        ch = sql_text[i]
+        if quote:
+            current.append(ch)
+            if ch == "\\" and quote != "`" and i + 1 < n:
+                current.append(sql_text[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in ("'", '"', "`"):
+            quote = ch
+            current.append(ch)
+        elif sql_text.startswith("--", i) or ch == "#":
+            end = sql_text.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        elif sql_text.startswith("/*", i):
+            end = sql_text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif ch == ";":
+            statements.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    statements.append("".join(current).strip())
+    return [s for s in statements if s]
+
+def execute(conn, sql, params=None):
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        return cur.fetchall() if cur.description else None
+    finally:
+        cur.close()
+
+def run_script(conn, path):
+    """Run a .sql file statement by statement; SOURCE lines (mysql client) are followed into SQL_DIR."""
+    started = time.perf_counter()
+    statements = split_statements(Path(path).read_text(encoding="utf-8"))
+    for sql in statements:
+        source = re.match(r"source\s+(\S+)$", sql, flags=re.IGNORECASE)
+        if source:
+            run_script(conn, SQL_DIR / Path(source.group(1)).name)
+        else:
+            execute(conn, sql)
+    conn.commit()
+    print(f"Ran {Path(path).name}: {len(statements)} statements in {time.perf_counter() - started:.1f}s")
+
+def input_signature(path):
+    stat = os.stat(path)
+    return {"path": Path(path).resolve().as_posix(), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def csv_chunks(path, chunk_bytes):
+    """Cut the CSV body on line boundaries into ~chunk_bytes pieces: (byte start, byte end, first row, rows)."""
+    chunks = []
+    row = 0
+    with open(path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                break
+            tail = b"" if data.endswith(b"\n") else f.readline()
+            rows = data.count(b"\n") + tail.count(b"\n") + (0 if (data + tail).endswith(b"\n") else 1)
+            end = start + len(data) + len(tail)
+            chunks.append({"start": start, "end": end, "first_row": row, "rows": rows})
+            start, row = end, row + rows
+    return chunks
+
+def manifest_chunks(path):
+    """One chunk per date partition of a parquet/arrow dataset written by save_dataset."""
+    manifest = json.loads(Path(path).read_text(encoding="utf-8"))
+    base = Path(path).parent
+    chunks = []
+    row = 0
+    for part in manifest["partitions"]:
+        chunks.append({"file": (base / part["path"]).as_posix(), "format": manifest["format"], "first_row": row, "rows": part["rows"]})
+        row += part["rows"]
+    return chunks
+
+def chunk_file(source, chunk, work_dir, index):
+    """Materialize a chunk as a headerless CSV that LOAD DATA can read."""
+    out_path = work_dir / f"chunk_{index:05d}.csv"
+    if "file" not in chunk:
+        with open(source, "rb") as src, open(out_path, "wb") as out:
+            src.seek(chunk["start"])
+            remaining = chunk["end"] - chunk["start"]
+            while remaining:
+                data = src.read(min(remaining, 1 << 20))
+                out.write(data)
+                remaining -= len(data)
+        return out_path
+
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    if chunk["format"] == "parquet":
+        table = pq.read_table(chunk["file"])
+    else:
+        with ipc.open_file(chunk["file"]) as reader:
+            table = reader.read_all()
+    table.to_pandas().to_csv(out_path, index=False, header=False, na_rep=CSV_NULL, lineterminator="\n")
+    return out_path
+
+def read_header(source):
+    if source.endswith(".json"):
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+        first = manifest_chunks(source)[0]
+        if first["format"] == "parquet":
+            return pq.read_schema(first["file"]).names
+        with ipc.open_file(first["file"]) as reader:
+            return reader.schema.names
+    with open(source, "r", encoding="utf-8") as f:
+        return f.readline().strip().split(",")
+
+def concurrency_file(source):
+    """The zone concurrency table data_processing/concurrency.py writes next to a processed dataset."""
+    path = Path(source)
+    return path.parent / "concurrency.csv" if path.name == "manifest.json" else path.with_name(f"{path.stem}.concurrency.csv")
+
+def load_concurrency(conn, source):
+    started = time.perf_counter()
+    path = concurrency_file(source)
+    execute(conn, f"DELETE FROM {CONCURRENCY_TABLE}")
+    execute(conn, f"""
+        LOAD DATA LOCAL INFILE '{path.resolve().as_posix()}'
+        INTO TABLE {CONCURRENCY_TABLE}
+        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+        LINES TERMINATED BY '\\n'
+        IGNORE 1 LINES
+        (DateKey, TimeKey, VendorKey, PickupLocationKey, OpenTrips, MaxOpenTrips)
+    """)
+    conn.commit()
+    print(f"Loaded {path.name} into {CONCURRENCY_TABLE} in {time.perf_counter() - started:.1f}s")
+
+def sketches_file(source):
+    """The zone sketches data_processing/sketches.py writes next to a processed dataset."""
+    path = Path(source)
+    return path.parent / "sketches.csv" if path.name == "manifest.json" else path.with_name(f"{path.stem}.sketches.csv")
+
+def load_sketches(conn, source):
+    started = time.perf_counter()
+    path = sketches_file(source)
+    execute(conn, f"DELETE FROM {SKETCH_TABLE}")
+    execute(conn, f"""
+        LOAD DATA LOCAL INFILE '{path.resolve().as_posix()}'
+        INTO TABLE {SKETCH_TABLE}
+        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+        LINES TERMINATED BY '\\n'
+        IGNORE 1 LINES
+        (DateKey, PickupTimeKey, PickupLocationKey, TripsCount, @fare, @duration, @speed, @routes)
+        SET FareSketch = FROM_BASE64(@fare), DurationSketch = FROM_BASE64(@duration),
+            SpeedSketch = FROM_BASE64(@speed), RouteHll = FROM_BASE64(@routes)
+    """)
+    conn.commit()
+    print(f"Loaded {path.name} into {SKETCH_TABLE} in {time.perf_counter() - started:.1f}s")
+
+def dimensions_dir(source):
+    """The dimension members data_processing/dimensions.py writes next to a processed dataset."""
+    path = Path(source)
+    return path.parent / "dimensions" if path.name == "manifest.json" else path.with_name(f"{path.stem}.dimensions")
+
+def source_name(source):
+    """Etl_LoadBatch.Source of a processed dataset: the CSV's file name, or a manifest's dataset directory."""
+    path = Path(source)
+    return path.parent.name if path.name == "manifest.json" else path.name
+
+def dimension_files(source):
+    """{Dim_* table: CSV} of a processed dataset."""
+    return {p.stem: p for p in sorted(dimensions_dir(source).glob("Dim_*.csv"))}
+
+def load_dimensions(conn, source):
+    """Each Dim_<name>.csv into its Stg_<name> table, for etl_warehouse.sql to add the missing members."""
+    started = time.perf_counter()
+    files = dimension_files(source)
+    for name, path in files.items():
+        table = name.replace("Dim_", "Stg_", 1)
+        execute(conn, f"DELETE FROM {table}")
+        execute(conn, f"""
+            LOAD DATA LOCAL INFILE '{path.resolve().as_posix()}'
+            INTO TABLE {table}
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            IGNORE 1 LINES
+            ({', '.join(read_header(str(path)))})
+        """)
+    conn.commit()
+    print(f"Loaded {len(files)} dimension files into staging in {time.perf_counter() - started:.1f}s")
+
+def secondary_indexes(conn, table):
+    """Non-primary index definitions of a table, so they can be dropped for the load and rebuilt after."""
+    rows = execute(conn, """
+        SELECT INDEX_NAME, NON_UNIQUE, COLUMN_NAME, SUB_PART
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY'
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (table,)) or []
+    indexes = {}
+    for row in rows:
+        name, non_unique, column, sub_part = row.values() if isinstance(row, dict) else row
+        column_sql = f"`{column}`" + (f"({sub_part})" if sub_part else "")
+        indexes.setdefault(name, {"unique": not int(non_unique), "columns": []})["columns"].append(column_sql)
+    return indexes
+
+def drop_indexes(conn, table, indexes):
+    for name in indexes:
+        execute(conn, f"ALTER TABLE `{table}` DROP INDEX `{name}`")
+    if indexes:
+        print(f"Dropped {len(indexes)} secondary index(es) on {table} for the load")
+
+def create_indexes(conn, table, indexes):
+    if not indexes:
+        return
+    started = time.perf_counter()
+    clauses = [
+        f"ADD {'UNIQUE ' if spec['unique'] else ''}INDEX `{name}` ({', '.join(spec['columns'])})"
+        for name, spec in indexes.items()
+    ]
+    execute(conn, f"ALTER TABLE `{table}` " + ", ".join(clauses))
+    print(f"Rebuilt {len(indexes)} secondary index(es) on {table} in {time.perf_counter() - started:.1f}s")
+
+def load_chunk(pool, source, chunk, columns, work_dir, index):
+    """Load one chunk with explicit row ids; a retried chunk first removes whatever it left behind."""
+    started = time.perf_counter()
+    path = chunk_file(source, chunk, work_dir, index)
+    conn = pool.get()
+    try:
+        first_id = chunk["first_row"] + 1
+        last_id = chunk["first_row"] + chunk["rows"]
+        execute(conn, "SET SESSION foreign_key_checks = 0")
+        execute(conn, "SET SESSION unique_checks = 0")
+        execute(conn, f"DELETE FROM {TABLE} WHERE {ROW_ID} BETWEEN %s AND %s", (first_id, last_id))
+        # Row ids follow the file order, so the parallel load numbers rows exactly like the serial one.
+        execute(conn, "SET @row_id = %s", (first_id - 1,))
+        execute(conn, f"""
+            LOAD DATA LOCAL INFILE '{path.resolve().as_posix()}'
+            INTO TABLE {TABLE}
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            ({', '.join(columns)})
+            SET {ROW_ID} = (@row_id := @row_id + 1)
+        """)
+        conn.commit()
+    finally:
+        pool.put(conn)
+    os.remove(path)
+    return index, chunk["rows"], time.perf_counter() - started
+
+def save_state(state_path, state):
+    tmp_path = state_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp_path, state_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a processed dataset into Stg_Trip in parallel chunks.")
+    parser.add_argument("input", nargs="?", help="Processed CSV, or manifest.json of a parquet/arrow dataset")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel connections")
+    parser.add_argument("--chunk-mb", type=int, default=64, help="CSV chunk size")
+    parser.add_argument("--resume", action="store_true", help="Continue a failed load, skipping chunks already loaded")
+    parser.add_argument("--warehouse", action="store_true", help="Rebuild the warehouse from scratch after the load")
+    parser.add_argument("--incremental", action="store_true", help="Merge the load into the existing warehouse as a new batch")
+    parser.add_argument("--rollback", nargs="?", type=int, const=0, metavar="BATCH", help="Undo a load batch (default: the latest) and exit")
+    args = parser.parse_args()
+
+    if args.rollback is not None:
+        conn, _ = connect_mysql()
+        execute(conn, "SET @rollback_batch = %s", (args.rollback or None,))
+        run_script(conn, SQL_DIR / "etl_rollback.sql")
+        conn.close()
+        return
+
+    source = args.input
+    if source is None:
+        parser.error("input is required unless --rollback is given")
+    if not concurrency_file(source).exists():
+        sys.exit(f"Missing {concurrency_file(source).as_posix()}; rerun data_processing/main.py to write it.")
+    if not sketches_file(source).exists():
+        sys.exit(f"Missing {sketches_file(source).as_posix()}; rerun data_processing/main.py to write it.")
+    if not dimension_files(source):
+        sys.exit(f"Missing {dimensions_dir(source).as_posix()}; rerun data_processing/main.py to write it.")
+    signature = input_signature(source)
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    state_path = STATE_DIR / f"{Path(source).parent.name if source.endswith('.json') else Path(source).stem}.json"
+    work_dir = STATE_DIR / f"{state_path.stem}_chunks"
+    work_dir.mkdir(exist_ok=True)
+
+    conn, driver = connect_mysql(local_infile=True)
+    print(f"Connected using: {driver} (host={os.getenv('DW_HOST','localhost')}, db={os.getenv('DW_DATABASE','')})")
+    if args.incremental:
+        # etl_warehouse.sql refuses it too, but only after the whole staging load.
+        row = execute(conn, "SELECT MAX(LoadBatchId) AS batch FROM Etl_LoadBatch WHERE Source = %s AND Status = 'committed'", (source_name(source),))[0]
+        batch = row["batch"] if isinstance(row, dict) else row[0]
+        if batch is not None:
+            conn.close()
+            sys.exit(f"{source_name(source)} is already loaded as batch {batch}; roll it back with --rollback {batch} first.")
+
+    state = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else None
+    if args.resume and state is not None and state["input"] == signature:
+        pending = [i for i, c in enumerate(state["chunks"]) if not c.get("done")]
+        print(f"Resuming load of {source}: {len(pending)} of {len(state['chunks'])} chunks left")
+    else:
+        if args.resume:
+            print("No matching checkpoint for this input, starting a fresh load.")
+        run_script(conn, SQL_DIR / "etl_staging.sql")
+        chunks = manifest_chunks(source) if source.endswith(".json") else csv_chunks(source, args.chunk_mb * 2**20)
+        state = {"input": signature, "indexes": secondary_indexes(conn, TABLE), "chunks": chunks}
+        drop_indexes(conn, TABLE, state["indexes"])
+        save_state(state_path, state)
+        pending = list(range(len(chunks)))
+
+    columns = read_header(source)
+    total_rows = sum(state["chunks"][i]["rows"] for i in pending)
+    print(f"Loading {total_rows:,} rows in {len(pending)} chunks over {args.workers} connection(s)...")
+
+    pool = queue.Queue()
+    for _ in range(args.workers):
+        pool.put(connect_mysql(local_infile=True)[0])
+
+    started = time.perf_counter()
+    loaded = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(load_chunk, pool, source, state["chunks"][i], columns, work_dir, i): i for i in pending}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                _, rows, seconds = future.result()
+            except Exception as e:
+                failed.append(i)
+                print(f"ERROR loading chunk {i}: {e}")
+                continue
+            state["chunks"][i]["done"] = True
+            save_state(state_path, state)
+            loaded += rows
+            print(f"[chunk {i}] {rows:,} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+
+    while not pool.empty():
+        pool.get().close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {loaded:,} rows in {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):,.0f} rows/s)")
+    if failed:
+        print(f"{len(failed)} chunk(s) failed; rerun with --resume to load only those.")
+        conn.close()
+        sys.exit(1)
+
+    load_concurrency(conn, source)
+    load_sketches(conn, source)
+    load_dimensions(conn, source)
+    create_indexes(conn, TABLE, state["indexes"])
+    state_path.unlink()
+    work_dir.rmdir()
+    if args.warehouse or args.incremental:
+        if args.warehouse:
+            run_script(conn, SQL_DIR / "etl_schema.sql")
+        execute(conn, "SET @load_source = %s", (source_name(source),))
+        run_script(conn, SQL_DIR / "etl_warehouse.sql")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
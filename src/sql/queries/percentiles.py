@@ -0,0 +1,195 @@
+import argparse
+import math
+import struct
+import time
+from collections import Counter
+
+from run_dw_queries import connect
+from run_dw_queries import print_table
+from run_dw_queries import run_query
+
+# The sketch encoding of data_processing/sketches.py (which this container does not ship):
+# (bucket int16, count uint32) pairs of a log-bucket histogram, and (register uint16, rank uint8)
+# pairs of a HyperLogLog of (pickup, dropoff) zone pairs. tests/test_percentiles.py checks that
+# the two copies agree. Values <= 0 all fall in ZERO_BUCKET and read back as 0; validation.py
+# quarantines negative amounts, so only rows loaded around the pipeline can have any.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+ZERO_BUCKET = -32768
+HLL_PRECISION = 12
+BUCKET_FORMAT = struct.Struct("<hI")
+REGISTER_FORMAT = struct.Struct("<HB")
+
+# --measure -> (Fact_Hourly_ZoneSketch column, Fact_Trip column).
+MEASURES = {
+    "fare": ("FareSketch", "FareAmount"),
+    "duration": ("DurationSketch", "TripDurationMinutes"),
+    "speed": ("SpeedSketch", "AverageSpeedMph"),
+}
+# --by -> (sketch expression, Fact_Trip expression); l is Dim_Location of the pickup zone.
+GROUPS = {
+    "none": ("'all'", "'all'"),
+    "date": ("s.DateKey", "f.PickupDateKey"),
+    "hour": ("s.PickupTimeKey DIV 60", "f.PickupTimeKey DIV 60"),
+    "zone": ("l.Zone", "l.Zone"),
+    "borough": ("l.Borough", "l.Borough"),
+}
+
+def merge_sketch(counts, blob):
+    for bucket, count in BUCKET_FORMAT.iter_unpack(bytes(blob or b"")):
+        counts[bucket] += count
+
+def bucket_value(bucket):
+    """The value a bucket stands for, within RELATIVE_ACCURACY of everything in it."""
+    return 0.0 if bucket == ZERO_BUCKET else 2 * GAMMA ** bucket / (GAMMA + 1)
+
+def sketch_quantiles(counts, quantiles):
+    """Quantiles of a merged sketch, by the same rank as exact_quantiles."""
+    total = sum(counts.values())
+    if not total:
+        return [None] * len(quantiles)
+    buckets = sorted(counts)
+    out = []
+    for q in quantiles:
+        rank = math.floor(q * (total - 1))
+        seen = 0
+        for bucket in buckets:
+            seen += counts[bucket]
+            if seen > rank:
+                out.append(bucket_value(bucket))
+                break
+    return out
+
+def exact_quantiles(values, quantiles):
+    values = sorted(values)
+    if not values:
+        return [None] * len(quantiles)
+    return [values[math.floor(q * (len(values) - 1))] for q in quantiles]
+
+def merge_hll(registers, blob):
+    for register, rank in REGISTER_FORMAT.iter_unpack(bytes(blob or b"")):
+        if rank > registers.get(register, 0):
+            registers[register] = rank
+
+def hll_estimate(registers):
+    """HyperLogLog cardinality, with linear counting while registers are still empty."""
+    m = 1 << HLL_PRECISION
+    empty = m - len(registers)
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / (empty + sum(2.0 ** -rank for rank in registers.values()))
+    if estimate <= 2.5 * m and empty:
+        return m * math.log(m / empty)
+    return estimate
+
+def slice_filter(args, date_col, time_col, hour_span):
+    """WHERE clause and params of the --from/--to/--hours/--zones/--borough slice."""
+    first_hour, last_hour = args.hours
+    clauses = [f"{date_col} BETWEEN %s AND %s", f"{time_col} BETWEEN %s AND %s"]
+    params = [args.date_from, args.date_to, first_hour * 60, last_hour * 60 + hour_span]
+    if args.zones:
+        clauses.append(f"l.LocationKey IN ({', '.join(['%s'] * len(args.zones))})")
+        params += args.zones
+    if args.borough:
+        clauses.append("l.Borough = %s")
+        params.append(args.borough)
+    return " AND ".join(clauses), params
+
+def merged_slice(conn, driver, args, quantiles):
+    """{group: [trips, quantile values..., distinct routes]} from Fact_Hourly_ZoneSketch."""
+    group = GROUPS[args.by][0]
+    column = MEASURES[args.measure][0]
+    where, params = slice_filter(args, "s.DateKey", "s.PickupTimeKey", 0)
+    rows = run_query(conn, driver, f"""
+        SELECT {group} AS GroupKey, s.TripsCount, s.{column} AS Sketch, s.RouteHll
+        FROM Fact_Hourly_ZoneSketch s
+        JOIN Dim_Location l ON l.LocationKey = s.PickupLocationKey
+        WHERE {where}
+    """, params)
+    groups = {}
+    for row in rows:
+        trips, counts, registers = groups.setdefault(row["GroupKey"], [0, Counter(), {}])
+        groups[row["GroupKey"]][0] = trips + row["TripsCount"]
+        merge_sketch(counts, row["Sketch"])
+        merge_hll(registers, row["RouteHll"])
+    return {
+        key: [trips] + sketch_quantiles(counts, quantiles) + [round(hll_estimate(registers))]
+        for key, (trips, counts, registers) in groups.items()
+    }
+
+def exact_slice(conn, driver, args, quantiles):
+    """The same figures computed from every Fact_Trip row of the slice."""
+    group = GROUPS[args.by][1]
+    column = MEASURES[args.measure][1]
+    where, params = slice_filter(args, "f.PickupDateKey", "f.PickupTimeKey", 59)
+    rows = run_query(conn, driver, f"""
+        SELECT {group} AS GroupKey, f.{column} AS Value, f.PickupLocationKey, f.DropoffLocationKey
+        FROM Fact_Trip f
+        JOIN Dim_Location l ON l.LocationKey = f.PickupLocationKey
+        WHERE {where}
+    """, params)
+    groups = {}
+    for row in rows:
+        trips, values, routes = groups.setdefault(row["GroupKey"], [0, [], set()])
+        groups[row["GroupKey"]][0] = trips + 1
+        if row["Value"] is not None:
+            # Clamped as the sketch stores it, so a negative value is not reported as an error.
+            values.append(max(float(row["Value"]), 0.0))
+        routes.add((row["PickupLocationKey"], row["DropoffLocationKey"]))
+    return {
+        key: [trips] + exact_quantiles(values, quantiles) + [len(routes)]
+        for key, (trips, values, routes) in groups.items()
+    }
+
+def relative_error(estimate, exact):
+    if estimate is None or exact is None:
+        return 0.0
+    return abs(estimate - exact) / abs(exact) if exact else abs(estimate)
+
+def fmt(value):
+    return f"{value:,.2f}" if isinstance(value, float) else value
+
+def parse_hours(text):
+    first, _, last = text.partition("-")
+    return int(first), int(last or first)
+
+def main():
+    parser = argparse.ArgumentParser(description="Percentiles and distinct routes over any date, hour or zone slice, merged from Fact_Hourly_ZoneSketch.")
+    parser.add_argument("--measure", choices=list(MEASURES), default="fare")
+    parser.add_argument("--by", choices=list(GROUPS), default="none", help="One result row per date, pickup hour, zone or borough")
+    parser.add_argument("--from", dest="date_from", type=int, default=0, help="First DateKey (yyyymmdd)")
+    parser.add_argument("--to", dest="date_to", type=int, default=99991231, help="Last DateKey (yyyymmdd)")
+    parser.add_argument("--hours", type=parse_hours, default=(0, 23), help="Pickup hours, e.g. 7-9")
+    parser.add_argument("--zones", type=int, nargs="+", help="Pickup LocationKeys")
+    parser.add_argument("--borough", help="Pickup borough")
+    parser.add_argument("--quantiles", type=float, nargs="+", default=[0.5, 0.9, 0.99])
+    parser.add_argument("--check", action="store_true", help="Also compute the exact figures from Fact_Trip and report the error")
+    parser.add_argument("--backend", choices=["mysql", "duckdb"], default="mysql")
+    parser.add_argument("--duckdb-source", help="Processed dataset for --backend duckdb (default: newest)")
+    parser.add_argument("--max-rows", type=int, default=30)
+    args = parser.parse_args()
+
+    conn, driver = connect(args.backend, args.duckdb_source)
+    started = time.perf_counter()
+    merged = merged_slice(conn, driver, args, args.quantiles)
+    print(f"Merged sketches of {sum(v[0] for v in merged.values()):,} trips in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    labels = [f"p{q * 100:g}" for q in args.quantiles]
+    columns = [args.by.capitalize() if args.by != "none" else "Slice", "Trips"] + labels + ["DistinctRoutes"]
+    print_table(columns, [[[key] + [fmt(v) for v in merged[key]] for key in sorted(merged, key=str)]], args.max_rows, total=len(merged))
+
+    if args.check:
+        started = time.perf_counter()
+        exact = exact_slice(conn, driver, args, args.quantiles)
+        print(f"\nExact figures from Fact_Trip in {(time.perf_counter() - started) * 1000:.0f} ms")
+        worst_quantile = worst_routes = 0.0
+        for key, row in exact.items():
+            estimate = merged.get(key)
+            if estimate is None or estimate[0] != row[0]:
+                print(f"  {key}: {row[0]} trips in Fact_Trip, {estimate[0] if estimate else 0} in the sketches")
+                continue
+            worst_quantile = max([worst_quantile] + [relative_error(e, x) for e, x in zip(estimate[1:-1], row[1:-1])])
+            worst_routes = max(worst_routes, relative_error(estimate[-1], row[-1]))
+        print(f"Largest relative error: {worst_quantile:.2%} on quantiles (bound {RELATIVE_ACCURACY:.0%}), {worst_routes:.2%} on distinct routes")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
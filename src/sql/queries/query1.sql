@@ -6,6 +6,6 @@ SELECT
   SUM(f.TotalAmount) AS Revenue
 FROM Fact_Trip f
 JOIN Dim_Date d ON d.DateKey = f.PickupDateKey
-WHERE d.FullDate >= '2025-07-01' AND d.FullDate < '2025-08-01'
+WHERE f.PickupDateKey >= 20250701 AND f.PickupDateKey < 20250801   -- prunes to the July partition
 GROUP BY d.FullDate WITH ROLLUP
 ORDER BY d.FullDate;
@@ -10,7 +10,7 @@ FROM Fact_Trip f
 JOIN Dim_Date d         ON d.DateKey = f.PickupDateKey
 JOIN Dim_TimeOfDay tod  ON tod.TimeKey = f.PickupTimeKey
 JOIN Dim_TripCharacteristics tc ON tc.TripCharacteristicsKey = f.TripCharacteristicsKey
-WHERE d.FullDate >= '2025-07-01' AND d.FullDate < '2025-08-01'
+WHERE f.PickupDateKey >= 20250701 AND f.PickupDateKey < 20250801   -- prunes to the July partition
   AND d.IsWeekend = 1
   AND tod.Hour BETWEEN 20 AND 23
   AND tc.IsAirportTrip = 1
@@ -6,9 +6,8 @@ SELECT
   SUM(pt.PaymentTypeDesc = 'Credit card') AS Trips_Card,
   COUNT(*) AS Trips_Total
 FROM Fact_Trip f
-JOIN Dim_Date d          ON d.DateKey = f.PickupDateKey
 JOIN Dim_Location pu     ON pu.LocationKey = f.PickupLocationKey
 JOIN Dim_PaymentType pt  ON pt.PaymentTypeKey = f.PaymentTypeKey
-WHERE d.FullDate >= '2025-07-01' AND d.FullDate < '2025-08-01'
+WHERE f.PickupDateKey >= 20250701 AND f.PickupDateKey < 20250801   -- prunes to the July partition
 GROUP BY pu.Borough
 ORDER BY Trips_Total DESC;
@@ -5,9 +5,8 @@ WITH zone_rev AS (
     pu.Zone,
     SUM(f.TotalAmount) AS Revenue
   FROM Fact_Trip f
-  JOIN Dim_Date d       ON d.DateKey = f.PickupDateKey
   JOIN Dim_Location pu  ON pu.LocationKey = f.PickupLocationKey
-  WHERE d.FullDate >= '2025-07-01' AND d.FullDate < '2025-08-01'
+  WHERE f.PickupDateKey >= 20250701 AND f.PickupDateKey < 20250801   -- prunes to the July partition
   GROUP BY pu.Zone
 ),
 ranked AS (
@@ -9,8 +9,7 @@ trip_agg AS (
     COUNT(*)            AS Trips_FromFactTrip,
     SUM(f.TotalAmount)  AS Total_FromFactTrip
   FROM Fact_Trip f
-  JOIN Dim_Date d ON d.DateKey = f.PickupDateKey
-  WHERE d.FullDate >= '2025-07-01' AND d.FullDate < '2025-08-01'
+  WHERE f.PickupDateKey >= 20250701 AND f.PickupDateKey < 20250801   -- prunes to the July partition
   GROUP BY f.PickupDateKey, f.VendorKey, f.PickupLocationKey
 ),
 dzv_agg AS (
@@ -21,8 +20,7 @@ dzv_agg AS (
     dzv.TripsCount       AS Trips_DailyFact,
     dzv.TotalTotalAmount AS Total_DailyFact
   FROM Fact_Daily_ZoneVendor dzv
-  JOIN Dim_Date d ON d.DateKey = dzv.DateKey
-  WHERE d.FullDate >= '2025-07-01' AND d.FullDate < '2025-08-01'
+  WHERE dzv.DateKey >= 20250701 AND dzv.DateKey < 20250801
 ),
 all_keys AS (
   SELECT DateKey, VendorKey, PickupLocationKey FROM trip_agg
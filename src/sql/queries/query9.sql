@@ -3,19 +3,15 @@
 WITH h1 AS (
   SELECT pu.Borough, SUM(f.TotalAmount) AS Revenue
   FROM Fact_Trip f
-  JOIN Dim_Date d      ON d.DateKey = f.PickupDateKey
   JOIN Dim_Location pu ON pu.LocationKey = f.PickupLocationKey
-  WHERE d.FullDate >= '2025-07-01' AND d.FullDate < '2025-08-01'
-    AND d.Day <= 15
+  WHERE f.PickupDateKey >= 20250701 AND f.PickupDateKey < 20250716   -- prunes to the July partition
   GROUP BY pu.Borough
 ),
 h2 AS (
   SELECT pu.Borough, SUM(f.TotalAmount) AS Revenue
   FROM Fact_Trip f
-  JOIN Dim_Date d      ON d.DateKey = f.PickupDateKey
   JOIN Dim_Location pu ON pu.LocationKey = f.PickupLocationKey
-  WHERE d.FullDate >= '2025-07-01' AND d.FullDate < '2025-08-01'
-    AND d.Day >= 16
+  WHERE f.PickupDateKey >= 20250716 AND f.PickupDateKey < 20250801
   GROUP BY pu.Borough
 ),
 unioned AS (
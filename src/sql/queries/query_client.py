@@ -0,0 +1,100 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+from urllib.parse import quote
+from urllib.parse import urlencode
+
+# Where query_service.py listens: host:port, or unix:<path> for a Unix socket. Only the standard
+# library is imported up front, so a client script starts in milliseconds.
+DEFAULT_ADDRESS = os.getenv("DW_SERVICE", "127.0.0.1:8765")
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=60):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def open_connection(address=DEFAULT_ADDRESS, timeout=60):
+    """A keep-alive connection to the service; reuse it so each query costs one round trip."""
+    if address.startswith("unix:"):
+        return UnixHTTPConnection(address[len("unix:"):], timeout)
+    host, _, port = address.rpartition(":")
+    return http.client.HTTPConnection(host or "127.0.0.1", int(port), timeout=timeout)
+
+def request(conn, method, path, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path}: {response.status} {json.loads(data).get('error', data)}")
+    return response.getheader("Content-Type"), data
+
+def list_queries(conn):
+    return json.loads(request(conn, "GET", "/queries")[1])
+
+def fetch(conn, name, params=None, fmt="json"):
+    """Run a named query: a dict with columns, rows and run details for json, a pyarrow Table for arrow."""
+    query = urlencode({**(params or {}), "format": fmt})
+    content_type, data = request(conn, "GET", f"/queries/{quote(name)}?{query}")
+    if content_type == ARROW_STREAM:
+        import pyarrow.ipc as ipc
+        return ipc.open_stream(data).read_all()
+    return json.loads(data)
+
+def parse_param(text):
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text}")
+    return name, value
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a named query on query_service.py and time the round trips.")
+    parser.add_argument("query", nargs="?", help="Query file name (query7 or query7.sql); without it, list the queries")
+    parser.add_argument("--param", type=parse_param, action="append", default=[], metavar="NAME=VALUE")
+    parser.add_argument("--format", choices=("json", "arrow"), default="json")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="host:port or unix:<socket path> (env DW_SERVICE)")
+    parser.add_argument("--repeat", type=int, default=1, help="Run the query this many times over one connection and report the round trips")
+    args = parser.parse_args()
+
+    conn = open_connection(args.address)
+    try:
+        if args.query is None:
+            for q in list_queries(conn):
+                params = ", ".join(f"{p['name']}:{p['type']}" for p in q["params"])
+                print(f"  {q['query']}  —  {q['title']}" + (f"  ({params})" if params else ""))
+            return
+
+        timings = []
+        for _ in range(max(1, args.repeat)):
+            started = time.perf_counter()
+            result = fetch(conn, args.query, dict(args.param), args.format)
+            timings.append((time.perf_counter() - started) * 1000)
+    except (OSError, RuntimeError) as e:
+        sys.exit(f"ERROR: {e}")
+    finally:
+        conn.close()
+
+    if args.format == "arrow":
+        print(result.to_pandas().head(30).to_string(index=False) if result.num_rows else "(0 rows)")
+    else:
+        from run_dw_queries import print_table
+        print_table(result["columns"], [result["rows"]], total=result["row_count"])
+        notes = ", ".join(n for n in (result["summary_table"], result["cache"] and f"cached in {result['cache']}") if n)
+        print(f"Server time {result['seconds'] * 1000:.1f} ms" + (f" ({notes})" if notes else ""))
+    print(f"Round trip: first {timings[0]:.1f} ms" + (
+        f", median {statistics.median(timings[1:]):.1f} ms over {len(timings) - 1} more" if len(timings) > 1 else ""
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import hashlib
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+HISTORY_PATH = Path(__file__).resolve().parent / ".profile_history.jsonl"
+SCHEMA_FILES = [Path(__file__).resolve().parent.parent / name for name in ("etl_schema.sql", "etl_refresh_summaries.sql")]
+# Session counters worth watching: index vs full reads, and temp tables spilled to disk.
+STATUS_SQL = """
+    SHOW SESSION STATUS
+    WHERE Variable_name LIKE 'Handler_read%'
+       OR Variable_name IN ('Created_tmp_tables', 'Created_tmp_disk_tables', 'Sort_merge_passes', 'Select_scan')
+"""
+DEFAULT_THRESHOLD = 1.25
+DEFAULT_MIN_MS = 5.0
+
+_history_lock = threading.Lock()
+
+def schema_version():
+    """Hash of the warehouse DDL, so history rows from before a schema change can be told apart."""
+    digest = hashlib.sha256()
+    for path in SCHEMA_FILES:
+        if path.exists():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+def session_status(query):
+    """MySQL status counters as {name: int}; `query(sql, params)` returns dict rows. Empty when unavailable."""
+    try:
+        rows = query(STATUS_SQL, ()) or []
+    except Exception:
+        return {}
+    status = {}
+    for r in rows:
+        values = list(r.values())
+        try:
+            status[str(values[0])] = int(values[1])
+        except (TypeError, ValueError):
+            pass
+    return status
+
+def counter_deltas(before, after):
+    return {name: after[name] - before.get(name, 0) for name in sorted(after) if after[name] - before.get(name, 0)}
+
+def explain_analyze(query, sql_text, params):
+    """The executed plan with actual timings and row counts (MySQL 8.0.18+ and DuckDB)."""
+    try:
+        rows = query("EXPLAIN ANALYZE " + sql_text.strip().rstrip(";"), params) or []
+    except Exception as e:
+        return f"EXPLAIN ANALYZE failed: {e}"
+    return "\n".join(str(list(r.values())[-1] if isinstance(r, dict) else r[-1]) for r in rows)
+
+def result_bytes(rows):
+    """Size of the result as text, a driver-independent stand-in for bytes on the wire."""
+    total = 0
+    for r in rows or []:
+        for v in (r.values() if isinstance(r, dict) else r):
+            total += len(str(v).encode("utf-8")) if v is not None else 0
+    return total
+
+def make_record(fname, sql_text, params, backend, wall_seconds, stats, rows, table, tier):
+    return {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "query": fname,
+        "sql_hash": hashlib.sha256(sql_text.encode("utf-8")).hexdigest()[:12],
+        "params": [str(p) for p in params],
+        "backend": backend,
+        "load_version": stats.get("load_version"),
+        "schema_version": schema_version(),
+        "summary_table": table,
+        "cache": tier,
+        "wall_seconds": round(wall_seconds, 6),
+        "execute_seconds": round(stats["execute_seconds"], 6) if "execute_seconds" in stats else None,
+        "fetch_seconds": round(stats["fetch_seconds"], 6) if "fetch_seconds" in stats else None,
+        "rows": len(rows or []),
+        "bytes": result_bytes(rows),
+    }
+
+def append_history(record, path=HISTORY_PATH):
+    line = json.dumps(record, default=str)
+    with _history_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+def read_history(path=HISTORY_PATH):
+    records = []
+    if not Path(path).exists():
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def describe(record):
+    parts = [f"{record['wall_seconds']:.3f}s wall"]
+    if record.get("execute_seconds") is not None:
+        parts.append(f"execute {record['execute_seconds']:.3f}s, fetch {record['fetch_seconds']:.3f}s")
+    parts.append(f"{record['rows']} rows, {record['bytes'] / 1024:.1f} KB")
+    return "; ".join(parts)
+
+def environment(record):
+    """What the timings depend on besides the query: warehouse contents, schema and backend."""
+    return (record.get("backend"), record.get("load_version"), record.get("schema_version"))
+
+def compare(records, threshold=DEFAULT_THRESHOLD, min_ms=DEFAULT_MIN_MS):
+    """Per query, the median of the latest environment against the one before it.
+
+    Cache hits never reach the database, so only executed runs count.
+    Returns [(query, before seconds, after seconds, ratio, slower)].
+    """
+    runs = {}
+    for r in records:
+        if r.get("cache") is None:
+            runs.setdefault((r["query"], r.get("backend")), []).append(r)
+
+    rows = []
+    for (query, _), history in sorted(runs.items()):
+        order = []
+        for r in history:
+            if environment(r) in order:
+                order.remove(environment(r))
+            order.append(environment(r))
+        if len(order) < 2:
+            continue
+        before = statistics.median(r["wall_seconds"] for r in history if environment(r) == order[-2])
+        after = statistics.median(r["wall_seconds"] for r in history if environment(r) == order[-1])
+        ratio = after / before if before else float("inf")
+        slower = ratio > threshold and (after - before) * 1000 > min_ms
+        rows.append((query, before, after, ratio, slower))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag queries that got slower after an ETL run or schema change.")
+    parser.add_argument("--history", default=str(HISTORY_PATH), help="History file written by run_dw_queries.py")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Slowdown ratio that counts as a regression")
+    parser.add_argument("--min-ms", type=float, default=DEFAULT_MIN_MS, help="Ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    rows = compare(read_history(args.history), args.threshold, args.min_ms)
+    if not rows:
+        print("Nothing to compare: every query needs runs before and after an ETL or schema change.")
+        return
+    print(f"{'query':<14} {'before':>10} {'after':>10} {'ratio':>7}")
+    for query, before, after, ratio, slower in rows:
+        print(f"{query:<14} {before:>9.3f}s {after:>9.3f}s {ratio:>6.2f}x{'  SLOWER' if slower else ''}")
+    regressions = sum(slower for *_, slower in rows)
+    if regressions:
+        print(f"{regressions} of {len(rows)} queries got slower than {args.threshold:.2f}x.")
+        sys.exit(1)
+    print(f"No query got slower than {args.threshold:.2f}x.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import queue
+import signal
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+import query_profile
+import result_cache
+import result_files
+from run_dw_queries import coerce
+from run_dw_queries import connect
+from run_dw_queries import parse_params
+from run_dw_queries import query_title
+from run_dw_queries import rows_payload
+from run_dw_queries import run_profiled
+
+QUERY_DIR = Path(__file__).resolve().parent
+DEFAULT_PORT = 8765
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Query files parsed once: name -> {"mtime_ns", "title", "sql", "params"}. A file is parsed
+# again only when its mtime changes, and dropped when it disappears.
+_catalog = {}
+_catalog_lock = threading.Lock()
+
+def parse_query_file(path):
+    sql = path.read_text(encoding="utf-8", errors="ignore")
+    return {"title": query_title(sql, path.stem), "sql": sql, "params": parse_params(sql)}
+
+def refresh_catalog(folder=QUERY_DIR):
+    """The query files of folder, re-reading only the ones that changed since the last call."""
+    with _catalog_lock:
+        seen = set()
+        for path in folder.glob("*.sql"):
+            mtime_ns = path.stat().st_mtime_ns
+            seen.add(path.name)
+            entry = _catalog.get(path.name)
+            if entry is None or entry["mtime_ns"] != mtime_ns:
+                _catalog[path.name] = {"mtime_ns": mtime_ns, **parse_query_file(path)}
+                if entry is not None:
+                    print(f"Reloaded {path.name}")
+        for name in set(_catalog) - seen:
+            del _catalog[name]
+            print(f"Dropped {name}")
+        return dict(_catalog)
+
+def query_params(entry, given):
+    """Parameter values in the order of the file's -- params: line, coerced to their types."""
+    missing = [name for name, _ in entry["params"] if name not in given]
+    if missing:
+        raise ValueError(f"missing parameters {', '.join(missing)}")
+    return tuple(coerce(str(given[name]), typ) for name, typ in entry["params"])
+
+def open_pool(args):
+    """Warm connections, opened once and shared by the request threads."""
+    pool = queue.Queue()
+    for _ in range(max(1, args.workers)):
+        pool.put(connect(args.backend, args.duckdb_source))
+    return pool
+
+def close_pool(pool):
+    while not pool.empty():
+        try:
+            pool.get_nowait()[0].close()
+        except Exception:
+            pass
+
+def run_named(pool, args, name, given):
+    """(payload, meta) of a named query through run_profiled, on a pooled connection."""
+    catalog = refresh_catalog()
+    fname = name if name.endswith(".sql") else f"{name}.sql"
+    entry = catalog.get(fname)
+    if entry is None:
+        raise LookupError(f"no query named {name}")
+    params = query_params(entry, given)
+    conn, driver = pool.get()
+    try:
+        rows, table, tier, record = run_profiled(conn, driver, fname, entry["sql"], params, args)
+    finally:
+        pool.put((conn, driver))
+    meta = {"query": fname, "title": entry["title"], "params": list(params), "row_count": record["rows"],
+            "seconds": round(record["wall_seconds"], 4), "summary_table": table, "cache": tier}
+    return rows_payload(rows), meta
+
+def arrow_bytes(payload, meta):
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    table = result_files.to_table(payload["columns"], payload["rows"], meta)
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET /queries lists the query files; GET /queries/<name>?<param>=<value>&format=json|arrow runs one.
+
+    POST /queries/<name> takes the parameters as a JSON object instead of the query string.
+    """
+    protocol_version = "HTTP/1.1"
+    pool = None
+    args = None
+
+    def setup(self):
+        # Headers and body go out in separate writes; with Nagle on, a keep-alive TCP client waits
+        # for the delayed ACK (~40 ms). Unix sockets have no such option.
+        self.disable_nagle_algorithm = isinstance(self.client_address, tuple)
+        super().setup()
+
+    def send_body(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload, default=str).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.handle_request(url.path, dict(parse_qsl(url.query)))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            given = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self.send_json(400, {"error": f"invalid JSON body: {e}"})
+            return
+        self.handle_request(url.path, {**dict(parse_qsl(url.query)), **given})
+
+    def handle_request(self, path, given):
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if parts == ["health"]:
+            self.send_json(200, {"status": "ok", "backend": self.args.backend})
+            return
+        if parts == ["queries"]:
+            catalog = refresh_catalog()
+            self.send_json(200, [
+                {"query": name, "title": e["title"], "params": [{"name": n, "type": t} for n, t in e["params"]]}
+                for name, e in sorted(catalog.items())
+            ])
+            return
+        if len(parts) != 2 or parts[0] != "queries":
+            self.send_json(404, {"error": f"unknown path {path}"})
+            return
+
+        fmt = given.pop("format", "json")
+        if fmt not in ("json", "arrow"):
+            self.send_json(400, {"error": f"unknown format {fmt}, expected json or arrow"})
+            return
+        try:
+            payload, meta = run_named(self.pool, self.args, parts[1], given)
+        except LookupError as e:
+            self.send_json(404, {"error": str(e)})
+            return
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+            return
+        if fmt == "arrow":
+            self.send_body(200, arrow_bytes(payload, meta), ARROW_STREAM)
+        else:
+            self.send_json(200, {**meta, **payload})
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if not self.args.quiet:
+            super().log_message(format, *args)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(args):
+    if args.socket:
+        Path(args.socket).unlink(missing_ok=True)
+        return UnixHTTPServer(args.socket, QueryHandler)
+    return ThreadingHTTPServer((args.host, args.port), QueryHandler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the query files over HTTP from warm warehouse connections.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (0.0.0.0 inside docker)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--backend", choices=("mysql", "duckdb"), default="mysql")
+    parser.add_argument("--duckdb-source", help="Processed CSV or manifest.json for --backend duckdb (default: newest)")
+    parser.add_argument("--workers", type=int, default=4, help="Pooled connections, i.e. queries run at the same time")
+    parser.add_argument("--no-routing", action="store_true", help="Always query Fact_Trip, never the summary tables")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the SQL, ignoring cached results")
+    parser.add_argument("--cache-size-mb", type=int, default=result_cache.DEFAULT_MAX_BYTES // 2**20, help="Disk result cache size bound")
+    parser.add_argument("--history", default=str(query_profile.HISTORY_PATH), help="File every run is appended to (see query_profile.py)")
+    parser.add_argument("--no-history", action="store_true", help="Do not append runs to the history file")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    args = parser.parse_args()
+    # run_profiled options the service does not offer per request.
+    args.status_counters = False
+    args.explain_analyze = False
+
+    catalog = refresh_catalog()
+    pool = open_pool(args)
+    QueryHandler.pool = pool
+    QueryHandler.args = args
+    server = make_server(args)
+    where = f"unix:{args.socket}" if args.socket else f"http://{args.host}:{args.port}"
+    print(f"Serving {len(catalog)} queries from {args.workers} {args.backend} connection(s) on {where} (pid {os.getpid()})")
+    # docker stop sends SIGTERM; shut down like Ctrl+C so the pool is closed and the socket removed.
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        close_pool(pool)
+        if args.socket:
+            Path(args.socket).unlink(missing_ok=True)
+    print("Bye.")
+
+if __name__ == "__main__":
+    main()
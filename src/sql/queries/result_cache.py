@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).resolve().parent / ".result_cache"
+DEFAULT_MAX_BYTES = 256 * 2**20
+DEFAULT_MEMORY_ENTRIES = 64
+
+# In-memory tier: key -> value, most recently used last. Cleared when the load version changes.
+_memory = OrderedDict()
+_memory_version = None
+_lock = threading.Lock()
+
+def normalize_sql(sql_text):
+    """Comments, whitespace runs and a trailing ';' do not change the result."""
+    sql = re.sub(r"--[^\n]*", "", sql_text)
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return sql.rstrip(";").strip()
+
+def load_version(query):
+    """Identifies the warehouse contents: every ETL run or rollback changes Etl_LoadBatch.
+
+    `query(sql)` returns dict value; None means there is no version to key on (no cache).
+    """
+    try:
+        value = query("""
+            SELECT COUNT(*) AS batches, MAX(LoadBatchId) AS last_batch,
+                   MAX(COALESCE(FinishedAt, StartedAt)) AS last_change
+            FROM Etl_LoadBatch
+        """)
+    except Exception:
+        return None
+    row = value[0] if value else {}
+    return f"{row.get('batches')}:{row.get('last_batch')}:{row.get('last_change')}"
+
+def make_key(sql_text, params, version, routing=True):
+    payload = {"sql": normalize_sql(sql_text), "params": [repr(p) for p in params], "version": version, "routing": routing}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def version_dir(version):
+    return CACHE_DIR / hashlib.sha256(version.encode("utf-8")).hexdigest()[:16]
+
+def invalidate_other_versions(version):
+    """A new load makes every older result stale: drop both tiers for other versions."""
+    global _memory_version
+    with _lock:
+        if _memory_version != version:
+            _memory.clear()
+            _memory_version = version
+    if CACHE_DIR.exists():
+        current = version_dir(version)
+        for path in CACHE_DIR.iterdir():
+            if path.is_dir() and path != current:
+                shutil.rmtree(path, ignore_errors=True)
+
+def get(key, version):
+    """(value, tier) from memory, then disk (promoted to memory); (None, None) on a miss."""
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key], "memory"
+    path = version_dir(version) / f"{key}.pkl"
+    try:
+        value = pickle.loads(path.read_bytes())
+    except (OSError, pickle.PickleError, EOFError):
+        return None, None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    remember(key, value)
+    return value, "disk"
+
+def remember(key, value, max_entries=DEFAULT_MEMORY_ENTRIES):
+    with _lock:
+        _memory[key] = value
+        _memory.move_to_end(key)
+        while len(_memory) > max_entries:
+            _memory.popitem(last=False)
+
+def put(key, version, value, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MEMORY_ENTRIES):
+    remember(key, value, max_entries)
+    directory = version_dir(version)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = directory / f".{key}.tmp"
+    tmp_path.write_bytes(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    os.replace(tmp_path, directory / f"{key}.pkl")
+    evict(version, max_bytes)
+
+def evict(version, max_bytes=DEFAULT_MAX_BYTES):
+    """Drop least recently used result files until the disk tier fits in max_bytes."""
+    files = []
+    for path in version_dir(version).glob("*.pkl"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files, key=lambda f: f[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+def cached(key, version, compute, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MEMORY_ENTRIES):
+    """Return (value, tier): tier is 'memory' or 'disk' on a hit, None when compute() had to run."""
+    invalidate_other_versions(version)
+    value, tier = get(key, version)
+    if tier is not None:
+        return value, tier
+    value = compute()
+    put(key, version, value, max_bytes, max_entries)
+    return value, None
@@ -0,0 +1,126 @@
+import json
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+FORMATS = ("arrow", "parquet", "json")
+SUFFIXES = {"arrow": ".arrow", "parquet": ".parquet", "json": ".json"}
+# The run details (query, params, timing) travel in the schema metadata under this key.
+METADATA_KEY = b"dw_result"
+
+def column_array(values):
+    """Let Arrow infer the type from the driver values: Decimal -> decimal128, date -> date32, and so on.
+
+    A column that mixes types (a rollup label next to numbers, say) is stored as text.
+    """
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+def to_table(columns, rows, metadata=None):
+    arrays = [column_array([r[i] for r in rows]) for i in range(len(columns))]
+    table = pa.Table.from_arrays(arrays, names=columns) if columns else pa.table({})
+    if metadata is not None:
+        table = table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata, default=str).encode("utf-8")})
+    return table
+
+def write_table(path, table, fmt):
+    """Write to a temp file and rename, so a reader never maps a half-written result."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    if fmt == "parquet":
+        pq.write_table(table, tmp_path)
+    else:
+        # Uncompressed, so readers can memory-map the buffers without copying.
+        with ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def write_json(path, payload):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2, default=str), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+def save_result(out_dir, stem, columns, rows, metadata, fmt="arrow"):
+    path = Path(out_dir) / f"{stem}{SUFFIXES[fmt]}"
+    if fmt == "json":
+        write_json(path, {**metadata, "columns": columns, "rows": [list(r) for r in rows]})
+    else:
+        write_table(path, to_table(columns, rows, metadata), fmt)
+    return path
+
+def batch_table(columns, rows, schema=None):
+    """One streamed batch as a table. The first batch fixes the schema: all-null columns become
+    text and decimals get full precision, so later batches fit the same types."""
+    if schema is not None:
+        arrays = []
+        for i, field in enumerate(schema):
+            values = [r[i] for r in rows]
+            try:
+                arrays.append(pa.array(values, type=field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                if not pa.types.is_string(field.type):
+                    raise
+                arrays.append(pa.array([None if v is None else str(v) for v in values], type=pa.string()))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    arrays = []
+    for i in range(len(columns)):
+        array = column_array([r[i] for r in rows])
+        if pa.types.is_null(array.type):
+            array = array.cast(pa.string())
+        elif pa.types.is_decimal(array.type):
+            array = array.cast(pa.decimal128(38, array.type.scale))
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=columns) if columns else pa.table({})
+
+def stream_result(out_dir, stem, columns, batches, metadata, fmt="arrow"):
+    """save_result for rows that arrive in batches; only one batch is converted at a time."""
+    path = Path(out_dir) / f"{stem}{SUFFIXES[fmt]}"
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    columns = columns or []
+    if fmt == "json":
+        head = json.dumps({**metadata, "columns": columns}, default=str)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(head[:-1] + ', "rows": [')
+            first = True
+            for batch in batches:
+                for r in batch:
+                    f.write(("\n" if first else ",\n") + json.dumps(list(r), default=str))
+                    first = False
+            f.write("\n]}\n")
+        os.replace(tmp_path, path)
+        return path
+
+    tag = {METADATA_KEY: json.dumps(metadata, default=str).encode("utf-8")}
+    writer, schema = None, None
+    try:
+        for batch in batches:
+            table = batch_table(columns, batch, schema)
+            if writer is None:
+                schema = table.schema.with_metadata(tag)
+                writer = pq.ParquetWriter(tmp_path, schema) if fmt == "parquet" else ipc.new_file(tmp_path, schema)
+            writer.write_table(table.replace_schema_metadata(tag))
+        if writer is None:
+            schema = pa.schema([(c, pa.string()) for c in columns], metadata=tag)
+            writer = pq.ParquetWriter(tmp_path, schema) if fmt == "parquet" else ipc.new_file(tmp_path, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return path
+
+def read_table(path):
+    """Memory-map an Arrow IPC or Parquet result file."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pq.read_table(path, memory_map=True)
+    with pa.memory_map(str(path), "r") as source:
+        return ipc.open_file(source).read_all()
+
+def read_metadata(table):
+    raw = (table.schema.metadata or {}).get(METADATA_KEY)
+    return json.loads(raw) if raw else {}
@@ -1,9 +1,62 @@
+import argparse
+import contextlib
+import io
+import json
 import os
+import queue
 import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
 from pathlib import Path
 
-def connect_mysql():
+import query_profile
+import result_cache
+import result_files
+
+# Summary tables built by the ETL, smallest first. A query on `Fact_Trip f` runs on the first
+# one whose keys cover every f.<column> it groups, joins or filters on.
+SUMMARY_TABLES = [
+    {
+        "table": "Fact_Daily_ZoneVendor",
+        "keys": {"PickupDateKey": "DateKey", "VendorKey": "VendorKey", "PickupLocationKey": "PickupLocationKey"},
+    },
+    {
+        "table": "Fact_Hourly_ZonePayment",
+        "keys": {
+            "PickupDateKey": "DateKey",
+            "PickupTimeKey": "PickupTimeKey",
+            "PickupLocationKey": "PickupLocationKey",
+            "PaymentTypeKey": "PaymentTypeKey",
+        },
+    },
+]
+# Fact_Trip measure -> pre-aggregated total (the same in every summary table).
+SUMMARY_MEASURES = {
+    "TripDistance": "TotalTripDistance",
+    "FareAmount": "TotalFareAmount",
+    "TotalAmount": "TotalTotalAmount",
+    "TipAmount": "TotalTipAmount",
+    "TollsAmount": "TotalTollsAmount",
+    "TripDurationMinutes": "TotalDurationMinutes",
+}
+# Summary PickupTimeKey is the top of the hour, so only hour-level time attributes are valid.
+HOUR_LEVEL_COLUMNS = {"TimeKey", "Hour", "TimeBucket"}
+FACT_FROM = re.compile(r"\bFROM\s+Fact_Trip\s+f\b", flags=re.IGNORECASE)
+# Queries that select trip rows from Fact_Trip f, which no summary table can answer.
+ROUTING_CASES = [
+    ("trip rows", "SELECT f.PickupDateKey, f.VendorKey FROM Fact_Trip f WHERE f.PickupDateKey = 20250701"),
+    ("count of trip rows", "SELECT COUNT(*) FROM (SELECT f.PickupLocationKey FROM Fact_Trip f WHERE f.VendorKey = 1) t"),
+    ("grouped trip rows", "SELECT t.PickupLocationKey, COUNT(*) FROM (SELECT f.PickupLocationKey FROM Fact_Trip f) t GROUP BY t.PickupLocationKey"),
+]
+TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\d+)\s*$", flags=re.IGNORECASE)
+TRAILING_OFFSET = re.compile(r"\bLIMIT\s+\d+\s*(?:,|\bOFFSET\b)\s*\d+\s*$", flags=re.IGNORECASE)
+# Rows per fetch on a streaming cursor, and rows used to size the console columns.
+STREAM_BATCH_ROWS = 5000
+WIDTH_WINDOW = 200
+
+def connect_mysql(local_infile=False):
     host = os.getenv("DW_HOST", "localhost")
     port = int(os.getenv("DW_PORT", "3306"))
     user = os.getenv("DW_USER", "root")
@@ -17,7 +70,8 @@ def connect_mysql():
     try:
         import mysql.connector  # type: ignore
         conn = mysql.connector.connect(
-            host=host, port=port, user=user, password=password, database=database, autocommit=True, connection_timeout=10
+            host=host, port=port, user=user, password=password, database=database, autocommit=True, connection_timeout=10,
+            allow_local_infile=local_infile
         )
         return conn, "mysql.connector"
     except Exception:
@@ -25,7 +79,7 @@ def connect_mysql():
             import pymysql  # type: ignore
             conn = pymysql.connect(
                 host=host, port=port, user=user, password=password, database=database,
-                cursorclass=pymysql.cursors.DictCursor
+                cursorclass=pymysql.cursors.DictCursor, local_infile=local_infile
             )
             return conn, "pymysql"
         except Exception as e:
@@ -36,14 +90,17 @@ def connect_mysql():
             print(f"Detalhes: {e}")
             sys.exit(1)
 
+def query_title(sql_text, default):
+    """The first line of a query file when it is a comment, else `default`."""
+    first_line = sql_text.strip().splitlines()[0].strip() if sql_text.strip() else ""
+    return first_line.lstrip("- ").strip() if first_line.startswith("--") else default
+
 def read_query_files(folder: Path):
     files = sorted([p for p in folder.glob("*.sql") if p.is_file()])
     items = []
     for p in files:
         sql = p.read_text(encoding="utf-8", errors="ignore")
-        first_line = sql.strip().splitlines()[0].strip() if sql.strip() else ""
-        title = first_line.lstrip("- ").strip() if first_line.startswith("--") else p.stem
-        items.append((p.name, title, sql))
+        items.append((p.name, query_title(sql, p.stem), sql))
     return items
 
 def parse_params(sql_text: str):
@@ -68,46 +125,101 @@ def coerce(value: str, typ: str):
         return float(value)
     return value
 
+def row_values(row):
+    return list(row.values()) if isinstance(row, dict) else list(row)
+
+def print_table(columns, batches, max_rows=30, total=None):
+    """Print rows as the batches arrive, holding at most WIDTH_WINDOW of them.
+
+    Column widths come from the header and the first WIDTH_WINDOW rows; a longer value
+    further down is printed in full rather than re-measuring everything.
+    Without `total` (a streamed result) the footer only says whether rows were cut off.
+    """
+    window, widths, shown, more = [], None, 0, False
+
+    def emit(values):
+        print(" | ".join(values[i].ljust(widths[i]) for i in range(len(columns))))
+
+    def start():
+        nonlocal widths
+        widths = [max([len(columns[i])] + [len(row[i]) for row in window]) for i in range(len(columns))]
+        print(" | ".join(columns[i].ljust(widths[i]) for i in range(len(columns))))
+        print("-+-".join("-" * w for w in widths))
+        for values in window:
+            emit(values)
+        window.clear()
+
+    for batch in batches:
+        for row in batch:
+            if shown >= max_rows:
+                more = True
+                break
+            values = [str(v) for v in row_values(row)]
+            shown += 1
+            if widths is None:
+                window.append(values)
+                if len(window) >= WIDTH_WINDOW:
+                    start()
+            else:
+                emit(values)
+        if more:
+            break
+
+    if widths is None:
+        if not window:
+            print("(0 rows)")
+            return
+        start()
+    if total is not None and total > max_rows:
+        print(f"... ({total} rows total, showing first {max_rows})")
+    elif more:
+        print(f"... (showing first {max_rows} rows; the rest were not fetched)")
+    else:
+        print(f"({shown} rows)")
+
 def print_rows(rows, max_rows=30):
     if rows is None:
         print("(no result set)")
         return
-    if isinstance(rows, list) and len(rows) == 0:
+    if len(rows) == 0:
         print("(0 rows)")
         return
+    cols = list(rows[0].keys()) if isinstance(rows[0], dict) else [f"col{i+1}" for i in range(len(rows[0]))]
+    print_table(cols, [rows], max_rows, total=len(rows))
 
-    if isinstance(rows[0], dict):
-        cols = list(rows[0].keys())
-        data = [[str(r.get(c, "")) for c in cols] for r in rows[:max_rows]]
-    else:
-        cols = [f"col{i+1}" for i in range(len(rows[0]))]
-        data = [[str(x) for x in r] for r in rows[:max_rows]]
-
-    widths = [max(len(cols[i]), max((len(row[i]) for row in data), default=0)) for i in range(len(cols))]
-    header = " | ".join(cols[i].ljust(widths[i]) for i in range(len(cols)))
-    sep = "-+-".join("-"*w for w in widths)
-
-    print(header)
-    print(sep)
-    for row in data:
-        print(" | ".join(row[i].ljust(widths[i]) for i in range(len(cols))))
-    if len(rows) > max_rows:
-        print(f"... ({len(rows)} rows total, showing first {max_rows})")
-    else:
-        print(f"({len(rows)} rows)")
+def connect(backend="mysql", duckdb_source=None):
+    """(conn, driver) for run_query: the MySQL warehouse, or the embedded DuckDB copy of it."""
+    if backend == "duckdb":
+        import duckdb_backend
+        return duckdb_backend.connect_duckdb(duckdb_source)
+    return connect_mysql()
 
-def run_query(conn, driver_name: str, sql_text: str, params):
+def strip_statement(sql_text):
     sql = sql_text.strip()
     while sql.endswith(";"):
         sql = sql[:-1].rstrip()
+    return sql
 
+def run_query(conn, driver_name: str, sql_text: str, params, profile=None):
+    """Rows of the statement; `profile` (a dict) receives execute_seconds and fetch_seconds."""
+    sql = strip_statement(sql_text)
+    profile = {} if profile is None else profile
+
+    if driver_name == "duckdb":
+        import duckdb_backend
+        return duckdb_backend.run_query(conn, sql, params, profile)
     if driver_name == "mysql.connector":
         conn.ping(reconnect=True, attempts=3, delay=1)
 
+        # A buffered cursor reads the whole result during execute(); fetch time is the row conversion.
         cur = conn.cursor(dictionary=True, buffered=True)
         try:
+            started = time.perf_counter()
             cur.execute(sql, params)
-            return cur.fetchall() if cur.with_rows else None
+            executed = time.perf_counter()
+            rows = cur.fetchall() if cur.with_rows else None
+            profile.update(execute_seconds=executed - started, fetch_seconds=time.perf_counter() - executed)
+            return rows
         finally:
             try:
                 cur.close()
@@ -115,14 +227,425 @@ def run_query(conn, driver_name: str, sql_text: str, params):
                 pass
     else:
         with conn.cursor() as cur:
+            started = time.perf_counter()
             cur.execute(sql, params)
-            return cur.fetchall() if cur.description else None
+            executed = time.perf_counter()
+            rows = cur.fetchall() if cur.description else None
+            profile.update(execute_seconds=executed - started, fetch_seconds=time.perf_counter() - executed)
+            return rows
+
+def push_limit(sql_text, limit):
+    """Let the server stop after `limit` rows: append LIMIT, or lower a smaller trailing one."""
+    sql = strip_statement(re.sub(r"--[^\n]*", "", sql_text))
+    if TRAILING_OFFSET.search(sql):
+        return sql
+    m = TRAILING_LIMIT.search(sql)
+    if m:
+        return sql if int(m.group(1)) <= limit else f"{sql[:m.start()]}LIMIT {limit}"
+    return f"{sql}\nLIMIT {limit}"
+
+@contextlib.contextmanager
+def stream_query(conn, driver_name, sql_text, params, batch_size=STREAM_BATCH_ROWS, profile=None):
+    """Run a statement on an unbuffered (server-side) cursor; yields (columns, batches of row tuples).
+
+    Only one batch is held at a time. Rows left unread when the block exits are discarded.
+    `profile` receives execute_seconds, and fetch_seconds once the batches are consumed.
+    """
+    sql = strip_statement(sql_text)
+    profile = {} if profile is None else profile
+    if driver_name == "duckdb":
+        import duckdb_backend
+        with duckdb_backend.stream_query(conn, sql, params, batch_size, profile) as result:
+            yield result
+        return
+
+    if driver_name == "mysql.connector":
+        conn.ping(reconnect=True, attempts=3, delay=1)
+        cur = conn.cursor(buffered=False)
+    else:
+        import pymysql  # type: ignore
+        cur = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        profile.update(execute_seconds=time.perf_counter() - started, fetch_seconds=0.0)
+        columns = [d[0] for d in cur.description] if cur.description else None
+
+        def batches():
+            while True:
+                started = time.perf_counter()
+                batch = cur.fetchmany(batch_size)
+                profile["fetch_seconds"] += time.perf_counter() - started
+                if not batch:
+                    return
+                yield batch
+
+        yield columns, batches() if columns else iter(())
+    finally:
+        try:
+            cur.close()
+            if driver_name == "mysql.connector" and conn.unread_result:
+                conn.consume_results()
+        except Exception:
+            pass
+
+def aggregate_calls(text):
+    """(start, end, function, argument) of each aggregate call, matching nested parentheses."""
+    calls = []
+    for m in re.finditer(r"\b(SUM|AVG|COUNT|MIN|MAX)\s*\(", text, flags=re.IGNORECASE):
+        depth, i = 1, m.end()
+        while i < len(text) and depth:
+            depth += {"(": 1, ")": -1}.get(text[i], 0)
+            i += 1
+        calls.append((m.start(), i, m.group(1).upper(), text[m.end():i - 1].strip()))
+    return calls
+
+def own_clauses(segment):
+    """The part of a SELECT block before the parenthesis that closes its subquery, if any."""
+    depth = 0
+    for i, ch in enumerate(segment):
+        depth += {"(": 1, ")": -1}.get(ch, 0)
+        if depth < 0:
+            return segment[:i]
+    return segment
+
+def aggregates_rows(segment):
+    """True if a SELECT block on Fact_Trip f returns aggregates, not trip rows: it has a GROUP BY,
+    or every selected column is an aggregate (or a literal)."""
+    if re.search(r"\bGROUP\s+BY\b", own_clauses(segment), flags=re.IGNORECASE):
+        return True
+    select_list = re.sub(r"^\s*SELECT\b", "", segment[:FACT_FROM.search(segment).start()], flags=re.IGNORECASE)
+    items, depth, start = [], 0, 0
+    for i, ch in enumerate(select_list):
+        depth += {"(": 1, ")": -1}.get(ch, 0)
+        if ch == "," and depth == 0:
+            items.append(select_list[start:i])
+            start = i + 1
+    items.append(select_list[start:])
+    literal = re.compile(r"\s*('[^']*'|-?\d+(\.\d+)?)(\s+AS\s+\w+)?\s*", flags=re.IGNORECASE)
+    return all(aggregate_calls(item) or literal.fullmatch(item) for item in items)
+
+def rewrite_segment(segment, summary):
+    """Rewrite one SELECT block for a summary table, or return None if it needs trip-level rows."""
+    if not FACT_FROM.search(segment):
+        return None if re.search(r"\bf\.\w+", segment) else segment
+    if re.search(r"\b(OVER|DISTINCT)\b", segment, flags=re.IGNORECASE) or not aggregates_rows(segment):
+        return None
+
+    parts, pos = [], 0
+    for start, end, func, arg in aggregate_calls(segment):
+        if start < pos:
+            return None
+        column = re.fullmatch(r"f\.(\w+)", arg)
+        if func == "COUNT" and arg == "*":
+            new = "SUM(f.TripsCount)"
+        elif column and column.group(1) in SUMMARY_MEASURES and func in ("SUM", "AVG"):
+            total = f"f.{SUMMARY_MEASURES[column.group(1)]}"
+            new = f"SUM({total})" if func == "SUM" else f"(SUM({total}) / SUM(f.TripsCount))"
+        elif func == "SUM" and not re.search(r"\bf\.", arg):
+            new = f"SUM(({arg}) * f.TripsCount)"
+        elif func in ("MIN", "MAX") and not re.search(r"\bf\.", arg):
+            new = segment[start:end]
+        else:
+            return None
+        parts += [segment[pos:start], new]
+        pos = end
+    text = "".join(parts) + segment[pos:]
+
+    summary_columns = {"TripsCount", *SUMMARY_MEASURES.values()}
+    if any(col not in summary["keys"] and col not in summary_columns for col in re.findall(r"\bf\.(\w+)", text)):
+        return None
+    if re.search(r"\bf\.PickupTimeKey\b", text):
+        join = re.search(r"\bJOIN\s+Dim_TimeOfDay\s+(\w+)\s+ON\s+\1\.TimeKey\s*=\s*f\.PickupTimeKey\b", text, flags=re.IGNORECASE)
+        if not join or len(re.findall(r"\bf\.PickupTimeKey\b", text)) != 1:
+            return None
+        if set(re.findall(rf"\b{join.group(1)}\.(\w+)", text)) - HOUR_LEVEL_COLUMNS:
+            return None
+
+    # Renamed keys selected as plain columns keep their Fact_Trip name in the result.
+    select_end = FACT_FROM.search(text).start()
+    select_list = re.sub(
+        r"\bf\.(\w+)(?=\s*(?:,|$))",
+        lambda m: f"f.{summary['keys'][m.group(1)]} AS {m.group(1)}" if summary["keys"].get(m.group(1), m.group(1)) != m.group(1) else m.group(0),
+        text[:select_end],
+        flags=re.MULTILINE,
+    )
+    text = select_list + text[select_end:]
+    text = re.sub(r"\bf\.(\w+)\b", lambda m: "f." + summary["keys"].get(m.group(1), m.group(1)), text)
+    return FACT_FROM.sub(f"FROM {summary['table']} f", text)
+
+def route_query(sql_text):
+    """Return (summary table, rewritten SQL) for the smallest summary that answers the query, else (None, sql_text)."""
+    sql = re.sub(r"--[^\n]*", "", sql_text)
+    if not FACT_FROM.search(sql) or any(s["table"] in sql for s in SUMMARY_TABLES):
+        return None, sql_text
+    segments = re.split(r"(?=\bSELECT\b)", sql, flags=re.IGNORECASE)
+    for summary in SUMMARY_TABLES:
+        rewritten = [rewrite_segment(segment, summary) for segment in segments]
+        if all(r is not None for r in rewritten):
+            return summary["table"], "".join(rewritten)
+    return None, sql_text
 
+def run_routed(conn, driver_name, sql_text, params, routing=True, profile=None):
+    """Run on a summary table when one fits; on any error there, fall back to Fact_Trip."""
+    profile = {} if profile is None else profile
+    table, routed_sql = route_query(sql_text) if routing else (None, sql_text)
+    profile["sql"] = routed_sql
+    if table is None:
+        return run_query(conn, driver_name, sql_text, params, profile), None
+    try:
+        return run_query(conn, driver_name, routed_sql, params, profile), table
+    except Exception as e:
+        print(f"Summary table {table} failed ({e}); falling back to Fact_Trip.")
+        profile["sql"] = sql_text
+        return run_query(conn, driver_name, sql_text, params, profile), None
+
+def warehouse_version(conn, driver_name):
+    version = result_cache.load_version(lambda sql: run_query(conn, driver_name, sql, ()))
+    if version is not None and driver_name == "duckdb":
+        version = f"duckdb:{version}"
+    return version
+
+def run_cached(conn, driver_name, sql_text, params, routing=True, use_cache=True, max_bytes=result_cache.DEFAULT_MAX_BYTES, profile=None):
+    """run_routed behind the result cache; returns (rows, summary table, cache tier or None)."""
+    profile = {} if profile is None else profile
+    version = warehouse_version(conn, driver_name)
+    profile["load_version"] = version
+    if version is None or not use_cache:
+        return (*run_routed(conn, driver_name, sql_text, params, routing, profile), None)
+    key = result_cache.make_key(sql_text, params, version, routing)
+    (rows, table), tier = result_cache.cached(
+        key, version, lambda: run_routed(conn, driver_name, sql_text, params, routing, profile), max_bytes
+    )
+    return rows, table, tier
+
+def run_profiled(conn, driver_name, fname, sql_text, params, args):
+    """run_cached with timings, optional status counters and EXPLAIN ANALYZE, appended to the history file.
+
+    Returns (rows, summary table, cache tier, profile record).
+    """
+    query = lambda sql, p: run_query(conn, driver_name, sql, p)
+    before = query_profile.session_status(query) if args.status_counters and driver_name != "duckdb" else None
+    stats = {}
+    started = time.perf_counter()
+    rows, table, tier = run_cached(
+        conn, driver_name, sql_text, params,
+        routing=not args.no_routing, use_cache=not args.no_cache, max_bytes=args.cache_size_mb * 2**20, profile=stats,
+    )
+    wall = time.perf_counter() - started
+    record = query_profile.make_record(fname, sql_text, params, "duckdb" if driver_name == "duckdb" else "mysql", wall, stats, rows, table, tier)
+    finish_record(record, query, before, stats["sql"] if tier is None else None, params, args)
+    return rows, table, tier, record
+
+def stream_profiled(conn, driver_name, fname, sql_text, params, args, consume, limit=None):
+    """The streaming counterpart of run_profiled: consume(columns, batches) gets the rows as they are fetched.
+
+    The result cache is bypassed, since no complete result is ever held. `limit` is pushed down
+    into the SQL. Returns (what consume returned, summary table, profile record).
+    """
+    query = lambda sql, p: run_query(conn, driver_name, sql, p)
+    before = query_profile.session_status(query) if args.status_counters and driver_name != "duckdb" else None
+    stats = {"load_version": warehouse_version(conn, driver_name)}
+    table, sql = route_query(sql_text) if not args.no_routing else (None, sql_text)
+    counted = {"rows": 0, "bytes": 0}
+
+    def counting(batches):
+        for batch in batches:
+            counted["rows"] += len(batch)
+            counted["bytes"] += query_profile.result_bytes(batch)
+            yield batch
+
+    started = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        try:
+            stream = stream_query(conn, driver_name, push_limit(sql, limit) if limit else sql, params, args.fetch_size, stats)
+            columns, batches = stack.enter_context(stream)
+        except Exception as e:
+            if table is None:
+                raise
+            print(f"Summary table {table} failed ({e}); falling back to Fact_Trip.")
+            table, sql = None, sql_text
+            stream = stream_query(conn, driver_name, push_limit(sql, limit) if limit else sql, params, args.fetch_size, stats)
+            columns, batches = stack.enter_context(stream)
+        result = consume(columns, counting(batches))
+    wall = time.perf_counter() - started
+
+    record = query_profile.make_record(fname, sql_text, params, "duckdb" if driver_name == "duckdb" else "mysql", wall, stats, None, table, None)
+    record.update(rows=counted["rows"], bytes=counted["bytes"], streamed=True)
+    finish_record(record, query, before, sql, params, args)
+    return result, table, record
+
+def finish_record(record, query, before, executed_sql, params, args):
+    """Status counter deltas and the executed plan (when the SQL ran), then the history file."""
+    if before is not None:
+        record["status"] = query_profile.counter_deltas(before, query_profile.session_status(query))
+    if args.explain_analyze and executed_sql is not None:
+        record["plan"] = query_profile.explain_analyze(query, executed_sql, params)
+    if not args.no_history:
+        query_profile.append_history(record, args.history)
+
+def normalized(rows):
+    """Sorted rows with exact numbers; floats (DuckDB averages) are rounded past their noise."""
+    def value(v):
+        if isinstance(v, float):
+            v = round(v, 9)
+        return Decimal(str(v)).normalize() if isinstance(v, (int, float, Decimal)) and not isinstance(v, bool) else v
+    return sorted((tuple(value(v) for v in (r.values() if isinstance(r, dict) else r)) for r in rows or []), key=repr)
+
+def check_routing(conn, driver, items):
+    """Run every routable query on Fact_Trip and on its summary table and compare the results.
+
+    ROUTING_CASES, which read trip-level rows, must not be routed at all.
+    """
+    mismatches = 0
+    for name, sql_text in ROUTING_CASES:
+        table, _ = route_query(sql_text)
+        mismatches += table is not None
+        print(f"  {name}: {'WRONGLY ROUTED TO ' + table if table else 'stays on Fact_Trip'}")
+    for fname, title, sql_text in items:
+        table, routed_sql = route_query(sql_text)
+        if table is None or parse_params(sql_text):
+            print(f"  {fname}: runs on Fact_Trip")
+            continue
+        same = normalized(run_query(conn, driver, sql_text, ())) == normalized(run_query(conn, driver, routed_sql, ()))
+        mismatches += not same
+        print(f"  {fname}: {table} {'matches' if same else 'DIFFERS FROM'} Fact_Trip")
+    return mismatches
+
+def batch_params(fname, sql_text, params_by_file):
+    """Parameters for a query from the params file: {"query7.sql": {"PickupDateKey": 20250715, ...}}."""
+    specs = parse_params(sql_text)
+    given = params_by_file.get(fname, {})
+    missing = [name for name, _ in specs if name not in given]
+    if missing:
+        raise ValueError(f"{fname} needs parameters {', '.join(missing)} in the params file")
+    return tuple(coerce(str(given[name]), typ) for name, typ in specs)
+
+def rows_payload(rows):
+    if not rows:
+        return {"columns": [], "rows": []}
+    columns = list(rows[0].keys()) if isinstance(rows[0], dict) else [f"col{i+1}" for i in range(len(rows[0]))]
+    return {"columns": columns, "rows": [list(r.values()) if isinstance(r, dict) else list(r) for r in rows]}
+
+def text_report(results):
+    """The interactive console format, which analysis/charts.py reads as results.txt."""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        for fname, rows in results:
+            print(f"\n--- Running: {fname} ---")
+            print_rows(rows, max_rows=10000)
+    return buffer.getvalue()
+
+def run_batch(args, folder):
+    """Run the chosen query files concurrently over a bounded pool of connections."""
+    items = read_query_files(folder)
+    if args.queries:
+        wanted = {Path(q).name for q in args.queries}
+        items = [item for item in items if item[0] in wanted]
+    params_by_file = json.loads(Path(args.params_file).read_text(encoding="utf-8")) if args.params_file else {}
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    workers = max(1, min(args.workers, len(items)))
+    pool = queue.Queue()
+    for _ in range(workers):
+        pool.put(connect(args.backend, args.duckdb_source))
+
+    def run_one(item):
+        """(rows, meta, result file); with --stream the rows go straight to the file and are not returned."""
+        fname, title, sql_text = item
+        params = batch_params(fname, sql_text, params_by_file)
+        conn, driver = pool.get()
+        try:
+            if args.stream:
+                write = lambda columns, batches: result_files.stream_result(
+                    out_dir, Path(fname).stem, columns, batches, {"query": fname, "title": title, "params": list(params)}, args.format
+                )
+                path, table, record = stream_profiled(conn, driver, fname, sql_text, params, args, write)
+                rows, tier = None, None
+            else:
+                rows, table, tier, record = run_profiled(conn, driver, fname, sql_text, params, args)
+                path = None
+        finally:
+            pool.put((conn, driver))
+        profile = {k: record[k] for k in ("execute_seconds", "fetch_seconds", "bytes", "status", "plan") if k in record}
+        return rows, {"query": fname, "title": title, "params": list(params), "row_count": record["rows"],
+                      "seconds": round(record["wall_seconds"], 4), "summary_table": table, "cache": tier, "profile": profile}, path
+
+    print(f"Running {len(items)} queries over {workers} connection(s)...")
+    started = time.perf_counter()
+    report, results, failed = [], {}, 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_one, item): item[0] for item in items}
+        for i, future in enumerate(as_completed(futures), start=1):
+            fname = futures[future]
+            try:
+                rows, meta, path = future.result()
+            except Exception as e:
+                failed += 1
+                report.append({"query": fname, "error": str(e)})
+                print(f"[{i}/{len(items)}] {fname}: ERROR {e}")
+                continue
+            if path is None:
+                results[fname] = rows
+                payload = rows_payload(rows)
+                path = result_files.save_result(out_dir, Path(fname).stem, payload["columns"], payload["rows"], meta, args.format)
+            meta["output"] = path.as_posix()
+            report.append(meta)
+            notes = ", ".join(n for n in (meta["summary_table"], meta["cache"] and f"cached in {meta['cache']}") if n)
+            print(f"[{i}/{len(items)}] {fname}: {meta['row_count']} rows in {meta['seconds']:.2f}s" + (f" ({notes})" if notes else ""))
+
+    while not pool.empty():
+        pool.get()[0].close()
+
+    wall = time.perf_counter() - started
+    report.sort(key=lambda r: r["query"])
+    result_files.write_json(out_dir / "batch_report.json", {"wall_seconds": round(wall, 4), "queries": report})
+    if args.text_report:
+        Path(args.text_report).write_text(text_report([(f, results[f]) for f, _, _ in items if f in results]), encoding="utf-8")
+    total = sum(r.get("seconds", 0) for r in report)
+    print(f"Batch finished in {wall:.2f}s wall time (queries took {total:.2f}s in total); results in {out_dir.as_posix()}")
+    return failed
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=("mysql", "duckdb"), default="mysql", help="Query MySQL, or an embedded DuckDB star schema built from the processed dataset")
+    parser.add_argument("--duckdb-source", help="Processed CSV or manifest.json for --backend duckdb (default: newest)")
+    parser.add_argument("--no-routing", action="store_true", help="Always query Fact_Trip, never the summary tables")
+    parser.add_argument("--check-routing", action="store_true", help="Compare summary-table answers with Fact_Trip and exit")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the SQL, ignoring cached results")
+    parser.add_argument("--cache-size-mb", type=int, default=result_cache.DEFAULT_MAX_BYTES // 2**20, help="Disk result cache size bound")
+    parser.add_argument("--status-counters", action="store_true", help="Record MySQL Handler_read_* and temp table counters per query")
+    parser.add_argument("--explain-analyze", action="store_true", help="Also record EXPLAIN ANALYZE of every executed query")
+    parser.add_argument("--history", default=str(query_profile.HISTORY_PATH), help="File every run is appended to (see query_profile.py)")
+    parser.add_argument("--no-history", action="store_true", help="Do not append runs to the history file")
+    parser.add_argument("--batch", action="store_true", help="Run queries non-interactively and write one result file each")
+    parser.add_argument("--queries", nargs="*", help="Query files for --batch (default: all)")
+    parser.add_argument("--params-file", help="JSON file with parameter values per query file, for --batch")
+    parser.add_argument("--workers", type=int, default=4, help="Connections used in parallel by --batch")
+    parser.add_argument("--out-dir", default=str(Path(__file__).resolve().parent / "results"), help="Directory for --batch result files")
+    parser.add_argument("--format", choices=result_files.FORMATS, default="arrow", help="Result file format for --batch (arrow and parquet keep column types)")
+    parser.add_argument("--text-report", help="Also write the console-style report (e.g. ../../analysis/results.txt)")
+    parser.add_argument("--stream", action="store_true", help="Fetch rows in batches on a server-side cursor instead of buffering the result (no result cache)")
+    parser.add_argument("--fetch-size", type=int, default=STREAM_BATCH_ROWS, help="Rows per fetch with --stream")
+    parser.add_argument("--max-rows", type=int, default=10000, help="Rows shown on the console; with --stream the query itself is limited")
+    args = parser.parse_args()
+    if args.stream and args.text_report:
+        parser.error("--text-report needs every row in memory; run it without --stream")
+
     folder = Path(__file__).resolve().parent
-    conn, driver = connect_mysql()
-    print(f"Connected using: {driver} (host={os.getenv('DW_HOST','localhost')}, db={os.getenv('DW_DATABASE','')})")
+    if args.batch:
+        sys.exit(1 if run_batch(args, folder) else 0)
+    conn, driver = connect(args.backend, args.duckdb_source)
+    if driver == "duckdb":
+        print("Connected using: duckdb (embedded star schema)")
+    else:
+        print(f"Connected using: {driver} (host={os.getenv('DW_HOST','localhost')}, db={os.getenv('DW_DATABASE','')})")
+
+    if args.check_routing:
+        mismatches = check_routing(conn, driver, read_query_files(folder))
+        conn.close()
+        sys.exit(1 if mismatches else 0)
 
     while True:
         items = read_query_files(folder)
@@ -159,8 +682,23 @@ def main():
 
         print(f"\n--- Running: {fname} ---")
         try:
-            rows = run_query(conn, driver, sql_text, tuple(params))
-            print_rows(rows, max_rows=10000)
+            if args.stream:
+                show = lambda columns, batches: print_table(columns, batches, args.max_rows) if columns else print("(no result set)")
+                _, table, record = stream_profiled(conn, driver, fname, sql_text, tuple(params), args, show, limit=args.max_rows + 1)
+                if table:
+                    print(f"(answered from summary table {table})")
+            else:
+                rows, table, tier, record = run_profiled(conn, driver, fname, sql_text, tuple(params), args)
+                if tier:
+                    print(f"(cached result from {tier}, warehouse unchanged since it was computed)")
+                if table:
+                    print(f"(answered from summary table {table})")
+                print_rows(rows, max_rows=args.max_rows)
+            print(f"[profile] {query_profile.describe(record)}")
+            for name, delta in record.get("status", {}).items():
+                print(f"[profile] {name} +{delta}")
+            if record.get("plan"):
+                print(record["plan"])
         except Exception as e:
             msg = str(e)
             if driver == "mysql.connector" and "MySQL Connection not available" in msg:
@@ -171,7 +709,7 @@ def main():
                 conn, driver = connect_mysql()
                 try:
                     rows = run_query(conn, driver, sql_text, tuple(params))
-                    print_rows(rows, max_rows=10000)
+                    print_rows(rows, max_rows=args.max_rows)
                     continue
                 except Exception as e2:
                     print(f"ERROR running query (after reconnect): {e2}")
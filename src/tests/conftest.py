@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The pipeline and query scripts import their neighbours by module name, as when run from their own folder.
+SRC = Path(__file__).resolve().parent.parent
+for folder in ("data_processing", "sql/queries"):
+    sys.path.insert(0, str(SRC / folder))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from concurrency import CONCURRENCY_COLUMNS
+from concurrency import MINUTES_PER_DAY
+from concurrency import spill_intervals
+from concurrency import spilled_concurrency
+from concurrency import sweep
+from concurrency import trip_intervals
+from concurrency import zone_concurrency
+
+def random_intervals(rng, n, days=3, max_minutes=2 * MINUTES_PER_DAY):
+    start = rng.integers(0, days * MINUTES_PER_DAY, n) + 20270 * MINUTES_PER_DAY
+    return pd.DataFrame({
+        "VendorKey": rng.integers(1, 3, n),
+        "PickupLocationKey": rng.integers(1, 4, n),
+        "start": start,
+        "stop": start + rng.integers(1, max_minutes, n),
+    })
+
+def brute_force(cell, start, stop, bucket_minutes):
+    """{(cell, bucket): (open at the bucket start, most open at any minute)} minute by minute."""
+    out = {}
+    for c in np.unique(cell):
+        mine = cell == c
+        for minute in range(start[mine].min(), stop[mine].max()):
+            level = int(((start[mine] <= minute) & (stop[mine] > minute)).sum())
+            if level:
+                bucket = minute // bucket_minutes
+                at_start, peak = out.get((c, bucket), (0, 0))
+                out[(c, bucket)] = (level if minute % bucket_minutes == 0 else at_start, max(peak, level))
+    return out
+
+def test_sweep_matches_minute_by_minute_count():
+    rng = np.random.default_rng(1)
+    cell = rng.integers(0, 3, 60)
+    start = rng.integers(0, 300, 60)
+    stop = start + rng.integers(1, 90, 60)
+    result = sweep(cell, start, stop, 15)
+    assert {(c, b): (o, m) for c, b, o, m in zip(*result)} == brute_force(cell, start, stop, 15)
+
+def test_trips_open_at_the_same_minute_overlap():
+    # Dropoff minute is inclusive: a trip ending at 10 and one starting at 10 are open together.
+    cell, bucket, open_trips, max_open = sweep(np.array([0, 0]), np.array([0, 10]), np.array([11, 20]), 15)
+    assert (bucket.tolist(), open_trips.tolist(), max_open.tolist()) == ([0, 1], [1, 1], [2, 1])
+
+def test_trip_intervals_skip_rows_without_a_valid_interval():
+    df = pd.DataFrame({
+        "VendorKey": [1, 1, 2],
+        "PickupLocationKey": [4, 4, 5],
+        "PickupDT": ["2025-07-01 23:58:10", "2025-07-01 10:00:00", None],
+        "DropoffDT": ["2025-07-02 00:01:59", "2025-07-01 09:00:00", "2025-07-01 10:00:00"],
+    })
+    intervals = trip_intervals(df)
+    assert len(intervals) == 1
+    assert intervals["stop"].iloc[0] - intervals["start"].iloc[0] == 4
+
+def test_spilled_sweep_matches_one_sweep(tmp_path):
+    rng = np.random.default_rng(2)
+    intervals = random_intervals(rng, 400)
+    for a, b in ((0, 150), (150, 300), (300, 400)):
+        spill_intervals(intervals.iloc[a:b], tmp_path)
+    key = CONCURRENCY_COLUMNS[:4]
+    expected = zone_concurrency(intervals).sort_values(key).reset_index(drop=True)
+    spilled = spilled_concurrency(tmp_path).sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(spilled, expected, check_dtype=False)
+
+def test_spilled_sweep_carries_trips_over_days_without_pickups(tmp_path):
+    start = 20270 * MINUTES_PER_DAY + 1430
+    intervals = pd.DataFrame({"VendorKey": [1], "PickupLocationKey": [7], "start": [start], "stop": [start + 3 * MINUTES_PER_DAY]})
+    spill_intervals(intervals, tmp_path)
+    table = spilled_concurrency(tmp_path)
+    assert table["DateKey"].unique().tolist() == [20250701, 20250702, 20250703, 20250704]
+    assert (table["OpenTrips"][table["TimeKey"] > 1425] == 1).all()
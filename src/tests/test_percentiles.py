@@ -0,0 +1,48 @@
+import base64
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import percentiles
+import sketches
+
+@pytest.mark.parametrize("name", ["RELATIVE_ACCURACY", "GAMMA", "ZERO_BUCKET", "HLL_PRECISION"])
+def test_constants_match_sketches(name):
+    assert getattr(percentiles, name) == getattr(sketches, name)
+
+def test_formats_match_sketch_dtypes():
+    assert percentiles.BUCKET_FORMAT.size == sketches.BUCKET_DTYPE.itemsize
+    assert percentiles.REGISTER_FORMAT.size == sketches.REGISTER_DTYPE.itemsize
+    packed = np.array([(-5, 7), (sketches.ZERO_BUCKET, 2**32 - 1)], sketches.BUCKET_DTYPE)
+    assert list(percentiles.BUCKET_FORMAT.iter_unpack(packed.tobytes())) == [(-5, 7), (sketches.ZERO_BUCKET, 2**32 - 1)]
+    packed = np.array([(4095, 53)], sketches.REGISTER_DTYPE)
+    assert list(percentiles.REGISTER_FORMAT.iter_unpack(packed.tobytes())) == [(4095, 53)]
+
+def test_quantiles_read_back_within_accuracy():
+    rng = np.random.default_rng(8)
+    n = 2000
+    df = pd.DataFrame({
+        "PickupDateKey": np.full(n, 20250701),
+        "PickupTimeKey": np.full(n, 480),
+        "PickupLocationKey": np.full(n, 132),
+        "DropoffLocationKey": rng.integers(1, 266, n),
+        "FareAmount": np.r_[0.0, -2.5, rng.lognormal(2.5, 0.8, n - 2).round(2)],
+        "TripDurationMinutes": rng.exponential(15, n).round(2),
+        "AverageSpeedMph": rng.exponential(10, n).round(4),
+    })
+    row = sketches.zone_sketches([sketches.sketch_partials(df)]).iloc[0]
+    counts, registers = Counter(), {}
+    percentiles.merge_sketch(counts, base64.b64decode(row["FareSketch"]))
+    percentiles.merge_hll(registers, base64.b64decode(row["RouteHll"]))
+
+    quantiles = [0.0, 0.25, 0.5, 0.9, 0.99, 1.0]
+    # Negative fares share the zero bucket, so they are compared as 0.
+    exact = percentiles.exact_quantiles(np.maximum(df["FareAmount"], 0).tolist(), quantiles)
+    estimate = percentiles.sketch_quantiles(counts, quantiles)
+    assert estimate[0] == 0.0
+    for e, x in zip(estimate, exact):
+        assert percentiles.relative_error(e, x) <= percentiles.RELATIVE_ACCURACY
+    routes = df["DropoffLocationKey"].nunique()
+    assert abs(percentiles.hll_estimate(registers) - routes) <= 0.05 * routes
@@ -0,0 +1,35 @@
+import pytest
+
+from run_dw_queries import ROUTING_CASES
+from run_dw_queries import route_query
+
+@pytest.mark.parametrize("name, sql", ROUTING_CASES)
+def test_trip_rows_stay_on_fact_trip(name, sql):
+    assert route_query(sql) == (None, sql)
+
+def test_daily_totals_use_zone_vendor_summary():
+    table, sql = route_query(
+        "SELECT f.PickupDateKey, COUNT(*) AS Trips, SUM(f.FareAmount) AS Fares FROM Fact_Trip f GROUP BY f.PickupDateKey"
+    )
+    assert table == "Fact_Daily_ZoneVendor"
+    assert sql == ("SELECT f.DateKey AS PickupDateKey, SUM(f.TripsCount) AS Trips, SUM(f.TotalFareAmount) AS Fares "
+                   "FROM Fact_Daily_ZoneVendor f GROUP BY f.DateKey")
+
+def test_average_is_weighted_by_trips():
+    table, sql = route_query("SELECT AVG(f.TipAmount) FROM Fact_Trip f")
+    assert table == "Fact_Daily_ZoneVendor"
+    assert "(SUM(f.TotalTipAmount) / SUM(f.TripsCount))" in sql
+
+def test_hour_of_day_uses_hourly_summary():
+    table, _ = route_query(
+        "SELECT t.Hour, COUNT(*) FROM Fact_Trip f JOIN Dim_TimeOfDay t ON t.TimeKey = f.PickupTimeKey GROUP BY t.Hour"
+    )
+    assert table == "Fact_Hourly_ZonePayment"
+
+@pytest.mark.parametrize("sql", [
+    "SELECT t.Minute, COUNT(*) FROM Fact_Trip f JOIN Dim_TimeOfDay t ON t.TimeKey = f.PickupTimeKey GROUP BY t.Minute",
+    "SELECT f.VendorKey, MAX(f.FareAmount) FROM Fact_Trip f GROUP BY f.VendorKey",
+    "SELECT COUNT(DISTINCT f.DropoffLocationKey) FROM Fact_Trip f",
+])
+def test_trip_level_aggregates_stay_on_fact_trip(sql):
+    assert route_query(sql)[0] is None
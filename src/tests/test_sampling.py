@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from sampling import allocate
+from sampling import sample_batches
+
+def trips(n, days=5):
+    rng = np.random.default_rng(7)
+    pickup = pd.Timestamp("2025-07-01") + pd.to_timedelta(rng.integers(0, days * 86400, n), unit="s")
+    return pd.DataFrame({"tpep_pickup_datetime": pickup, "trip_id": np.arange(n)})
+
+def batches(df, size):
+    return (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+def test_allocate_is_proportional_and_exact():
+    alloc = allocate(pd.Series([50, 30, 20]), 7)
+    assert alloc.tolist() == [4, 2, 1]
+    assert allocate(pd.Series([1, 1, 1]), 2).sum() == 2
+
+def test_sample_has_n_rows_in_proportion():
+    df = trips(20000)
+    sample = sample_batches(batches(df, 3000), 1000)
+    assert len(sample) == 1000
+    per_day = sample["tpep_pickup_datetime"].dt.day.value_counts().sort_index()
+    expected = allocate(df["tpep_pickup_datetime"].dt.day.value_counts().sort_index(), 1000)
+    assert per_day.tolist() == expected.tolist()
+
+def test_sample_does_not_depend_on_batch_size():
+    df = trips(20000)
+    a = sample_batches(batches(df, 20000), 500, seed=1)
+    b = sample_batches(batches(df, 777), 500, seed=1)
+    assert a["trip_id"].tolist() == b["trip_id"].tolist()
+    assert a["trip_id"].tolist() != sample_batches(batches(df, 777), 500, seed=2)["trip_id"].tolist()
+
+def test_small_input_is_kept_whole():
+    df = trips(300)
+    assert sample_batches(batches(df, 100), 1000)["trip_id"].tolist() == list(range(300))
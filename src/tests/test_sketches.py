@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from sketches import cell_frame
+from sketches import cell_keys
+from sketches import merge_partials
+from sketches import sketch_partials
+from sketches import zone_sketches
+
+def stage_rows(rng, n):
+    return pd.DataFrame({
+        "PickupDateKey": rng.choice([20250630, 20250701, 20250702], n),
+        "PickupTimeKey": rng.integers(0, 1440, n),
+        "PickupLocationKey": rng.integers(1, 6, n),
+        "DropoffLocationKey": rng.integers(1, 266, n),
+        "FareAmount": rng.choice([0.0, 3.5, 12.25, 70.0, np.nan], n),
+        "TripDurationMinutes": rng.exponential(15, n).round(2),
+        "AverageSpeedMph": rng.exponential(10, n).round(4),
+    })
+
+def assert_partials_equal(a, b):
+    for (keys_a, values_a), (keys_b, values_b) in zip(a, b):
+        assert keys_a.tolist() == keys_b.tolist()
+        assert values_a.tolist() == values_b.tolist()
+        assert values_a.dtype == values_b.dtype
+
+def test_merged_batches_equal_one_batch():
+    df = stage_rows(np.random.default_rng(3), 3000)
+    batches = [sketch_partials(df.iloc[a:b]) for a, b in ((0, 1000), (1000, 1001), (1001, 3000))]
+    assert_partials_equal(merge_partials(batches), sketch_partials(df))
+
+def test_merge_order_does_not_matter():
+    rng = np.random.default_rng(4)
+    a, b, c = (sketch_partials(stage_rows(rng, 500)) for _ in range(3))
+    assert_partials_equal(merge_partials([a, merge_partials([b, c])]), merge_partials([c, b, a]))
+
+def test_cell_keys_round_trip():
+    df = stage_rows(np.random.default_rng(5), 200)
+    cells = cell_frame(cell_keys(df))
+    assert cells["DateKey"].tolist() == df["PickupDateKey"].tolist()
+    assert cells["PickupTimeKey"].tolist() == (df["PickupTimeKey"] // 60 * 60).tolist()
+    assert cells["PickupLocationKey"].tolist() == df["PickupLocationKey"].tolist()
+
+def test_zone_sketches_count_every_trip():
+    df = stage_rows(np.random.default_rng(6), 1000)
+    table = zone_sketches([sketch_partials(df)])
+    assert table["TripsCount"].sum() == len(df)
+    assert len(table) == len(df.groupby(["PickupDateKey", df["PickupTimeKey"] // 60, "PickupLocationKey"]))
@@ -0,0 +1,20 @@
+from decimal import ROUND_HALF_UP
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from staging import round_div
+
+def mysql_round(numerator, denominator):
+    """MySQL ROUND(n / d) on exact DECIMAL values: half away from zero."""
+    return int((Decimal(numerator) / Decimal(denominator)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+@pytest.mark.parametrize("denominator", [2, 60, 3600])
+def test_round_div_matches_mysql_round(denominator):
+    numerator = np.arange(-5 * denominator, 5 * denominator + 1, dtype=np.int64)
+    expected = [mysql_round(int(n), denominator) for n in numerator]
+    assert round_div(numerator, denominator).tolist() == expected
+
+def test_round_div_halves_round_away_from_zero():
+    assert round_div(np.array([5, -5, 15, -15, 25]), 10).tolist() == [1, -1, 2, -2, 3]
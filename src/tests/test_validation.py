@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from read_dataset import build_zone_lookup
+from transform_dataset import CODE_MAPS
+from validation import REASON_CODES
+from validation import rule_counts
+from validation import validate
+
+ZONES = pd.DataFrame({
+    "LocationID": [1, 2, 264],
+    "Borough": ["EWR", "Queens", "Unknown"],
+    "Zone": ["Newark Airport", "Jamaica Bay", "Unknown"],
+    "service_zone": ["EWR", "Boro Zone", "N/A"],
+})
+
+def raw_trips(n):
+    pickup = pd.Timestamp("2025-07-01 08:00") + pd.to_timedelta(np.arange(n), unit="min")
+    return pd.DataFrame({
+        "VendorID": np.full(n, 2),
+        "tpep_pickup_datetime": pickup,
+        "tpep_dropoff_datetime": pickup + pd.Timedelta(minutes=12),
+        "passenger_count": np.full(n, 1.0),
+        "trip_distance": np.full(n, 2.5),
+        "RatecodeID": np.full(n, 1.0),
+        "PULocationID": np.full(n, 1),
+        "DOLocationID": np.full(n, 2),
+        "payment_type": np.full(n, 1),
+        "fare_amount": np.full(n, 14.2),
+        "tip_amount": np.full(n, 3.0),
+        "total_amount": np.full(n, 18.2),
+    })
+
+def reasons(df):
+    _, rejected = validate(df, build_zone_lookup(ZONES), CODE_MAPS)
+    return rejected["RejectReason"].astype(str).tolist()
+
+def test_clean_rows_pass():
+    clean, rejected = validate(raw_trips(5), build_zone_lookup(ZONES), CODE_MAPS)
+    assert (len(clean), len(rejected)) == (5, 0)
+
+def test_each_rule_rejects_its_rows():
+    df = raw_trips(7)
+    df.loc[0, "tpep_dropoff_datetime"] = df.loc[0, "tpep_pickup_datetime"] + pd.Timedelta(milliseconds=500)
+    df.loc[1, "passenger_count"] = np.nan
+    df.loc[2, "tip_amount"] = -1.0
+    df.loc[3, "trip_distance"] = 40.0
+    df.loc[4, "VendorID"] = 3
+    df.loc[5, "DOLocationID"] = 999
+    df.loc[6, "payment_type"] = 9
+    assert reasons(df) == ["dropoff_not_after_pickup", "passenger_count_missing", "negative_amount",
+                           "speed_out_of_range", "unknown_vendor", "unknown_location", "unknown_payment_type"]
+
+def test_missing_codes_are_kept():
+    df = raw_trips(2)
+    df["RatecodeID"] = np.nan
+    df["PULocationID"] = pd.array([None, 2], dtype="Int64")
+    assert reasons(df) == []
+
+def test_reason_is_first_failed_rule_and_mask_has_all():
+    df = raw_trips(1)
+    df.loc[0, "fare_amount"] = -3.0
+    df.loc[0, "VendorID"] = 3
+    _, rejected = validate(df, build_zone_lookup(ZONES), CODE_MAPS)
+    assert rejected["RejectReason"].tolist() == ["negative_amount"]
+    counts = rule_counts(rejected["RejectMask"])
+    assert [code for code in REASON_CODES if counts[code]] == ["negative_amount", "unknown_vendor"]